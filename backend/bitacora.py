@@ -0,0 +1,221 @@
+"""
+Bitácora de ediciones de la proyección de trabajo (event sourcing).
+
+Cada edición manual se registra como operación (ver ediciones.py) en un log
+append-only; deshacer/rehacer re-aplica operaciones en memoria partiendo del
+snapshot más cercano, sin recalcular la proyección desde la oferta.
+
+Layout en storage:
+    bitacora/cabeza                  estado de la sesión (CAS)
+    bitacora/<sesion>/op/<seq>       operación (nunca se reescribe)
+    bitacora/<sesion>/snap/<seq>     snapshot materializado
+
+La cabeza guarda la línea activa de operaciones (`linea`, lista de seq), el
+`cursor` (cuántas están aplicadas), los snapshots por posición y la versión
+de la proyección que describe. Cada BITACORA_SNAPSHOT_CADA operaciones se
+materializa un snapshot, así reconstruir cualquier posición cuesta un
+snapshot más, como mucho, N operaciones.
+
+Una sesión empieza al generar la proyección. Si la proyección guardada no es
+la que describe la cabeza (p. ej. una proyección anterior a la bitácora), la
+próxima edición abre una sesión nueva partiendo del estado previo. Al abrir
+una sesión se borran las claves de la anterior: la cabeza ya no apunta a
+ellas y no se puede volver a esa sesión.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from . import storage, trabajos
+from .calculo import SemanaFaena
+from .ediciones import aplicar_operaciones
+
+logger = logging.getLogger(__name__)
+
+CABEZA_KEY = "bitacora/cabeza"
+DESHACER = "deshacer"
+REHACER = "rehacer"
+
+
+class BitacoraIncompleta(Exception):
+    """Falta en storage una operación o snapshot al que apunta la cabeza."""
+
+
+def _clave_op(sesion: str, seq: int) -> str:
+    return f"bitacora/{sesion}/op/{seq:06d}"
+
+
+def _clave_snapshot(sesion: str, seq: int) -> str:
+    return f"bitacora/{sesion}/snap/{seq:06d}"
+
+
+def _prefijo_sesion(sesion: str) -> str:
+    return f"bitacora/{sesion}/"
+
+
+def _ahora() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+async def cargar_cabeza() -> tuple[Optional[dict], str]:
+    """Cabeza actual y su versión (para guardarla con compare-and-swap)."""
+    datos = await storage.load_many_versioned([CABEZA_KEY])
+    return datos[CABEZA_KEY]
+
+
+async def _guardar_cabeza(cabeza: dict, version: str, anterior: Optional[dict]) -> bool:
+    """
+    Guarda la cabeza con CAS sobre `anterior` (la cabeza cargada, en
+    `version`). Si `cabeza` abre una sesión nueva y el guardado gana, se borra
+    la sesión anterior; si pierde, se borra la nueva, que nadie va a referenciar.
+    """
+    sesion_nueva = anterior is None or anterior["sesion"] != cabeza["sesion"]
+    try:
+        await storage.get_async_storage().save(CABEZA_KEY, cabeza, if_version=version)
+    except storage.ConflictoVersion:
+        # Solo pasa si otro escritor ganó la proyección entre medio; la
+        # próxima edición lo detecta por version_proyeccion y abre sesión nueva.
+        logger.warning("Bitácora: la cabeza cambió concurrentemente; se descarta la actualización")
+        if sesion_nueva:
+            await _borrar_sesion(cabeza["sesion"])
+        return False
+    if sesion_nueva and anterior is not None:
+        await _borrar_sesion(anterior["sesion"])
+    return True
+
+
+async def _borrar_sesion(sesion: str) -> None:
+    """Borra operaciones y snapshots de una sesión (best effort)."""
+    async_st = storage.get_async_storage()
+    try:
+        claves = await async_st.list_keys(_prefijo_sesion(sesion))
+        await asyncio.gather(*(async_st.delete(clave) for clave in claves))
+    except Exception as e:
+        logger.warning(f"Bitácora: no se pudo borrar la sesión {sesion}: {e}")
+        return
+    logger.info(f"Bitácora: sesión {sesion} borrada ({len(claves)} claves)")
+
+
+async def iniciar(proyeccion: dict, version_proyeccion: Optional[str]) -> None:
+    """Abre una sesión nueva con `proyeccion` como estado inicial (posición 0)."""
+    anterior, version = await cargar_cabeza()
+    await _guardar_cabeza(await _nueva_sesion(proyeccion, version_proyeccion), version, anterior)
+
+
+async def _nueva_sesion(base: dict, version_proyeccion: Optional[str]) -> dict:
+    sesion = uuid.uuid4().hex[:12]
+    clave = _clave_snapshot(sesion, 0)
+    await storage.get_async_storage().save(clave, base)
+    logger.info(f"Bitácora: nueva sesión {sesion}")
+    return {
+        "sesion": sesion,
+        "siguiente_seq": 1,
+        "linea": [],
+        "cursor": 0,
+        "snapshots": {"0": clave},
+        "version_proyeccion": version_proyeccion,
+        "creada_en": _ahora(),
+    }
+
+
+async def registrar(
+    op: dict, usuario: Optional[str], base: dict, version_base: str,
+    resultado: dict, version_resultado: Optional[str],
+) -> None:
+    """
+    Agrega `op` (que llevó la proyección de `base` a `resultado`) a la línea
+    activa. Las operaciones deshechas que quedaban adelante del cursor se
+    descartan de la línea (siguen guardadas como auditoría).
+    """
+    from .config import BITACORA_SNAPSHOT_CADA
+
+    anterior, version = await cargar_cabeza()
+    cabeza = anterior
+    if cabeza is None or cabeza.get("version_proyeccion") != version_base:
+        cabeza = await _nueva_sesion(base, version_base)
+    cabeza = dict(cabeza)  # la cargada puede ser la entrada compartida del cache
+
+    sesion, seq, cursor = cabeza["sesion"], cabeza["siguiente_seq"], cabeza["cursor"]
+    await storage.get_async_storage().save(
+        _clave_op(sesion, seq), {**op, "seq": seq, "usuario": usuario, "creado_en": _ahora()}
+    )
+    cabeza["linea"] = cabeza["linea"][:cursor] + [seq]
+    cabeza["cursor"] = cursor = cursor + 1
+    cabeza["siguiente_seq"] = seq + 1
+    cabeza["snapshots"] = {p: k for p, k in cabeza["snapshots"].items() if int(p) < cursor}
+    if cursor % BITACORA_SNAPSHOT_CADA == 0:
+        clave = _clave_snapshot(sesion, seq)
+        await storage.get_async_storage().save(clave, resultado)
+        cabeza["snapshots"][str(cursor)] = clave
+    cabeza["version_proyeccion"] = version_resultado
+    await _guardar_cabeza(cabeza, version, anterior)
+
+
+def _faltantes(datos: dict) -> list[str]:
+    return [clave for clave, valor in datos.items() if valor is None]
+
+
+async def reconstruir(cabeza: dict, posicion: int) -> SemanaFaena:
+    """
+    Estado de la proyección tras aplicar las primeras `posicion` operaciones.
+    Lanza BitacoraIncompleta si falta el snapshot o alguna operación.
+    """
+    desde = max(int(p) for p in cabeza["snapshots"] if int(p) <= posicion)
+    claves_ops = [_clave_op(cabeza["sesion"], seq) for seq in cabeza["linea"][desde:posicion]]
+    clave_snapshot = cabeza["snapshots"][str(desde)]
+    datos = await storage.load_many([clave_snapshot, *claves_ops])
+    if faltantes := _faltantes(datos):
+        raise BitacoraIncompleta(f"Faltan en la bitácora: {', '.join(faltantes)}")
+    semana = SemanaFaena(**datos[clave_snapshot])
+    # Cada operación recalcula la semana: CPU-bound, fuera del event loop
+    return await trabajos.ejecutar(aplicar_operaciones, semana, [datos[clave] for clave in claves_ops])
+
+
+async def operacion_en(cabeza: dict, posicion: int) -> dict:
+    """Operación que lleva de `posicion` a `posicion + 1` (BitacoraIncompleta si falta)."""
+    clave = _clave_op(cabeza["sesion"], cabeza["linea"][posicion])
+    op = await storage.get_async_storage().load(clave)
+    if op is None:
+        raise BitacoraIncompleta(f"Falta en la bitácora: {clave}")
+    return op
+
+
+async def mover_cursor(
+    cabeza: dict, version: str, posicion: int, version_proyeccion: Optional[str],
+    usuario: Optional[str],
+) -> None:
+    """Deja el cursor en `posicion` tras un deshacer/rehacer y lo audita."""
+    evento = DESHACER if posicion < cabeza["cursor"] else REHACER
+    seq = cabeza["siguiente_seq"]
+    await storage.get_async_storage().save(
+        _clave_op(cabeza["sesion"], seq),
+        {"tipo": evento, "posicion": posicion, "seq": seq, "usuario": usuario, "creado_en": _ahora()},
+    )
+    nueva = {
+        **cabeza,
+        "cursor": posicion,
+        "siguiente_seq": seq + 1,
+        "version_proyeccion": version_proyeccion,
+    }
+    await _guardar_cabeza(nueva, version, cabeza)
+
+
+async def operaciones(cabeza: dict) -> list[dict]:
+    """
+    Operaciones de la línea activa (aplicadas y deshechas), en orden. Una
+    operación que falta en storage se lista como {"seq", "faltante": True}
+    para que las posiciones sigan coincidiendo con el cursor.
+    """
+    claves = [_clave_op(cabeza["sesion"], seq) for seq in cabeza["linea"]]
+    datos = await storage.load_many(claves)
+    if faltantes := _faltantes(datos):
+        logger.warning(f"Bitácora: faltan operaciones de la sesión {cabeza['sesion']}: {faltantes}")
+    return [
+        {k: v for k, v in datos[clave].items() if k != "parametros"}
+        if datos[clave] is not None else {"seq": seq, "faltante": True}
+        for seq, clave in zip(cabeza["linea"], claves)
+    ]
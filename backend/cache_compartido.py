@@ -0,0 +1,255 @@
+"""
+Cache compartido entre instancias (Cloud Run con varias réplicas).
+
+Cada instancia tiene su propio CachedStorage en memoria; este módulo agrega
+un segundo nivel común a todas:
+
+- Guarda el estado serializado (bytes + versión) de cada clave, para que una
+  instancia nueva o con la entrada invalidada no tenga que descargarlo de
+  GCS. La versión vigente la decide siempre el backend: quien lee del cache
+  compartido confirma que la versión coincide antes de usar el contenido.
+- `set` solo reemplaza una entrada por una versión estrictamente más nueva
+  (las versiones de los backends son contadores o generaciones crecientes):
+  una publicación demorada de una escritura anterior no pisa a la nueva.
+- Publica una invalidación en cada escritura; las demás instancias descartan
+  su copia local al recibirla.
+
+Implementaciones:
+- RedisSharedCache: protocolo Redis (Memorystore, Redis OSS, etc.)
+- InMemorySharedCache: fake en memoria para tests y desarrollo
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# callback(key, origen): `origen` es el id de la instancia que escribió
+InvalidacionCallback = Callable[[str, str], None]
+
+
+def es_mas_nueva(version: Optional[str], actual: Optional[str]) -> Optional[bool]:
+    """
+    True si `version` es posterior a `actual`, False si no lo es, None si no
+    se pueden comparar (versiones que no son contadores, p. ej. las de
+    archivos locales previos al control de versiones).
+    """
+    if not (version or "").isdigit() or not (actual or "").isdigit():
+        return None
+    return int(version) > int(actual)
+
+
+class SharedCache(ABC):
+    """Interfaz del cache compartido entre instancias."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[tuple[bytes, Optional[str]]]:
+        """Retorna (contenido serializado, versión) o None si no está."""
+        ...
+
+    def get_version(self, key: str) -> Optional[str]:
+        """Solo la versión de `key` (None si no está en cache)."""
+        entrada = self.get(key)
+        return entrada[1] if entrada is not None else None
+
+    @abstractmethod
+    def set(self, key: str, raw: bytes, version: Optional[str]) -> bool:
+        """
+        Guarda el contenido serializado de `key` con su versión, solo si no
+        hay entrada o la que hay es de una versión anterior (atómico). Si las
+        versiones no se pueden comparar, la entrada se elimina. Retorna True
+        si se guardó.
+        """
+        ...
+
+    @abstractmethod
+    def set_si_ausente(self, key: str, raw: bytes, version: Optional[str]) -> bool:
+        """
+        Como set, pero solo si `key` no está (atómico). Lo usan los lectores
+        al poblar el cache: nunca pisan lo que publicó un escritor.
+        """
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Elimina `key` del cache compartido."""
+        ...
+
+    @abstractmethod
+    def delete_si_version(self, key: str, version: Optional[str]) -> None:
+        """Elimina `key` solo si su versión sigue siendo `version` (atómico)."""
+        ...
+
+    @abstractmethod
+    def publish_invalidation(self, key: str, origen: str) -> None:
+        """Avisa a todas las instancias que `key` cambió."""
+        ...
+
+    @abstractmethod
+    def subscribe(self, callback: InvalidacionCallback) -> None:
+        """Registra un callback que se invoca por cada invalidación recibida."""
+        ...
+
+
+# ─── Implementación: en memoria (tests) ─────────────────────────────────────────
+
+class InMemorySharedCache(SharedCache):
+    """
+    Fake en memoria. Varias instancias de CachedStorage que compartan el mismo
+    objeto se comportan como réplicas conectadas al mismo Redis. Las
+    invalidaciones se entregan de forma síncrona.
+    """
+
+    def __init__(self):
+        self._datos: dict[str, tuple[bytes, Optional[str]]] = {}
+        self._suscriptores: list[InvalidacionCallback] = []
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[tuple[bytes, Optional[str]]]:
+        with self._lock:
+            return self._datos.get(key)
+
+    def set(self, key: str, raw: bytes, version: Optional[str]) -> bool:
+        with self._lock:
+            if key in self._datos:
+                mas_nueva = es_mas_nueva(version, self._datos[key][1])
+                if not mas_nueva:
+                    if mas_nueva is None:
+                        del self._datos[key]
+                    return False
+            self._datos[key] = (raw, version)
+            return True
+
+    def set_si_ausente(self, key: str, raw: bytes, version: Optional[str]) -> bool:
+        with self._lock:
+            if key in self._datos:
+                return False
+            self._datos[key] = (raw, version)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._datos.pop(key, None)
+
+    def delete_si_version(self, key: str, version: Optional[str]) -> None:
+        with self._lock:
+            if key in self._datos and self._datos[key][1] == version:
+                del self._datos[key]
+
+    def publish_invalidation(self, key: str, origen: str) -> None:
+        with self._lock:
+            suscriptores = list(self._suscriptores)
+        for callback in suscriptores:
+            callback(key, origen)
+
+    def subscribe(self, callback: InvalidacionCallback) -> None:
+        with self._lock:
+            self._suscriptores.append(callback)
+
+
+# ─── Implementación: Redis ──────────────────────────────────────────────────────
+
+# Operaciones condicionales atómicas (un script Lua corre sin intercalarse).
+# _LUA_SET_SI_MAS_NUEVA sigue a es_mas_nueva: las generaciones de GCS (< 2^53)
+# se comparan sin pérdida como números de Lua.
+_LUA_SET_SI_MAS_NUEVA = """
+local actual = redis.call('HGET', KEYS[1], 'version')
+if actual then
+    if not string.match(actual, '^%d+$') or not string.match(ARGV[2], '^%d+$') then
+        redis.call('DEL', KEYS[1])
+        return 0
+    end
+    if tonumber(ARGV[2]) <= tonumber(actual) then return 0 end
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], 'raw', ARGV[1], 'version', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+_LUA_SET_SI_AUSENTE = """
+if redis.call('EXISTS', KEYS[1]) == 1 then return 0 end
+redis.call('HSET', KEYS[1], 'raw', ARGV[1], 'version', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+_LUA_DELETE_SI_VERSION = """
+if redis.call('HGET', KEYS[1], 'version') == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+
+class RedisSharedCache(SharedCache):
+    """
+    Cache compartido sobre Redis. Cada clave se guarda como un hash
+    {raw, version} con expiración; las invalidaciones viajan por pub/sub.
+    """
+
+    CANAL_INVALIDACIONES = "faena:invalidaciones"
+
+    def __init__(self, url: str, ttl: int = 3600, namespace: str = "faena:obj:"):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._script_set = self._redis.register_script(_LUA_SET_SI_MAS_NUEVA)
+        self._script_set_si_ausente = self._redis.register_script(_LUA_SET_SI_AUSENTE)
+        self._script_delete_si_version = self._redis.register_script(_LUA_DELETE_SI_VERSION)
+        self.ttl = ttl
+        self.namespace = namespace
+        self._pubsub = None
+        self._hilo = None
+        self._suscriptores: list[InvalidacionCallback] = []
+        self._lock = threading.Lock()
+        logger.info(f"RedisSharedCache inicializado (ttl={ttl}s)")
+
+    def _clave(self, key: str) -> str:
+        return f"{self.namespace}{key}"
+
+    def get(self, key: str) -> Optional[tuple[bytes, Optional[str]]]:
+        raw, version = self._redis.hmget(self._clave(key), "raw", "version")
+        if raw is None:
+            return None
+        return raw, version.decode("utf-8") if version else None
+
+    def get_version(self, key: str) -> Optional[str]:
+        version = self._redis.hget(self._clave(key), "version")
+        return version.decode("utf-8") if version else None
+
+    def set(self, key: str, raw: bytes, version: Optional[str]) -> bool:
+        return bool(self._script_set(keys=[self._clave(key)], args=[raw, version or "", self.ttl]))
+
+    def set_si_ausente(self, key: str, raw: bytes, version: Optional[str]) -> bool:
+        return bool(self._script_set_si_ausente(keys=[self._clave(key)], args=[raw, version or "", self.ttl]))
+
+    def delete(self, key: str) -> None:
+        self._redis.delete(self._clave(key))
+
+    def delete_si_version(self, key: str, version: Optional[str]) -> None:
+        self._script_delete_si_version(keys=[self._clave(key)], args=[version or ""])
+
+    def publish_invalidation(self, key: str, origen: str) -> None:
+        mensaje = json.dumps({"key": key, "origen": origen})
+        self._redis.publish(self.CANAL_INVALIDACIONES, mensaje)
+
+    def _on_mensaje(self, mensaje: dict) -> None:
+        try:
+            payload = json.loads(mensaje["data"])
+        except (TypeError, ValueError, KeyError):
+            logger.warning(f"Invalidación malformada ignorada: {mensaje!r}")
+            return
+        with self._lock:
+            suscriptores = list(self._suscriptores)
+        for callback in suscriptores:
+            callback(payload["key"], payload.get("origen", ""))
+
+    def subscribe(self, callback: InvalidacionCallback) -> None:
+        with self._lock:
+            self._suscriptores.append(callback)
+            if self._hilo is not None:
+                return
+            # Un solo hilo de escucha por proceso, arrancado en la primera suscripción
+            self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(**{self.CANAL_INVALIDACIONES: self._on_mensaje})
+            self._hilo = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
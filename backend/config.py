@@ -16,12 +16,15 @@ except ImportError:
 
 
 # ─── Storage ────────────────────────────────────────────────────────────────────
-# "gcs" para Google Cloud Storage, "local" para filesystem local
+# "gcs" para Google Cloud Storage, "local" para filesystem local,
+# "sqlite" para una base SQLite (tablas por lote/día, ediciones por fila)
 STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
 
 # Google Cloud Storage
 GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME", "")
 GCS_PREFIX = os.getenv("GCS_PREFIX", "data/")  # prefijo dentro del bucket
+# Conexiones HTTP reutilizables / descargas concurrentes en load_many
+GCS_HTTP_POOL_SIZE = int(os.getenv("GCS_HTTP_POOL_SIZE", "8"))
 
 # Almacenamiento local (desarrollo)
 LOCAL_STORAGE_PATH = os.getenv(
@@ -29,6 +32,58 @@ LOCAL_STORAGE_PATH = os.getenv(
     str(Path(__file__).resolve().parent.parent / "local_storage")
 )
 
+# Archivo de la base SQLite (STORAGE_BACKEND=sqlite)
+SQLITE_PATH = os.getenv(
+    "SQLITE_PATH",
+    str(Path(__file__).resolve().parent.parent / "local_storage" / "faena.sqlite3")
+)
+
+# Hilos dedicados a la I/O bloqueante de storage (disco local, Redis, refresh
+# de credenciales). Separados del threadpool de Starlette.
+STORAGE_IO_THREADS = int(os.getenv("STORAGE_IO_THREADS", "16"))
+
+# Formato de los objetos guardados: json | orjson | msgpack | zstd.
+# Los objetos se leen según su cabecera, así que cambiarlo no rompe datos viejos.
+STORAGE_CODEC = os.getenv("STORAGE_CODEC", "json")
+
+# Cache en proceso de los objetos JSON (ofertas, parámetros, proyección).
+# Dentro del TTL (segundos) las lecturas no tocan el backend; vencido, solo se
+# consulta la versión (generación GCS / mtime local) antes de re-descargar.
+STORAGE_CACHE_ENABLED = os.getenv("STORAGE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+STORAGE_CACHE_TTL = float(os.getenv("STORAGE_CACHE_TTL", "2"))
+# Máximo de claves en el cache en proceso (LRU); historial, bitácora y
+# uploads no se cachean.
+STORAGE_CACHE_MAX_ENTRADAS = int(os.getenv("STORAGE_CACHE_MAX_ENTRADAS", "256"))
+
+# Cache compartido entre instancias (protocolo Redis, p. ej. Memorystore).
+# Vacío = sin cache compartido.
+SHARED_CACHE_URL = os.getenv("SHARED_CACHE_URL", "")
+SHARED_CACHE_TTL = int(os.getenv("SHARED_CACHE_TTL", "3600"))
+
+# Historial de proyecciones: cada cuántas versiones se guarda un snapshot
+# completo (las intermedias se guardan como delta de la anterior).
+HISTORIAL_SNAPSHOT_CADA = int(os.getenv("HISTORIAL_SNAPSHOT_CADA", "10"))
+
+# Bitácora de ediciones (deshacer/rehacer): snapshot materializado cada N operaciones.
+BITACORA_SNAPSHOT_CADA = int(os.getenv("BITACORA_SNAPSHOT_CADA", "20"))
+
+# ─── Trabajo CPU-bound (parseo de Excel, ajuste martes, generar) ───────────────
+# "thread" (hilos) o "process" (procesos: aprovecha varios núcleos, pero
+# duplica la memoria de cada worker).
+CPU_POOL_MODO = os.getenv("CPU_POOL_MODO", "thread")
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Trabajos en curso + en espera; por encima se responde 503 (Retry-After)
+CPU_COLA_MAX = int(os.getenv("CPU_COLA_MAX", "8"))
+
+# ─── Uploads ────────────────────────────────────────────────────────────────────
+# Tamaño máximo de un archivo subido (413 por encima, cortando la recepción del cuerpo)
+UPLOAD_MAX_MB = int(os.getenv("UPLOAD_MAX_MB", "50"))
+# Hasta este tamaño un archivo extraído de un .zip se procesa en memoria; por
+# encima, en un temporal en disco (los uploads usan el spool de Starlette)
+UPLOAD_SPOOL_MB = int(os.getenv("UPLOAD_SPOOL_MB", "8"))
+# Archivos por carga múltiple (/oferta/upload-lote), contando los de cada .zip
+UPLOAD_MAX_ARCHIVOS = int(os.getenv("UPLOAD_MAX_ARCHIVOS", "20"))
+
 # ─── Auth ───────────────────────────────────────────────────────────────────────
 SECRET_KEY = os.getenv("SECRET_KEY", "vibe_coding_secret_key")
 ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "admin")
@@ -47,10 +102,10 @@ CORS_ALLOW_CREDENTIALS = "*" not in CORS_ORIGINS
 # ─── Validación de seguridad ────────────────────────────────────────────────────
 # K_SERVICE es una variable que Cloud Run inyecta automáticamente.
 # Si estamos en Cloud Run pero con storage local, los datos se perderán.
-if os.getenv("K_SERVICE") and STORAGE_BACKEND == "local":
+if os.getenv("K_SERVICE") and STORAGE_BACKEND in ("local", "sqlite"):
     import warnings
     warnings.warn(
-        "⚠️ STORAGE_BACKEND='local' detectado en Cloud Run. "
+        f"⚠️ STORAGE_BACKEND='{STORAGE_BACKEND}' detectado en Cloud Run. "
         "Los datos NO persistirán entre reinicios del contenedor. "
         "Configure STORAGE_BACKEND='gcs' y GCS_BUCKET_NAME para producción.",
         RuntimeWarning,
@@ -0,0 +1,74 @@
+"""
+Lotes repetidos en ofertas ya parseadas (forma columnar, ver
+parser_excel.ofertas_a_columnas), y combinación de varias ofertas en una.
+
+Un lote se identifica por CAMPOS_CLAVE, la misma clave con la que el ajuste
+martes matchea la oferta nueva contra la proyección: si la oferta trae dos
+filas con la misma clave, el ajuste las consume en orden (FIFO) y las
+cantidades se cuentan dos veces. Al cargar la oferta se arma un índice
+clave → primera fila y cada repetición se clasifica en una sola pasada:
+
+- exacta: la fila es idéntica a la primera (típico de copiar/pegar);
+- conflicto: misma clave con algún otro dato distinto.
+
+Con `fusionar` solo queda la primera fila de cada clave; sin él se
+conservan todas y solo se informan.
+"""
+from __future__ import annotations
+
+from .calculo import LoteOferta
+from .parser_excel import PARSER_VERSION, columnas_con_fechas
+
+CAMPOS_CLAVE = ("granja", "galpon", "nucleo", "sexo", "fecha_ingreso")
+
+
+def _json(valor):
+    return valor.isoformat() if hasattr(valor, "isoformat") else valor
+
+
+def _clave_dict(clave: tuple) -> dict:
+    return {c: _json(v) for c, v in zip(CAMPOS_CLAVE, clave)}
+
+
+def combinar(partes: list[tuple[str, dict]], fusionar: bool = False) -> tuple[dict, dict]:
+    """
+    Une las ofertas columnares `partes` ([(archivo, columnas)], en orden) en
+    una sola, detectando lotes repetidos dentro de cada archivo y entre
+    archivos. Cada repetición se informa con el origen de la fila conservada
+    y de la repetida ({"archivo", "indice"}, índice de lote en el archivo) y,
+    si es un conflicto, los campos que difieren ({campo: [primera, repetida]}).
+    Retorna (oferta combinada, reporte).
+    """
+    campos = list(LoteOferta.model_fields)
+    posiciones_clave = [campos.index(c) for c in CAMPOS_CLAVE]
+    combinadas: dict = {c: [] for c in campos}
+    indice: dict[tuple, tuple[dict, tuple]] = {}
+    reporte = {"exactos": [], "conflictos": [], "fusionados": fusionar}
+    n = 0
+
+    for archivo, data in partes:
+        columnas = columnas_con_fechas(data)
+        for i, fila in enumerate(zip(*(columnas[c] for c in campos))):
+            clave = tuple(fila[p] for p in posiciones_clave)
+            origen = {"archivo": archivo, "indice": i}
+            previo = indice.get(clave)
+            if previo is None:
+                indice[clave] = (origen, fila)
+            else:
+                conservado, fila_conservada = previo
+                entrada = {"clave": _clave_dict(clave), "conservado": conservado, "repetido": origen}
+                if fila == fila_conservada:
+                    reporte["exactos"].append(entrada)
+                else:
+                    entrada["diferencias"] = {
+                        campo: [_json(a), _json(b)]
+                        for campo, a, b in zip(campos, fila_conservada, fila) if a != b
+                    }
+                    reporte["conflictos"].append(entrada)
+                if fusionar:
+                    continue
+            for campo, valor in zip(campos, fila):
+                combinadas[campo].append(valor)
+            n += 1
+
+    return {"parser": PARSER_VERSION, "n": n, "columnas": combinadas}, reporte
@@ -0,0 +1,179 @@
+"""
+Ediciones manuales de la proyección como operaciones puras y reproducibles.
+
+Cada edición (mover, agregar, eliminar lote, ajuste martes) recibe la semana
+y los parámetros y devuelve la semana resultante, sin tocar storage. Los
+endpoints las usan para editar, y la bitácora (bitacora.py) para re-aplicar
+operaciones guardadas al deshacer/rehacer, sin recalcular desde la oferta.
+
+Una operación serializada es un dict:
+    {"tipo": "mover-lote", "args": {...}, "parametros": {...}}
+"""
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from .calculo import (
+    Parametros, LoteOferta, SemanaFaena, AjusteMartesResumen,
+    aplicar_ajuste_martes, calcular_lote_proyectado, calcular_dia_faena, calcular_semana_faena,
+)
+
+MOVER_LOTE = "mover-lote"
+AGREGAR_LOTE = "agregar-lote"
+ELIMINAR_LOTE = "eliminar-lote"
+AJUSTE_MARTES = "ajuste-martes"
+
+
+class EdicionInvalida(ValueError):
+    """Los índices o datos de la edición no son válidos para la semana actual."""
+
+
+def _recalcular_semana(semana: SemanaFaena, params: Parametros) -> SemanaFaena:
+    """Recalcula la semana preservando lotes no asignados y fuera de rango."""
+    return calcular_semana_faena(
+        semana.fecha_inicio, semana.dias, params,
+        lotes_no_asignados=semana.lotes_no_asignados,
+        lotes_fuera_rango=semana.lotes_fuera_rango,
+    )
+
+
+def mover_lote(
+    semana: SemanaFaena, params: Parametros, lote_index: int, dia_origen: int, dia_destino: int
+) -> tuple[SemanaFaena, list[int]]:
+    """Mueve un lote de un día a otro. Retorna (semana, días modificados)."""
+    if dia_origen < 0 or dia_origen >= len(semana.dias) \
+       or dia_destino < 0 or dia_destino >= len(semana.dias):
+        raise EdicionInvalida("Índice de día inválido")
+
+    origen = semana.dias[dia_origen]
+    destino = semana.dias[dia_destino]
+
+    if lote_index < 0 or lote_index >= len(origen.lotes):
+        raise EdicionInvalida("Índice de lote inválido")
+
+    # Extraer el lote
+    lote = origen.lotes.pop(lote_index)
+
+    # Usar datos originales de la oferta si están disponibles (preservados
+    # desde calcular_lote_proyectado). Si no existen (proyecciones antiguas),
+    # caemos al fallback anterior para compatibilidad.
+    fecha_peso = lote.fecha_peso_original or lote.fecha_fin_retiro
+    ganancia = lote.ganancia_diaria_original if lote.ganancia_diaria_original is not None else params.ganancia_diaria_macho
+    fecha_ingreso = lote.fecha_ingreso_original or fecha_peso
+
+    oferta_equiv = LoteOferta(
+        fecha_peso=fecha_peso,
+        granja=lote.granja,
+        galpon=lote.galpon,
+        nucleo=lote.nucleo,
+        cantidad=lote.cantidad,
+        sexo=lote.sexo,
+        edad_proyectada=lote.edad_actual,
+        peso_muestreo_proy=lote.peso_actual,
+        ganancia_diaria=ganancia,
+        dias_proyectados=0,
+        edad_real=lote.edad_actual,
+        peso_muestreo_real=lote.peso_actual,
+        fecha_ingreso=fecha_ingreso,
+    )
+
+    # Recalcular con la nueva fecha
+    destino.lotes.append(calcular_lote_proyectado(oferta_equiv, destino.fecha, params))
+
+    # Recalcular agregados de ambos días
+    semana.dias[dia_origen] = calcular_dia_faena(origen.fecha, origen.lotes)
+    semana.dias[dia_destino] = calcular_dia_faena(destino.fecha, destino.lotes)
+
+    return _recalcular_semana(semana, params), [dia_origen, dia_destino]
+
+
+def agregar_lote(semana: SemanaFaena, params: Parametros, lote: dict) -> tuple[SemanaFaena, list[int]]:
+    """
+    Agrega un lote manual. `lote` tiene los campos de LoteManualRequest
+    (dia_faena es el índice del día destino).
+    """
+    dia_faena = lote["dia_faena"]
+    if dia_faena < 0 or dia_faena >= len(semana.dias):
+        raise EdicionInvalida("Índice de día inválido")
+
+    oferta = LoteOferta(
+        fecha_peso=lote["fecha_peso"],
+        granja=lote["granja"],
+        galpon=lote["galpon"],
+        nucleo=lote["nucleo"],
+        cantidad=lote["cantidad"],
+        sexo=lote["sexo"],
+        edad_proyectada=lote["edad_proyectada"],
+        peso_muestreo_proy=lote["peso_muestreo_proy"],
+        ganancia_diaria=lote["ganancia_diaria"],
+        dias_proyectados=0,
+        edad_real=lote["edad_proyectada"],
+        peso_muestreo_real=lote["peso_muestreo_proy"],
+        fecha_ingreso=lote["fecha_ingreso"],
+    )
+
+    dia = semana.dias[dia_faena]
+    dia.lotes.append(calcular_lote_proyectado(oferta, dia.fecha, params))
+
+    # Recalcular el día
+    semana.dias[dia_faena] = calcular_dia_faena(dia.fecha, dia.lotes)
+
+    return _recalcular_semana(semana, params), [dia_faena]
+
+
+def eliminar_lote(
+    semana: SemanaFaena, params: Parametros, dia_index: int, lote_index: int
+) -> tuple[SemanaFaena, list[int]]:
+    """Elimina un lote de un día de faena."""
+    if dia_index < 0 or dia_index >= len(semana.dias):
+        raise EdicionInvalida("Índice de día inválido")
+
+    dia = semana.dias[dia_index]
+    if lote_index < 0 or lote_index >= len(dia.lotes):
+        raise EdicionInvalida("Índice de lote inválido")
+
+    dia.lotes.pop(lote_index)
+    semana.dias[dia_index] = calcular_dia_faena(dia.fecha, dia.lotes)
+
+    return _recalcular_semana(semana, params), [dia_index]
+
+
+def ajuste_martes(
+    semana: SemanaFaena, params: Parametros, ofertas_martes: list[LoteOferta]
+) -> tuple[SemanaFaena, AjusteMartesResumen]:
+    """Ver calculo.aplicar_ajuste_martes. Puede tocar cualquier día."""
+    return aplicar_ajuste_martes(ofertas_martes, semana, params)
+
+
+# ─── Operaciones serializadas ───────────────────────────────────────────────────
+
+def operacion(tipo: str, args: dict, params: Parametros) -> dict:
+    """Arma la operación a registrar en la bitácora (forma JSON pura)."""
+    return {"tipo": tipo, "args": args, "parametros": params.model_dump(mode="json")}
+
+
+def aplicar_operacion(semana: SemanaFaena, op: dict) -> tuple[SemanaFaena, Optional[list[int]]]:
+    """
+    Re-aplica una operación registrada. Retorna (semana, días modificados);
+    None en días significa que la operación puede haber tocado cualquiera.
+    """
+    params = Parametros(**op["parametros"])
+    args: dict[str, Any] = op["args"]
+    tipo = op["tipo"]
+    if tipo == MOVER_LOTE:
+        return mover_lote(semana, params, args["lote_index"], args["dia_origen"], args["dia_destino"])
+    if tipo == AGREGAR_LOTE:
+        return agregar_lote(semana, params, args)
+    if tipo == ELIMINAR_LOTE:
+        return eliminar_lote(semana, params, args["dia_index"], args["lote_index"])
+    if tipo == AJUSTE_MARTES:
+        ofertas = [LoteOferta(**o) for o in args["ofertas_martes"]]
+        return ajuste_martes(semana, params, ofertas)[0], None
+    raise EdicionInvalida(f"Operación desconocida: {tipo!r}")
+
+
+def aplicar_operaciones(semana: SemanaFaena, ops: list[dict]) -> SemanaFaena:
+    """Re-aplica varias operaciones en orden (una sola tarea para el pool de CPU)."""
+    for op in ops:
+        semana, _ = aplicar_operacion(semana, op)
+    return semana
@@ -0,0 +1,113 @@
+"""
+Exportación de la proyección a Excel con el layout de PROYEC1.
+
+El libro se escribe con openpyxl en modo write_only: cada fila se vuelca al
+XML de la hoja (un temporal en disco) apenas se agrega, así que la memoria
+no crece con la cantidad de lotes. El .xlsx resultante queda en un archivo
+en disco que el endpoint envía por bloques y borra al terminar.
+
+La hoja lleva la configuración en las celdas que lee leer_proyeccion_excel
+(D4, N5, P5) y la tabla de lotes (COLUMNAS_PROYEC1) desde la fila
+FILA_ENCABEZADO_PROYEC1, con un subtotal por día y el total de la semana.
+Se puede volver a leer con leer_proyeccion_completa.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from typing import Optional
+
+from .calculo import DiaFaena, Parametros, SemanaFaena
+from .parser_excel import COLUMNAS_PROYEC1, FILA_ENCABEZADO_PROYEC1, HOJA_PROYEC1
+
+CONTENT_TYPE_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+FORMATO_FECHA = "DD/MM/YYYY"
+FORMATOS = {
+    "peso_actual": "0.000",
+    "peso_vivo_retiro": "0.000",
+    "peso_faenado": "0.000",
+    "calibre_promedio": "0.00",
+    "cajas": "#,##0",
+    "cantidad": "#,##0",
+}
+
+_COLUMNA = {campo: i for i, (campo, _) in enumerate(COLUMNAS_PROYEC1)}
+
+
+def _celda(ws, valor, formato: Optional[str] = None, negrita: bool = False):
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    celda = WriteOnlyCell(ws, value=valor)
+    if formato:
+        celda.number_format = formato
+    if negrita:
+        celda.font = Font(bold=True)
+    return celda
+
+
+def _fila_lote(ws, dia: DiaFaena, lote) -> list:
+    fila = []
+    for campo, _ in COLUMNAS_PROYEC1:
+        if campo == "fecha":
+            fila.append(_celda(ws, dia.fecha, FORMATO_FECHA))
+        elif campo == "fecha_ingreso_original":
+            fila.append(_celda(ws, lote.fecha_ingreso_original, FORMATO_FECHA))
+        else:
+            fila.append(_celda(ws, getattr(lote, campo), FORMATOS.get(campo)))
+    return fila
+
+
+def _fila_total(ws, etiqueta: str, pollos: int, cajas: float) -> list:
+    fila: list = [None] * len(COLUMNAS_PROYEC1)
+    fila[_COLUMNA["granja"]] = _celda(ws, etiqueta, negrita=True)
+    fila[_COLUMNA["cantidad"]] = _celda(ws, pollos, FORMATOS["cantidad"], negrita=True)
+    fila[_COLUMNA["cajas"]] = _celda(ws, cajas, FORMATOS["cajas"], negrita=True)
+    return fila
+
+
+def escribir_proyec1(semana: SemanaFaena, params: Parametros, destino: str) -> None:
+    """Escribe la proyección como libro PROYEC1 en el archivo `destino`."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(HOJA_PROYEC1)
+
+    titulo = f"Proyección de faena {semana.fecha_inicio:%d/%m/%Y} - {semana.fecha_fin:%d/%m/%Y}"
+    ws.append([_celda(ws, titulo, negrita=True)])
+    ws.append([])
+    ws.append([])
+    ws.append([None, None, "Fecha base", _celda(ws, semana.fecha_inicio, FORMATO_FECHA)])  # D4
+    fila5: list = [None] * 16
+    fila5[12], fila5[13] = "Ganancia M", params.ganancia_diaria_macho     # N5
+    fila5[14], fila5[15] = "Ganancia H", params.ganancia_diaria_hembra    # P5
+    ws.append(fila5)
+    for _ in range(FILA_ENCABEZADO_PROYEC1 - 6):
+        ws.append([])
+    ws.append([_celda(ws, titulo, negrita=True) for _, titulo in COLUMNAS_PROYEC1])
+
+    for dia in semana.dias:
+        for lote in dia.lotes:
+            ws.append(_fila_lote(ws, dia, lote))
+        ws.append(_fila_total(ws, "TOTAL DÍA", dia.total_pollos, dia.cajas_totales))
+    ws.append([])
+    ws.append(_fila_total(ws, "TOTAL SEMANA", semana.total_pollos_semana, semana.produccion_cajas_semanales))
+
+    wb.save(destino)
+
+
+def exportar_a_temporal(semana: SemanaFaena, params: Parametros) -> str:
+    """
+    Escribe el libro en un temporal y retorna su ruta (quien llama lo borra).
+    A nivel de módulo para poder correr en el pool de procesos.
+    """
+    fd, ruta = tempfile.mkstemp(prefix="proyec1-", suffix=".xlsx")
+    os.close(fd)
+    try:
+        escribir_proyec1(semana, params, ruta)
+    except BaseException:
+        os.unlink(ruta)
+        raise
+    return ruta
+
@@ -0,0 +1,358 @@
+"""
+Historial de proyecciones por semana (clave: fecha_inicio).
+
+Cada vez que se guarda la proyección de trabajo se agrega una versión al
+historial de su semana; nunca se reescribe ni se borra una versión. Así
+generar la semana siguiente no pierde el plan de esta.
+
+Layout en storage:
+    historial/<fecha_inicio>/indice     lista de metadatos de versiones (CAS)
+    historial/<fecha_inicio>/v000001    contenido de cada versión
+    historial/<fecha_inicio>/ultima     la última versión ya materializada
+
+Una versión es un snapshot completo o un delta respecto de su predecesora
+(`base`). Cada HISTORIAL_SNAPSHOT_CADA versiones, o cuando el delta no es
+bastante más chico que el snapshot, se guarda un snapshot: reconstruir
+cualquier versión aplica como mucho HISTORIAL_SNAPSHOT_CADA - 1 deltas,
+leídos en un solo lote.
+
+`ultima` evita reconstruir la versión anterior en cada registro: el delta
+de la nueva versión se calcula contra esa copia. Es solo un atajo; si no
+corresponde a la última entrada del índice (un escritor se cayó entre el
+índice y `ultima`, o dos escritores se cruzaron) se reconstruye.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, Optional
+
+from . import storage
+from .serializacion import DateEncoder
+
+logger = logging.getLogger(__name__)
+
+HISTORIAL_PREFIX = "historial/"
+INDICE = "indice"
+ULTIMA = "ultima"
+
+TIPO_SNAPSHOT = "snapshot"
+TIPO_DELTA = "delta"
+
+REINTENTOS = 5
+
+
+class VersionNoEncontrada(LookupError):
+    """La semana o la versión pedida no existe en el historial."""
+
+
+# ─── Deltas ─────────────────────────────────────────────────────────────────────
+# Un delta es un dict con una de estas formas:
+#   {"v": valor}                          reemplazo completo
+#   {"d": {clave: delta}, "x": [claves]}  dict: claves cambiadas / quitadas
+#   {"n": largo, "i": {"idx": delta}}     lista: nuevo largo y posiciones cambiadas
+
+def calcular_delta(antes: Any, despues: Any) -> Optional[dict]:
+    """Delta que transforma `antes` en `despues`, o None si son iguales."""
+    if antes == despues:
+        return None
+    if isinstance(antes, dict) and isinstance(despues, dict):
+        cambios = {}
+        for clave, valor in despues.items():
+            if clave not in antes:
+                cambios[clave] = {"v": valor}
+            else:
+                sub = calcular_delta(antes[clave], valor)
+                if sub is not None:
+                    cambios[clave] = sub
+        delta: dict = {"d": cambios}
+        quitadas = [clave for clave in antes if clave not in despues]
+        if quitadas:
+            delta["x"] = quitadas
+        return delta
+    if isinstance(antes, list) and isinstance(despues, list):
+        cambios = {}
+        for idx, valor in enumerate(despues):
+            sub = calcular_delta(antes[idx], valor) if idx < len(antes) else {"v": valor}
+            if sub is not None:
+                cambios[str(idx)] = sub
+        return {"n": len(despues), "i": cambios}
+    return {"v": despues}
+
+
+def aplicar_delta(base: Any, delta: Optional[dict]) -> Any:
+    """Inversa de calcular_delta. No modifica `base`."""
+    if delta is None:
+        return base
+    if "v" in delta:
+        return delta["v"]
+    if "d" in delta:
+        resultado = {clave: valor for clave, valor in base.items() if clave not in delta.get("x", ())}
+        for clave, sub in delta["d"].items():
+            resultado[clave] = aplicar_delta(base.get(clave), sub)
+        return resultado
+    resultado = list(base[:delta["n"]])
+    for idx, sub in delta["i"].items():
+        i = int(idx)
+        valor = aplicar_delta(base[i] if i < len(base) else None, sub)
+        if i < len(resultado):
+            resultado[i] = valor
+        else:
+            resultado.append(valor)
+    return resultado
+
+
+# ─── Claves ─────────────────────────────────────────────────────────────────────
+
+def _clave_indice(semana: str) -> str:
+    return f"{HISTORIAL_PREFIX}{semana}/{INDICE}"
+
+
+def _clave_ultima(semana: str) -> str:
+    return f"{HISTORIAL_PREFIX}{semana}/{ULTIMA}"
+
+
+def _clave_version(semana: str, numero: int) -> str:
+    return f"{HISTORIAL_PREFIX}{semana}/v{numero:06d}"
+
+
+def _normalizar(data: Any) -> Any:
+    """Forma JSON pura (fechas → ISO), para que los deltas comparen igual."""
+    return json.loads(json.dumps(data, cls=DateEncoder))
+
+
+def _tamano(data: Any) -> int:
+    return len(json.dumps(data, separators=(",", ":")))
+
+
+# ─── Lectura ────────────────────────────────────────────────────────────────────
+
+async def listar_semanas() -> list[str]:
+    """fecha_inicio de todas las semanas con historial, de la más reciente a la más antigua."""
+    claves = await storage.get_async_storage().list_keys(HISTORIAL_PREFIX)
+    sufijo = f"/{INDICE}"
+    semanas = {k[len(HISTORIAL_PREFIX):-len(sufijo)] for k in claves if k.endswith(sufijo)}
+    return sorted(semanas, reverse=True)
+
+
+async def listar_versiones(semana: str) -> list[dict]:
+    """Metadatos de las versiones de una semana, en orden de creación."""
+    indice = await storage.get_async_storage().load(_clave_indice(semana))
+    if indice is None:
+        raise VersionNoEncontrada(f"No hay historial para la semana {semana}")
+    return indice
+
+
+def _cadena(indice: list[dict], numero: int) -> list[dict]:
+    """Entradas desde el snapshot más cercano hasta `numero` (en orden de aplicación)."""
+    por_numero = {e["version"]: e for e in indice}
+    if numero not in por_numero:
+        raise VersionNoEncontrada(f"La versión {numero} no existe")
+    cadena = [por_numero[numero]]
+    while cadena[-1]["tipo"] != TIPO_SNAPSHOT:
+        cadena.append(por_numero[cadena[-1]["base"]])
+    cadena.reverse()
+    return cadena
+
+
+async def _reconstruir(semana: str, indice: list[dict], numero: int) -> dict:
+    cadena = _cadena(indice, numero)
+    claves = [_clave_version(semana, e["version"]) for e in cadena]
+    contenidos = await storage.load_many(claves)
+    data = contenidos[claves[0]]
+    for clave in claves[1:]:
+        data = aplicar_delta(data, contenidos[clave])
+    return data
+
+
+async def _estado(semana: str) -> tuple[list[dict], Optional[str], Optional[dict], Optional[str]]:
+    """
+    Índice de la semana y su versión en storage (para el CAS), la última
+    versión materializada (None sin historial) y la versión de `ultima`.
+    """
+    clave_indice, clave_ultima = _clave_indice(semana), _clave_ultima(semana)
+    datos = await storage.get_async_storage().load_many_versioned([clave_indice, clave_ultima])
+    indice, version_indice = datos[clave_indice]
+    ultima, version_ultima = datos[clave_ultima]
+    indice = list(indice or [])
+    if not indice:
+        return indice, version_indice, None, version_ultima
+    numero = indice[-1]["version"]
+    if ultima is not None and ultima.get("version") == numero:
+        return indice, version_indice, ultima["data"], version_ultima
+    return indice, version_indice, await _reconstruir(semana, indice, numero), version_ultima
+
+
+async def cargar_version(semana: str, numero: Optional[int] = None) -> dict:
+    """Proyección de la semana en la versión `numero` (la última si es None)."""
+    if numero is None:
+        indice, _, data, _ = await _estado(semana)
+        if not indice:
+            raise VersionNoEncontrada(f"No hay historial para la semana {semana}")
+        return data
+    indice = await listar_versiones(semana)
+    return await _reconstruir(semana, indice, numero)
+
+
+# ─── Escritura ──────────────────────────────────────────────────────────────────
+
+async def _guardar_ultima(semana: str, numero: int, data: dict, version_ultima: Optional[str]) -> None:
+    """Actualiza `ultima` tras escribir el índice. Con CAS: nunca pisa una más nueva."""
+    try:
+        await storage.get_async_storage().save(
+            _clave_ultima(semana), {"version": numero, "data": data},
+            if_version=version_ultima or storage.VERSION_INEXISTENTE,
+        )
+    except storage.ConflictoVersion:
+        # Otro escritor la actualizó; si quedó atrás del índice, se reconstruye al leer
+        logger.info(f"Historial {semana}: 'ultima' modificada concurrentemente, se deja")
+    except Exception as e:
+        # El índice ya quedó escrito: sin `ultima` solo se pierde el atajo
+        logger.warning(f"Historial {semana}: no se pudo actualizar 'ultima': {e}")
+
+
+def _nueva_version(indice: list[dict], anterior: Optional[dict], data: dict, origen: str, usuario: Optional[str]):
+    """
+    Entrada del índice (sin número) y contenido para agregar `data` después
+    de la última versión de `indice` (`anterior`, ya reconstruida): un delta
+    o un snapshot. None si no cambió respecto de la última.
+    """
+    from .config import HISTORIAL_SNAPSHOT_CADA
+
+    entrada: dict = {
+        "creado_en": datetime.now().isoformat(timespec="seconds"),
+        "origen": origen,
+        "usuario": usuario,
+        "total_pollos_semana": data.get("total_pollos_semana"),
+    }
+    contenido: Any = data
+    if indice:
+        ultima = indice[-1]
+        delta = calcular_delta(anterior, data)
+        if delta is None:
+            return None
+        desde_snapshot = len(_cadena(indice, ultima["version"]))
+        if desde_snapshot < HISTORIAL_SNAPSHOT_CADA and _tamano(delta) * 2 < _tamano(data):
+            contenido = delta
+            entrada.update(tipo=TIPO_DELTA, base=ultima["version"])
+    entrada.setdefault("tipo", TIPO_SNAPSHOT)
+    entrada.setdefault("base", None)
+    return entrada, contenido
+
+
+async def registrar(proyeccion: dict, origen: str, usuario: Optional[str] = None) -> int:
+    """
+    Agrega `proyeccion` como nueva versión del historial de su semana.
+    Retorna el número de versión. Si no cambió respecto de la última, no
+    agrega nada y retorna el número de la última.
+    """
+    async_st = storage.get_async_storage()
+    data = _normalizar(proyeccion)
+    semana = data["fecha_inicio"]
+    clave_indice = _clave_indice(semana)
+
+    for _ in range(REINTENTOS):
+        indice, version_indice, anterior, version_ultima = await _estado(semana)
+        nueva = _nueva_version(indice, anterior, data, origen, usuario)
+        if nueva is None:
+            return indice[-1]["version"]
+        entrada, contenido = nueva
+
+        # Las versiones se crean con CAS "no existe": si un escritor concurrente
+        # dejó un número huérfano (escribió el contenido pero perdió el índice),
+        # se saltea.
+        numero = (indice[-1]["version"] if indice else 0) + 1
+        while True:
+            try:
+                await async_st.save(
+                    _clave_version(semana, numero), contenido, if_version=storage.VERSION_INEXISTENTE
+                )
+                break
+            except storage.ConflictoVersion:
+                numero += 1
+        entrada["version"] = numero
+        try:
+            await async_st.save(
+                clave_indice, indice + [entrada],
+                if_version=version_indice or storage.VERSION_INEXISTENTE,
+            )
+        except storage.ConflictoVersion:
+            logger.info(f"Historial {semana}: índice modificado concurrentemente, reintentando")
+            continue
+        logger.info(f"Historial {semana}: versión {numero} ({entrada['tipo']}, {origen})")
+        await _guardar_ultima(semana, numero, data, version_ultima)
+        return numero
+    raise storage.ConflictoVersion(clave_indice, None)
+
+
+async def _registrar_semana(semana: str, items: list[tuple[str, dict]], usuario: Optional[str]) -> list[int]:
+    """registrar_lote para una semana: todas sus versiones con una sola escritura del índice."""
+    async_st = storage.get_async_storage()
+    clave_indice = _clave_indice(semana)
+    desde = 1
+
+    for _ in range(REINTENTOS):
+        indice, version_indice, anterior, version_ultima = await _estado(semana)
+        numero = max(desde, (indice[-1]["version"] if indice else 0) + 1)
+        numeros, escrituras = [], {}
+        for origen, data in items:
+            nueva = _nueva_version(indice, anterior, data, origen, usuario)
+            if nueva is None:
+                numeros.append(indice[-1]["version"])
+                continue
+            entrada, contenido = nueva
+            entrada["version"] = numero
+            indice.append(entrada)
+            escrituras[_clave_version(semana, numero)] = contenido
+            numeros.append(numero)
+            anterior = data
+            numero += 1
+        if not escrituras:
+            return numeros
+
+        resultados = await asyncio.gather(
+            *(async_st.save(clave, contenido, if_version=storage.VERSION_INEXISTENTE)
+              for clave, contenido in escrituras.items()),
+            return_exceptions=True,
+        )
+        errores = [r for r in resultados if isinstance(r, BaseException)]
+        if any(not isinstance(e, storage.ConflictoVersion) for e in errores):
+            raise next(e for e in errores if not isinstance(e, storage.ConflictoVersion))
+        if errores:
+            # Números huérfanos de otro escritor: se reintenta después de ellos
+            # (los contenidos ya escritos quedan huérfanos a su vez)
+            desde = numero
+            logger.info(f"Historial {semana}: versiones ya ocupadas, reintentando desde v{desde}")
+            continue
+        try:
+            await async_st.save(clave_indice, indice, if_version=version_indice or storage.VERSION_INEXISTENTE)
+        except storage.ConflictoVersion:
+            desde = numero
+            logger.info(f"Historial {semana}: índice modificado concurrentemente, reintentando")
+            continue
+        logger.info(f"Historial {semana}: {len(escrituras)} versiones importadas")
+        await _guardar_ultima(semana, indice[-1]["version"], anterior, version_ultima)
+        return numeros
+    raise storage.ConflictoVersion(clave_indice, None)
+
+
+async def registrar_lote(
+    proyecciones: list[tuple[str, dict]], usuario: Optional[str] = None,
+) -> dict[str, list[int]]:
+    """
+    Agrega muchas proyecciones de una vez (p. ej. la importación de PROYEC1
+    históricas), como pares (origen, proyección) en orden. Cada semana se
+    escribe con un solo índice y sus versiones en paralelo, y las semanas
+    entre sí también en paralelo. Las versiones se encadenan igual que con
+    registrar. Retorna {semana: [número de versión de cada proyección]}.
+    """
+    por_semana: dict[str, list[tuple[str, dict]]] = {}
+    for origen, proyeccion in proyecciones:
+        data = _normalizar(proyeccion)
+        por_semana.setdefault(data["fecha_inicio"], []).append((origen, data))
+    numeros = await asyncio.gather(
+        *(_registrar_semana(semana, items, usuario) for semana, items in por_semana.items())
+    )
+    return dict(zip(por_semana, numeros))
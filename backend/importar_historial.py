@@ -0,0 +1,100 @@
+"""
+Importación de proyecciones históricas (planillas PROYEC1) al historial.
+
+Cada planilla se lee entera con parser_excel.leer_proyeccion_completa; las
+planillas de un directorio se parsean en paralelo en un pool de procesos
+(el parseo es CPU-bound) y las proyecciones se escriben de una vez con
+historial.registrar_lote. Una planilla que no se puede leer se informa y
+no frena al resto.
+
+Uso:
+    python -m backend.importar_historial DIRECTORIO [--workers N] [--usuario U]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from . import historial
+from .parser_excel import HOJA_PROYEC1, leer_proyeccion_completa
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONES_PROYEC1 = (".xlsx", ".xls")
+ORIGEN = "importacion"
+
+
+def buscar_planillas(directorio: str | os.PathLike) -> list[Path]:
+    """Planillas Excel del directorio (y subdirectorios), en orden de nombre."""
+    return sorted(
+        p for p in Path(directorio).rglob("*")
+        if p.is_file() and p.suffix.lower() in EXTENSIONES_PROYEC1 and not p.name.startswith("~$")
+    )
+
+
+def _leer(ruta: str, sheet_name: str) -> dict:
+    # A nivel de módulo: se ejecuta en el pool de procesos
+    return leer_proyeccion_completa(ruta, sheet_name).model_dump(mode="json")
+
+
+async def importar_directorio(
+    directorio: str | os.PathLike,
+    workers: Optional[int] = None,
+    usuario: Optional[str] = None,
+    sheet_name: str = HOJA_PROYEC1,
+) -> dict:
+    """
+    Importa al historial todas las planillas PROYEC1 de `directorio`.
+    Retorna {"importadas": [{archivo, semana, version}], "errores": [{archivo, error}]}.
+    """
+    planillas = buscar_planillas(directorio)
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        resultados = await asyncio.gather(
+            *(loop.run_in_executor(executor, _leer, str(p), sheet_name) for p in planillas),
+            return_exceptions=True,
+        )
+
+    leidas, errores = [], []
+    for planilla, resultado in zip(planillas, resultados):
+        if isinstance(resultado, Exception):
+            logger.warning(f"Importación: no se pudo leer {planilla}: {resultado}")
+            errores.append({"archivo": str(planilla), "error": str(resultado)})
+        else:
+            leidas.append((planilla, resultado))
+
+    numeros = await historial.registrar_lote(
+        [(f"{ORIGEN}:{planilla.name}", proyeccion) for planilla, proyeccion in leidas], usuario=usuario,
+    )
+    pendientes = {semana: iter(lista) for semana, lista in numeros.items()}
+    importadas = [
+        {"archivo": str(planilla), "semana": p["fecha_inicio"], "version": next(pendientes[p["fecha_inicio"]])}
+        for planilla, p in leidas
+    ]
+    logger.info(f"Importación: {len(importadas)} planillas importadas, {len(errores)} con error")
+    return {"importadas": importadas, "errores": errores}
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Importa planillas PROYEC1 históricas al historial de proyecciones.")
+    parser.add_argument("directorio")
+    parser.add_argument("--workers", type=int, default=None, help="procesos de parseo (por defecto, uno por CPU)")
+    parser.add_argument("--usuario", default=None)
+    parser.add_argument("--hoja", default=HOJA_PROYEC1)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    resultado = asyncio.run(importar_directorio(args.directorio, args.workers, args.usuario, args.hoja))
+    for error in resultado["errores"]:
+        print(f"ERROR {error['archivo']}: {error['error']}")
+    print(f"{len(resultado['importadas'])} planillas importadas, {len(resultado['errores'])} con error")
+    return 1 if resultado["errores"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,12 +1,18 @@
 """
 API FastAPI para la planificación de faena avícola.
 """
+import asyncio
+import hashlib
 import logging
+import os
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 from datetime import date, timedelta
 from typing import List, Optional
 
@@ -24,24 +30,26 @@ from .auth import (
 
 from .calculo import (
     Parametros, LoteOferta, LoteProyectado, DiaFaena, SemanaFaena,
-    AjusteMartesResumen, aplicar_ajuste_martes,
-    calcular_lote_proyectado, calcular_dia_faena, calcular_semana_faena,
+    AjusteMartesResumen,
+    calcular_lote_proyectado,
     generar_proyeccion, ordenar_oferta_por_prioridad,
     calcular_edad_fin_retiro_v2, diferencia_edad_ideal,
     peso_vivo_retiro, peso_faenado, calibre_promedio, cajas_lote,
 )
-from .parser_excel import leer_oferta_excel
+from .parser_excel import (
+    FILAS_VISTA_PREVIA, PARSER_VERSION, inspeccionar_excel, ofertas_desde_columnas,
+)
+from .parser_tabular import FORMATO_EXCEL, formato_de, leer_oferta_archivo
 from .config import CORS_ORIGINS, CORS_ALLOW_CREDENTIALS
-from . import storage
+from . import bitacora, duplicados, ediciones, export_excel, historial, storage, trabajos, uploads
+from .storage_async import ejecutar_io
 
 logger = logging.getLogger(__name__)
 
 
 # ─── Helpers: lectura directa de storage ────────────────────────────────────────
 
-def _get_parametros() -> Parametros:
-    """Lee parámetros desde storage. Devuelve defaults si no existen."""
-    data = storage.load_parametros()
+def _parametros_desde(data: Optional[dict]) -> Parametros:
     if data:
         try:
             return Parametros(**data)
@@ -50,9 +58,7 @@ def _get_parametros() -> Parametros:
     return Parametros()
 
 
-def _get_ofertas() -> list[LoteOferta]:
-    """Lee ofertas desde storage. Devuelve lista vacía si no existen."""
-    data = storage.load_ofertas()
+def _ofertas_desde(data: Optional[list]) -> list[LoteOferta]:
     if data:
         try:
             return [LoteOferta(**o) for o in data]
@@ -61,9 +67,7 @@ def _get_ofertas() -> list[LoteOferta]:
     return []
 
 
-def _get_proyeccion() -> Optional[SemanaFaena]:
-    """Lee proyección desde storage. Devuelve None si no existe."""
-    data = storage.load_proyeccion()
+def _proyeccion_desde(data: Optional[dict]) -> Optional[SemanaFaena]:
     if data:
         try:
             return SemanaFaena(**data)
@@ -72,6 +76,194 @@ def _get_proyeccion() -> Optional[SemanaFaena]:
     return None
 
 
+async def _get_parametros() -> Parametros:
+    """Lee parámetros desde storage. Devuelve defaults si no existen."""
+    return _parametros_desde(await storage.load_parametros())
+
+
+async def _get_ofertas() -> list[LoteOferta]:
+    """Lee ofertas desde storage. Devuelve lista vacía si no existen."""
+    return _ofertas_desde(await storage.load_ofertas())
+
+
+async def _get_proyeccion() -> Optional[SemanaFaena]:
+    """Lee proyección desde storage. Devuelve None si no existe."""
+    return _proyeccion_desde(await storage.load_proyeccion())
+
+
+async def _get_proyeccion_y_parametros() -> tuple[Optional[SemanaFaena], Parametros, str]:
+    """
+    Lee proyección y parámetros en un solo lote concurrente. También retorna
+    la versión de la proyección, para guardar la edición con compare-and-swap.
+    """
+    datos = await storage.load_many_versioned([storage.PROYECCION_KEY, storage.PARAMETROS_KEY])
+    data_proyeccion, version = datos[storage.PROYECCION_KEY]
+    return (
+        _proyeccion_desde(data_proyeccion),
+        _parametros_desde(datos[storage.PARAMETROS_KEY][0]),
+        version,
+    )
+
+
+AJUSTE_REINTENTOS = 3
+
+MSG_CONFLICTO = (
+    "La proyección fue modificada por otro usuario mientras se editaba. "
+    "Recargue la proyección e intente de nuevo."
+)
+
+
+async def _registrar_historial(proyeccion: dict, origen: str, usuario: Optional[str]) -> None:
+    """Agrega la proyección recién guardada al historial de su semana."""
+    try:
+        await historial.registrar(proyeccion, origen=origen, usuario=usuario)
+    except Exception as e:
+        # La proyección ya quedó guardada: un fallo del historial no revierte la edición
+        logger.warning(f"No se pudo registrar la proyección en el historial: {e}")
+
+
+async def _registrar_bitacora(
+    op: dict, usuario: Optional[str], base: dict, version_base: str,
+    resultado: dict, version_resultado: Optional[str],
+) -> None:
+    """Agrega la operación a la bitácora de ediciones (deshacer/rehacer)."""
+    try:
+        await bitacora.registrar(op, usuario, base, version_base, resultado, version_resultado)
+    except Exception as e:
+        logger.warning(f"No se pudo registrar la edición en la bitácora: {e}")
+
+
+async def _guardar_edicion(
+    resultado: SemanaFaena, version_leida: str, dias: Optional[list[int]],
+    op: dict, usuario: Optional[str], base: dict,
+) -> None:
+    """
+    Persiste una edición solo si nadie más escribió desde la lectura (409 si
+    no). `dias` son los índices de los días tocados (None: cualquiera), `op`
+    la operación que se registra en la bitácora y `base` la proyección previa.
+    """
+    data = resultado.model_dump()
+    try:
+        version = await storage.save_proyeccion(data, if_version=version_leida, dias_modificados=dias)
+    except storage.ConflictoVersion:
+        raise HTTPException(409, MSG_CONFLICTO)
+    await asyncio.gather(
+        _registrar_historial(data, op["tipo"], usuario),
+        _registrar_bitacora(op, usuario, base, version_leida, data, version),
+    )
+
+
+async def _get_ofertas_y_parametros() -> tuple[list[LoteOferta], Parametros]:
+    """Lee ofertas y parámetros en un solo lote concurrente."""
+    datos = await storage.load_many([storage.OFERTAS_KEY, storage.PARAMETROS_KEY])
+    return (
+        _ofertas_desde(datos[storage.OFERTAS_KEY]),
+        _parametros_desde(datos[storage.PARAMETROS_KEY]),
+    )
+
+
+# ─── Helpers: parseo de uploads con cache ──────────────────────────────────────
+
+MSG_FORMATO_OFERTA = "El archivo debe ser .xlsx, .xls, .csv, .parquet o .arrow"
+
+
+async def _fuente(recibido: uploads.ArchivoRecibido):
+    """Fuente del parser para el pool de CPU (picklable si el pool es de procesos)."""
+    return await ejecutar_io(recibido.fuente, trabajos.get_pool().modo == trabajos.MODO_PROCESOS)
+
+
+async def _leer_columnas_cacheadas(
+    recibido: uploads.ArchivoRecibido, sheet_name: Optional[str],
+) -> dict:
+    """
+    Oferta columnar de un archivo subido, salvo que ese mismo contenido
+    (SHA-256) y hoja ya se hayan parseado con esta versión del parser.
+    Error de parseo → 400.
+    """
+    digest = recibido.digest
+    cacheada = await storage.load_ofertas_upload(digest, sheet_name, PARSER_VERSION)
+    if cacheada is not None:
+        return cacheada
+
+    try:
+        # Se parsea y valida por columnas en el pool; el resultado es a la vez
+        # la entrada del cache y la fuente de los modelos (sin revalidar)
+        columnas = await trabajos.ejecutar(
+            leer_oferta_archivo, await _fuente(recibido), recibido.nombre, sheet_name,
+        )
+    except trabajos.ColaLlena:
+        raise
+    except Exception as e:
+        raise HTTPException(400, f"Error al leer el archivo {recibido.nombre}: {str(e)}")
+    await storage.save_ofertas_upload(digest, sheet_name, PARSER_VERSION, columnas)
+    return columnas
+
+
+async def _leer_oferta_revisada(
+    recibido: uploads.ArchivoRecibido, sheet_name: Optional[str], fusionar: bool,
+) -> tuple[list[LoteOferta], dict]:
+    """Oferta del archivo y reporte de lotes repetidos (ver duplicados.combinar)."""
+    columnas = await _leer_columnas_cacheadas(recibido, sheet_name)
+    combinada, reporte = duplicados.combinar([(recibido.nombre, columnas)], fusionar=fusionar)
+    return ofertas_desde_columnas(combinada), reporte
+
+
+def _resumen_oferta(ofertas: list[LoteOferta]) -> dict:
+    """Respuesta de los endpoints de carga: totales, resumen por granja y lotes."""
+    resumen = {}
+    for o in ofertas:
+        if o.granja not in resumen:
+            resumen[o.granja] = {"lotes": 0, "pollos": 0}
+        resumen[o.granja]["lotes"] += 1
+        resumen[o.granja]["pollos"] += o.cantidad
+
+    return {
+        "total_lotes": len(ofertas),
+        "total_pollos": sum(o.cantidad for o in ofertas),
+        "granjas": resumen,
+        "ofertas": [o.model_dump() for o in ofertas],
+    }
+
+
+async def _archivar_upload(recibido: uploads.ArchivoRecibido, usuario: Optional[str]) -> None:
+    await storage.save_upload_archivo(
+        recibido.nombre, recibido.abrir(), recibido.tamano, recibido.digest, usuario=usuario,
+    )
+
+
+# ─── Helpers: GET condicional (ETag / If-None-Match) ───────────────────────────
+
+async def _etag_recurso(recurso: str, key: str) -> str:
+    """
+    ETag fuerte derivado de la versión en storage (generación GCS / mtime local).
+    No requiere descargar ni re-serializar el objeto.
+    """
+    version = await storage.get_version(key) or "vacio"
+    digest = hashlib.sha256(f"{recurso}:{version}".encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def _etag_coincide(request: Request, etag: str) -> bool:
+    """True si el cliente ya tiene la representación `etag` (If-None-Match)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidatos = [c.strip() for c in header.split(",")]
+    # Comparación débil (RFC 9110 §13.1.2): se ignora el prefijo W/
+    return any(c.removeprefix("W/") == etag for c in candidatos)
+
+
+def _no_modificado(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def _respuesta_con_etag(contenido, etag: str) -> JSONResponse:
+    return JSONResponse(
+        jsonable_encoder(contenido),
+        headers={"ETag": etag, "Cache-Control": "no-cache"},
+    )
+
+
 app = FastAPI(
     title="Proyección de Faena Avícola",
     description="API para planificación y proyección de faena avícola",
@@ -84,9 +276,37 @@ app.add_middleware(
     allow_credentials=CORS_ALLOW_CREDENTIALS,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
+)
+
+# Tamaño de los uploads controlado mientras se recibe el cuerpo (archivos por ruta)
+app.add_middleware(
+    uploads.LimiteCuerpo,
+    rutas={
+        "/oferta/upload": 1,
+        "/oferta/inspeccionar": 1,
+        "/oferta/ajuste-martes": 1,
+        "/oferta/upload-lote": None,
+    },
 )
 
 
+@app.exception_handler(trabajos.ColaLlena)
+async def _cola_llena(request: Request, exc: trabajos.ColaLlena):
+    """Pool de CPU saturado: el cliente debe reintentar más tarde."""
+    logger.warning(f"Pool de CPU saturado ({exc}); se rechaza {request.url.path}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "El servidor está procesando demasiados archivos. Intente de nuevo en unos segundos."},
+        headers={"Retry-After": "5"},
+    )
+
+
+@app.exception_handler(uploads.ArchivoDemasiadoGrande)
+async def _archivo_demasiado_grande(request: Request, exc: uploads.ArchivoDemasiadoGrande):
+    return JSONResponse(status_code=413, content={"detail": str(exc)})
+
+
 # ─── Request/Response Models ────────────────────────────────────────────────────
 
 class ProyeccionRequest(BaseModel):
@@ -138,7 +358,7 @@ class ParametrosUpdate(BaseModel):
 # ─── Endpoints ──────────────────────────────────────────────────────────────────
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "API Proyección de Faena Avícola", "version": "1.0.0"}
 
 
@@ -159,74 +379,181 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 
 
 @app.get("/parametros")
-def get_parametros(current_user: TokenData = Depends(get_current_user)):
-    """Obtener parámetros actuales."""
-    return _get_parametros()
+async def get_parametros(request: Request, current_user: TokenData = Depends(get_current_user)):
+    """Obtener parámetros actuales. Soporta GET condicional vía If-None-Match."""
+    etag = await _etag_recurso("parametros", storage.PARAMETROS_KEY)
+    if _etag_coincide(request, etag):
+        return _no_modificado(etag)
+    return _respuesta_con_etag((await _get_parametros()).model_dump(), etag)
 
 
 @app.put("/parametros")
-def update_parametros(update: ParametrosUpdate, current_user: TokenData = Depends(get_current_user)):
+async def update_parametros(update: ParametrosUpdate, current_user: TokenData = Depends(get_current_user)):
     """Actualizar parámetros de cálculo."""
-    current = _get_parametros().model_dump()
+    current = (await _get_parametros()).model_dump()
     for key, value in update.model_dump(exclude_none=True).items():
         current[key] = value
     params = Parametros(**current)
-    storage.save_parametros(params.model_dump())
+    await storage.save_parametros(params.model_dump())
     return params
 
 
 @app.post("/oferta/upload")
-async def upload_oferta(file: UploadFile = File(...), sheet_name: Optional[str] = None, current_user: TokenData = Depends(get_current_user)):
+async def upload_oferta(
+    file: UploadFile = File(...),
+    sheet_name: Optional[str] = None,
+    fusionar: bool = False,
+    current_user: TokenData = Depends(get_current_user),
+):
     """
-    Subir archivo Excel de oferta de granjas.
-    Acepta formato OFERTA JUEV o similar.
+    Subir archivo de oferta de granjas.
+    Acepta Excel con formato OFERTA JUEV o similar, o la exportación del
+    sistema de granjas en CSV, Parquet o Arrow (columnas por encabezado).
+    Los lotes repetidos (misma clave de lote) se informan en `duplicados`;
+    con `fusionar` se conserva solo la primera fila de cada lote.
     """
-    if not file.filename.endswith(('.xlsx', '.xls')):
-        raise HTTPException(400, "El archivo debe ser .xlsx o .xls")
+    if formato_de(file.filename) is None:
+        raise HTTPException(400, MSG_FORMATO_OFERTA)
 
-    content = await file.read()
+    recibido = await uploads.recibir(file)
     try:
-        ofertas = leer_oferta_excel(content, sheet_name)
-    except Exception as e:
-        raise HTTPException(400, f"Error al leer el archivo: {str(e)}")
+        ofertas, reporte = await _leer_oferta_revisada(recibido, sheet_name, fusionar)
 
-    # Persistir ofertas y archivo original
-    storage.save_ofertas([o.model_dump() for o in ofertas])
-    storage.save_upload(file.filename, content)
+        # Persistir ofertas y archivo original
+        await asyncio.gather(
+            storage.save_ofertas([o.model_dump() for o in ofertas]),
+            _archivar_upload(recibido, current_user.username),
+        )
+    finally:
+        recibido.cerrar()
 
-    # Resumen por granja
-    resumen = {}
-    for o in ofertas:
-        if o.granja not in resumen:
-            resumen[o.granja] = {"lotes": 0, "pollos": 0}
-        resumen[o.granja]["lotes"] += 1
-        resumen[o.granja]["pollos"] += o.cantidad
+    return {**_resumen_oferta(ofertas), "duplicados": reporte}
+
+
+@app.post("/oferta/upload-lote")
+async def upload_oferta_lote(
+    files: List[UploadFile] = File(...),
+    sheet_name: Optional[str] = None,
+    fusionar: bool = True,
+    current_user: TokenData = Depends(get_current_user),
+):
+    """
+    Subir varias ofertas a la vez (p. ej. una planilla por granja o por
+    integrador), como archivos sueltos y/o dentro de un .zip. Se parsean en
+    paralelo, se combinan en una sola oferta y se guardan de una vez,
+    reemplazando la oferta actual. Los lotes repetidos se informan en
+    `duplicados` y, salvo `fusionar=false`, se conserva solo el primero.
+    """
+    from .config import UPLOAD_MAX_ARCHIVOS
+
+    for f in files:
+        if formato_de(f.filename) is None and not uploads.es_zip(f.filename):
+            raise HTTPException(400, f"{f.filename}: {MSG_FORMATO_OFERTA} (o un .zip con ellos)")
+    if len(files) > UPLOAD_MAX_ARCHIVOS:
+        raise HTTPException(400, str(uploads.ArchivosDeMas(len(files), UPLOAD_MAX_ARCHIVOS)))
+
+    subidos: list[uploads.ArchivoRecibido] = []
+    extraidos: list[uploads.ArchivoRecibido] = []
+    try:
+        a_parsear: list[uploads.ArchivoRecibido] = []
+        for f in files:
+            recibido = await uploads.recibir(f)
+            subidos.append(recibido)
+            if uploads.es_zip(f.filename):
+                try:
+                    del_zip = await ejecutar_io(
+                        uploads.extraer_zip, recibido, lambda n: formato_de(n) is not None,
+                    )
+                except (ValueError, uploads.ArchivosDeMas) as e:
+                    raise HTTPException(400, str(e))
+                extraidos.extend(del_zip)
+                a_parsear.extend(del_zip)
+            else:
+                a_parsear.append(recibido)
+        if not a_parsear:
+            raise HTTPException(400, "No se recibió ningún archivo de oferta")
+        if len(a_parsear) > UPLOAD_MAX_ARCHIVOS:
+            raise HTTPException(400, str(uploads.ArchivosDeMas(len(a_parsear), UPLOAD_MAX_ARCHIVOS)))
+
+        # Parseo concurrente en el pool de CPU, sin pedir más lugares que
+        # workers tiene (el resto de la cola queda para otras requests)
+        limite = asyncio.Semaphore(trabajos.get_pool().workers)
+
+        async def parsear(recibido: uploads.ArchivoRecibido) -> dict:
+            async with limite:
+                return await _leer_columnas_cacheadas(recibido, sheet_name)
+
+        partes = await asyncio.gather(*(parsear(r) for r in a_parsear))
+        combinada, reporte = duplicados.combinar(
+            [(r.nombre, p) for r, p in zip(a_parsear, partes)], fusionar=fusionar,
+        )
+        ofertas = ofertas_desde_columnas(combinada)
+
+        # Se archiva lo que subió el usuario (los .zip tal cual) y la oferta se guarda una vez
+        await asyncio.gather(
+            storage.save_ofertas([o.model_dump() for o in ofertas]),
+            *(_archivar_upload(r, current_user.username) for r in subidos),
+        )
+    finally:
+        for r in subidos + extraidos:
+            r.cerrar()
 
     return {
-        "total_lotes": len(ofertas),
-        "total_pollos": sum(o.cantidad for o in ofertas),
-        "granjas": resumen,
-        "ofertas": [o.model_dump() for o in ofertas],
+        **_resumen_oferta(ofertas),
+        "archivos": [
+            {"nombre": r.nombre, "lotes": p["n"]} for r, p in zip(a_parsear, partes)
+        ],
+        "duplicados": reporte,
     }
 
 
+@app.post("/oferta/inspeccionar")
+async def inspeccionar_oferta(
+    file: UploadFile = File(...),
+    sheet_name: Optional[str] = None,
+    filas: int = Query(FILAS_VISTA_PREVIA, ge=1, le=100),
+    current_user: TokenData = Depends(get_current_user),
+):
+    """
+    Hojas de un Excel de oferta y vista previa de las primeras filas, para
+    elegir `sheet_name` antes de subirlo. No parsea el libro completo.
+    """
+    if formato_de(file.filename) != FORMATO_EXCEL:
+        raise HTTPException(400, "Solo los archivos Excel (.xlsx, .xls) tienen hojas para inspeccionar")
+
+    recibido = await uploads.recibir(file)
+    try:
+        return await trabajos.ejecutar(inspeccionar_excel, await _fuente(recibido), sheet_name, filas)
+    except trabajos.ColaLlena:
+        raise
+    except Exception as e:
+        raise HTTPException(400, f"Error al leer el archivo: {str(e)}")
+    finally:
+        recibido.cerrar()
+
+
 @app.get("/oferta")
-def get_oferta(current_user: TokenData = Depends(get_current_user)):
-    """Obtener oferta cargada."""
-    ofertas = _get_ofertas()
-    return {
+async def get_oferta(request: Request, current_user: TokenData = Depends(get_current_user)):
+    """Obtener oferta cargada. Soporta GET condicional vía If-None-Match."""
+    etag = await _etag_recurso("oferta", storage.OFERTAS_KEY)
+    if _etag_coincide(request, etag):
+        return _no_modificado(etag)
+    ofertas = await _get_ofertas()
+    return _respuesta_con_etag({
         "total_lotes": len(ofertas),
         "total_pollos": sum(o.cantidad for o in ofertas),
         "ofertas": [o.model_dump() for o in ofertas],
-    }
+    }, etag)
 
 
 @app.delete("/oferta")
-def clear_oferta(current_user: TokenData = Depends(get_current_user)):
+async def clear_oferta(current_user: TokenData = Depends(get_current_user)):
     """Limpiar la oferta cargada."""
-    storage.delete_ofertas()
-    storage.delete_ofertas_martes()
-    storage.delete_proyeccion()
+    await asyncio.gather(
+        storage.delete_ofertas(),
+        storage.delete_ofertas_martes(),
+        storage.delete_proyeccion(),
+    )
     return {"message": "Oferta limpiada"}
 
 
@@ -234,60 +561,82 @@ def clear_oferta(current_user: TokenData = Depends(get_current_user)):
 async def upload_ajuste_martes(
     file: UploadFile = File(...),
     sheet_name: Optional[str] = None,
+    fusionar: bool = False,
     current_user: TokenData = Depends(get_current_user),
 ):
     """
     Subir oferta del martes para ajustar la proyección existente.
     Matchea lotes por (granja, galpon, nucleo, sexo, fecha_ingreso),
     actualiza datos y recalcula preservando las asignaciones de día.
+    Con lotes repetidos en la oferta el match es ambiguo: se informan en
+    `duplicados` (con `fusionar` se usa solo la primera fila de cada lote).
     """
-    if not file.filename.endswith(('.xlsx', '.xls')):
-        raise HTTPException(400, "El archivo debe ser .xlsx o .xls")
+    if formato_de(file.filename) is None:
+        raise HTTPException(400, MSG_FORMATO_OFERTA)
 
     # Verificar que existe una proyección para ajustar
-    semana = _get_proyeccion()
+    semana, params, version = await _get_proyeccion_y_parametros()
     if semana is None:
         raise HTTPException(400, "No hay proyección existente para ajustar. Genere una primero desde la pestaña Oferta.")
 
-    content = await file.read()
+    recibido = await uploads.recibir(file)
     try:
-        ofertas_martes = leer_oferta_excel(content, sheet_name)
-    except Exception as e:
-        raise HTTPException(400, f"Error al leer el archivo: {str(e)}")
-
-    if not ofertas_martes:
-        raise HTTPException(400, "El archivo no contiene lotes válidos.")
-
-    # Guardar oferta martes y archivo original
-    storage.save_ofertas_martes([o.model_dump() for o in ofertas_martes])
-    storage.save_upload(file.filename, content)
+        ofertas_martes, reporte = await _leer_oferta_revisada(recibido, sheet_name, fusionar)
 
-    # Aplicar ajuste
-    params = _get_parametros()
-    resultado, resumen = aplicar_ajuste_martes(ofertas_martes, semana, params)
+        if not ofertas_martes:
+            raise HTTPException(400, "El archivo no contiene lotes válidos.")
 
-    # Guardar proyección actualizada
-    storage.save_proyeccion(resultado.model_dump())
+        # Guardar oferta martes y archivo original
+        await asyncio.gather(
+            storage.save_ofertas_martes([o.model_dump() for o in ofertas_martes]),
+            _archivar_upload(recibido, current_user.username),
+        )
+    finally:
+        recibido.cerrar()
+
+    # Aplicar ajuste y guardar con compare-and-swap. El ajuste no depende de
+    # índices elegidos por el usuario, así que ante una escritura concurrente
+    # se puede reaplicar sobre la proyección nueva.
+    args = {"ofertas_martes": [o.model_dump(mode="json") for o in ofertas_martes]}
+    for intento in range(AJUSTE_REINTENTOS):
+        base = semana.model_dump()
+        resultado, resumen = await trabajos.ejecutar(ediciones.ajuste_martes, semana, params, ofertas_martes)
+        op = ediciones.operacion(ediciones.AJUSTE_MARTES, args, params)
+        try:
+            await _guardar_edicion(resultado, version, None, op, current_user.username, base)
+            break
+        except HTTPException as e:
+            if e.status_code != 409:
+                raise
+            logger.info(f"Ajuste martes: conflicto de versión (intento {intento + 1}), reaplicando")
+            semana, params, version = await _get_proyeccion_y_parametros()
+            if semana is None:
+                raise HTTPException(409, MSG_CONFLICTO)
+    else:
+        raise HTTPException(409, MSG_CONFLICTO)
 
     return {
         "proyeccion": resultado.model_dump(),
         "resumen_ajuste": resumen.model_dump(),
+        "duplicados": reporte,
     }
 
 
 @app.post("/proyeccion/generar")
-def generar_proyeccion_endpoint(req: ProyeccionRequest, current_user: TokenData = Depends(get_current_user)):
+async def generar_proyeccion_endpoint(req: ProyeccionRequest, current_user: TokenData = Depends(get_current_user)):
     """
     Genera la proyección de faena automática.
     Toma la oferta cargada y la distribuye en los días de la semana.
     """
-    ofertas = _get_ofertas()
+    ofertas, params_guardados = await _get_ofertas_y_parametros()
     if not ofertas:
         raise HTTPException(400, "No hay oferta cargada. Suba un archivo primero.")
 
-    params = req.parametros or _get_parametros()
+    params = req.parametros or params_guardados
 
-    semana = generar_proyeccion(
+    # Cálculo CPU-bound: fuera del event loop
+    semana = await trabajos.ejecutar(
+        generar_proyeccion,
         ofertas=ofertas,
         fecha_inicio_semana=req.fecha_inicio_semana,
         dias_faena=req.dias_faena,
@@ -296,163 +645,207 @@ def generar_proyeccion_endpoint(req: ProyeccionRequest, current_user: TokenData
     )
 
     # Persistir proyección y parámetros usados
-    storage.save_proyeccion(semana.model_dump())
-    storage.save_parametros(params.model_dump())
-    return semana.model_dump()
+    data = semana.model_dump()
+    version, _ = await asyncio.gather(
+        storage.save_proyeccion(data),
+        storage.save_parametros(params.model_dump()),
+    )
+    await asyncio.gather(
+        _registrar_historial(data, "generar", current_user.username),
+        bitacora.iniciar(data, version),
+    )
+    return data
 
 
 @app.get("/proyeccion")
-def get_proyeccion(current_user: TokenData = Depends(get_current_user)):
-    """Obtener la proyección actual."""
-    proyeccion = _get_proyeccion()
+async def get_proyeccion(request: Request, current_user: TokenData = Depends(get_current_user)):
+    """Obtener la proyección actual. Soporta GET condicional vía If-None-Match."""
+    etag = await _etag_recurso("proyeccion", storage.PROYECCION_KEY)
+    if _etag_coincide(request, etag):
+        return _no_modificado(etag)
+    proyeccion = await _get_proyeccion()
     if proyeccion is None:
         raise HTTPException(404, "No hay proyección generada aún.")
-    return proyeccion.model_dump()
+    return _respuesta_con_etag(proyeccion.model_dump(), etag)
 
 
-@app.post("/proyeccion/mover-lote")
-def mover_lote(asignacion: AsignacionManual, current_user: TokenData = Depends(get_current_user)):
-    """Mover un lote de un día a otro manualmente."""
-    semana = _get_proyeccion()
+@app.get("/proyeccion/export.xlsx")
+async def exportar_proyeccion_excel(current_user: TokenData = Depends(get_current_user)):
+    """
+    Descargar la proyección actual como Excel con el layout de PROYEC1. El
+    libro se escribe en streaming (openpyxl write_only) a un temporal en el
+    pool de CPU y se envía por bloques.
+    """
+    semana, params, _ = await _get_proyeccion_y_parametros()
     if semana is None:
         raise HTTPException(404, "No hay proyección generada aún.")
+    ruta = await trabajos.ejecutar(export_excel.exportar_a_temporal, semana, params)
+    return FileResponse(
+        ruta,
+        media_type=export_excel.CONTENT_TYPE_XLSX,
+        filename=f"proyeccion_{semana.fecha_inicio.isoformat()}.xlsx",
+        background=BackgroundTask(os.unlink, ruta),
+    )
 
-    if asignacion.dia_origen < 0 or asignacion.dia_origen >= len(semana.dias) \
-       or asignacion.dia_destino < 0 or asignacion.dia_destino >= len(semana.dias):
-        raise HTTPException(400, "Índice de día inválido")
-
-    dia_origen = semana.dias[asignacion.dia_origen]
-    dia_destino = semana.dias[asignacion.dia_destino]
 
-    if asignacion.lote_index < 0 or asignacion.lote_index >= len(dia_origen.lotes):
-        raise HTTPException(400, "Índice de lote inválido")
+@app.get("/proyeccion/historial")
+async def listar_historial(current_user: TokenData = Depends(get_current_user)):
+    """Semanas (fecha_inicio) con proyecciones guardadas en el historial."""
+    return {"semanas": await historial.listar_semanas()}
 
-    # Extraer el lote
-    lote = dia_origen.lotes.pop(asignacion.lote_index)
 
-    # Recalcular con la nueva fecha
-    params = _get_parametros()
-    nueva_fecha = dia_destino.fecha
+@app.get("/proyeccion/historial/{fecha_inicio}")
+async def versiones_historial(fecha_inicio: date, current_user: TokenData = Depends(get_current_user)):
+    """Versiones guardadas de la proyección de una semana (solo metadatos)."""
+    try:
+        versiones = await historial.listar_versiones(fecha_inicio.isoformat())
+    except historial.VersionNoEncontrada as e:
+        raise HTTPException(404, str(e))
+    return {"fecha_inicio": fecha_inicio, "versiones": versiones}
 
-    # Usar datos originales de la oferta si están disponibles (preservados
-    # desde calcular_lote_proyectado). Si no existen (proyecciones antiguas),
-    # caemos al fallback anterior para compatibilidad.
-    fecha_peso = lote.fecha_peso_original or lote.fecha_fin_retiro
-    ganancia = lote.ganancia_diaria_original if lote.ganancia_diaria_original is not None else params.ganancia_diaria_macho
-    fecha_ingreso = lote.fecha_ingreso_original or fecha_peso
 
-    oferta_equiv = LoteOferta(
-        fecha_peso=fecha_peso,
-        granja=lote.granja,
-        galpon=lote.galpon,
-        nucleo=lote.nucleo,
-        cantidad=lote.cantidad,
-        sexo=lote.sexo,
-        edad_proyectada=lote.edad_actual,
-        peso_muestreo_proy=lote.peso_actual,
-        ganancia_diaria=ganancia,
-        dias_proyectados=0,
-        edad_real=lote.edad_actual,
-        peso_muestreo_real=lote.peso_actual,
-        fecha_ingreso=fecha_ingreso,
-    )
+@app.get("/proyeccion/historial/{fecha_inicio}/{version}")
+async def cargar_version_historial(
+    fecha_inicio: date, version: int, current_user: TokenData = Depends(get_current_user)
+):
+    """Proyección de una semana tal como quedó en la versión indicada."""
+    try:
+        return await historial.cargar_version(fecha_inicio.isoformat(), version)
+    except historial.VersionNoEncontrada as e:
+        raise HTTPException(404, str(e))
 
-    nuevo_lote = calcular_lote_proyectado(oferta_equiv, nueva_fecha, params)
-    dia_destino.lotes.append(nuevo_lote)
 
-    # Recalcular agregados de ambos días
-    semana.dias[asignacion.dia_origen] = calcular_dia_faena(dia_origen.fecha, dia_origen.lotes)
-    semana.dias[asignacion.dia_destino] = calcular_dia_faena(dia_destino.fecha, dia_destino.lotes)
+@app.post("/proyeccion/mover-lote")
+async def mover_lote(asignacion: AsignacionManual, current_user: TokenData = Depends(get_current_user)):
+    """Mover un lote de un día a otro manualmente."""
+    semana, params, version = await _get_proyeccion_y_parametros()
+    if semana is None:
+        raise HTTPException(404, "No hay proyección generada aún.")
 
-    # Recalcular semana (preservar lotes no asignados y fuera de rango)
-    resultado = calcular_semana_faena(
-        semana.fecha_inicio, semana.dias, params,
-        lotes_no_asignados=semana.lotes_no_asignados,
-        lotes_fuera_rango=semana.lotes_fuera_rango,
-    )
-    storage.save_proyeccion(resultado.model_dump())
+    base = semana.model_dump()
+    try:
+        resultado, dias = await trabajos.ejecutar(
+            ediciones.mover_lote,
+            semana, params, asignacion.lote_index, asignacion.dia_origen, asignacion.dia_destino,
+        )
+    except ediciones.EdicionInvalida as e:
+        raise HTTPException(400, str(e))
+    op = ediciones.operacion(ediciones.MOVER_LOTE, asignacion.model_dump(), params)
+    await _guardar_edicion(resultado, version, dias, op, current_user.username, base)
 
     return resultado.model_dump()
 
 
 @app.post("/proyeccion/agregar-lote")
-def agregar_lote(lote_req: LoteManualRequest, current_user: TokenData = Depends(get_current_user)):
+async def agregar_lote(lote_req: LoteManualRequest, current_user: TokenData = Depends(get_current_user)):
     """Agregar un lote manualmente a un día de faena."""
-    semana = _get_proyeccion()
+    semana, params, version = await _get_proyeccion_y_parametros()
     if semana is None:
         raise HTTPException(404, "No hay proyección generada aún.")
 
-    if lote_req.dia_faena < 0 or lote_req.dia_faena >= len(semana.dias):
-        raise HTTPException(400, "Índice de día inválido")
-
-    params = _get_parametros()
-    fecha_dia = semana.dias[lote_req.dia_faena].fecha
+    base = semana.model_dump()
+    args = lote_req.model_dump(mode="json")
+    try:
+        resultado, dias = await trabajos.ejecutar(ediciones.agregar_lote, semana, params, args)
+    except ediciones.EdicionInvalida as e:
+        raise HTTPException(400, str(e))
+    op = ediciones.operacion(ediciones.AGREGAR_LOTE, args, params)
+    await _guardar_edicion(resultado, version, dias, op, current_user.username, base)
 
-    oferta = LoteOferta(
-        fecha_peso=lote_req.fecha_peso,
-        granja=lote_req.granja,
-        galpon=lote_req.galpon,
-        nucleo=lote_req.nucleo,
-        cantidad=lote_req.cantidad,
-        sexo=lote_req.sexo,
-        edad_proyectada=lote_req.edad_proyectada,
-        peso_muestreo_proy=lote_req.peso_muestreo_proy,
-        ganancia_diaria=lote_req.ganancia_diaria,
-        dias_proyectados=0,
-        edad_real=lote_req.edad_proyectada,
-        peso_muestreo_real=lote_req.peso_muestreo_proy,
-        fecha_ingreso=lote_req.fecha_ingreso,
-    )
+    return resultado.model_dump()
 
-    lote = calcular_lote_proyectado(oferta, fecha_dia, params)
-    semana.dias[lote_req.dia_faena].lotes.append(lote)
 
-    # Recalcular el día
-    dia = semana.dias[lote_req.dia_faena]
-    semana.dias[lote_req.dia_faena] = calcular_dia_faena(dia.fecha, dia.lotes)
+@app.delete("/proyeccion/lote/{dia_index}/{lote_index}")
+async def eliminar_lote(dia_index: int, lote_index: int, current_user: TokenData = Depends(get_current_user)):
+    """Eliminar un lote de un día de faena."""
+    semana, params, version = await _get_proyeccion_y_parametros()
+    if semana is None:
+        raise HTTPException(404, "No hay proyección generada aún.")
 
-    # Recalcular semana (preservar lotes no asignados y fuera de rango)
-    resultado = calcular_semana_faena(
-        semana.fecha_inicio, semana.dias, params,
-        lotes_no_asignados=semana.lotes_no_asignados,
-        lotes_fuera_rango=semana.lotes_fuera_rango,
+    base = semana.model_dump()
+    try:
+        resultado, dias = await trabajos.ejecutar(
+            ediciones.eliminar_lote, semana, params, dia_index, lote_index
+        )
+    except ediciones.EdicionInvalida as e:
+        raise HTTPException(400, str(e))
+    op = ediciones.operacion(
+        ediciones.ELIMINAR_LOTE, {"dia_index": dia_index, "lote_index": lote_index}, params
     )
-    storage.save_proyeccion(resultado.model_dump())
+    await _guardar_edicion(resultado, version, dias, op, current_user.username, base)
 
     return resultado.model_dump()
 
 
-@app.delete("/proyeccion/lote/{dia_index}/{lote_index}")
-def eliminar_lote(dia_index: int, lote_index: int, current_user: TokenData = Depends(get_current_user)):
-    """Eliminar un lote de un día de faena."""
-    semana = _get_proyeccion()
-    if semana is None:
+@app.get("/proyeccion/ediciones")
+async def listar_ediciones(current_user: TokenData = Depends(get_current_user)):
+    """Operaciones de la sesión de edición actual y posición del cursor."""
+    cabeza, _ = await bitacora.cargar_cabeza()
+    if cabeza is None:
+        return {"cursor": 0, "operaciones": [], "puede_deshacer": False, "puede_rehacer": False}
+    return {
+        "cursor": cabeza["cursor"],
+        "operaciones": await bitacora.operaciones(cabeza),
+        "puede_deshacer": cabeza["cursor"] > 0,
+        "puede_rehacer": cabeza["cursor"] < len(cabeza["linea"]),
+    }
+
+
+async def _mover_cursor_bitacora(deshacer: bool, usuario: Optional[str]) -> dict:
+    """Deshace o rehace una operación re-aplicando la bitácora en memoria."""
+    (cabeza, version_cabeza), (data_proyeccion, version) = await asyncio.gather(
+        bitacora.cargar_cabeza(), storage.load_proyeccion_versionada()
+    )
+    if data_proyeccion is None:
         raise HTTPException(404, "No hay proyección generada aún.")
+    if cabeza is None or cabeza.get("version_proyeccion") != version:
+        # La proyección guardada no es la que describe la bitácora
+        raise HTTPException(400, "No hay ediciones registradas para la proyección actual.")
 
-    if dia_index < 0 or dia_index >= len(semana.dias):
-        raise HTTPException(400, "Índice de día inválido")
+    cursor = cabeza["cursor"]
+    try:
+        if deshacer:
+            if cursor == 0:
+                raise HTTPException(400, "No hay ediciones para deshacer.")
+            posicion = cursor - 1
+            resultado = await bitacora.reconstruir(cabeza, posicion)
+            dias = None
+        else:
+            if cursor >= len(cabeza["linea"]):
+                raise HTTPException(400, "No hay ediciones para rehacer.")
+            posicion = cursor + 1
+            op = await bitacora.operacion_en(cabeza, cursor)
+            resultado, dias = await trabajos.ejecutar(
+                ediciones.aplicar_operacion, _proyeccion_desde(data_proyeccion), op
+            )
+    except bitacora.BitacoraIncompleta as e:
+        logger.error(f"Bitácora: {e}")
+        raise HTTPException(409, "La bitácora de ediciones está incompleta; no se puede deshacer ni rehacer.")
+
+    data = resultado.model_dump()
+    try:
+        nueva_version = await storage.save_proyeccion(data, if_version=version, dias_modificados=dias)
+    except storage.ConflictoVersion:
+        raise HTTPException(409, MSG_CONFLICTO)
+    await bitacora.mover_cursor(cabeza, version_cabeza, posicion, nueva_version, usuario)
+    await _registrar_historial(data, bitacora.DESHACER if deshacer else bitacora.REHACER, usuario)
+    return data
 
-    dia = semana.dias[dia_index]
-    if lote_index < 0 or lote_index >= len(dia.lotes):
-        raise HTTPException(400, "Índice de lote inválido")
 
-    dia.lotes.pop(lote_index)
+@app.post("/proyeccion/deshacer")
+async def deshacer_edicion(current_user: TokenData = Depends(get_current_user)):
+    """Deshace la última edición manual (o ajuste martes) aplicada."""
+    return await _mover_cursor_bitacora(True, current_user.username)
 
-    # Recalcular (preservar lotes no asignados y fuera de rango)
-    semana.dias[dia_index] = calcular_dia_faena(dia.fecha, dia.lotes)
-    params = _get_parametros()
-    resultado = calcular_semana_faena(
-        semana.fecha_inicio, semana.dias, params,
-        lotes_no_asignados=semana.lotes_no_asignados,
-        lotes_fuera_rango=semana.lotes_fuera_rango,
-    )
-    storage.save_proyeccion(resultado.model_dump())
 
-    return resultado.model_dump()
+@app.post("/proyeccion/rehacer")
+async def rehacer_edicion(current_user: TokenData = Depends(get_current_user)):
+    """Vuelve a aplicar la última edición deshecha."""
+    return await _mover_cursor_bitacora(False, current_user.username)
 
 
 @app.post("/calcular/lote-individual")
-def calcular_lote_individual(
+async def calcular_lote_individual(
     granja: str,
     galpon: int,
     nucleo: int,
@@ -465,7 +858,7 @@ def calcular_lote_individual(
     current_user: TokenData = Depends(get_current_user)
 ):
     """Calcular valores de un lote individual (para preview)."""
-    params = _get_parametros()
+    params = await _get_parametros()
     oferta = LoteOferta(
         fecha_peso=fecha_peso,
         granja=granja,
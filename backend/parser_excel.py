@@ -3,13 +3,19 @@ Parser de archivos Excel de oferta de granjas.
 Lee el formato de la pestaña 'OFERTA JUEV' y lo convierte en LoteOferta.
 Soporta tanto .xlsx (openpyxl) como .xls (xlrd).
 """
+import hashlib
+import os
+import threading
 import openpyxl
 import xlrd
-from datetime import date, datetime
-from typing import List, Optional, BinaryIO
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from itertools import chain, islice
+from typing import Iterator, List, NamedTuple, Optional, BinaryIO, Union
 from io import BytesIO
 
-from .calculo import LoteOferta
+from . import calculo
+from .calculo import LoteOferta, LoteProyectado, Parametros, SemanaFaena
 
 
 # Mapeo de columnas esperadas en la oferta (pestaña OFERTA JUEV / hoja de oferta)
@@ -31,6 +37,38 @@ COLUMNAS_OFERTA = {
 
 FILA_INICIO_DATOS = 4  # Fila donde empiezan los datos (1-indexed, fila 4 en Excel)
 
+# Nombres de encabezado aceptados por campo (normalizados con
+# normalizar_encabezado). En Excel se usan para detectar la fila de
+# encabezados; CSV y Parquet siempre mapean por encabezado.
+SINONIMOS_OFERTA = {
+    "fecha_peso": ("fecha_peso", "fecha_de_peso", "fecha"),
+    "granja": ("granja",),
+    "galpon": ("galpon", "pabellon"),
+    "nucleo": ("nucleo",),
+    "cantidad": ("cantidad", "pollos", "aves"),
+    "sexo": ("sexo", "sexo_m_h", "sexo_h_m"),
+    "edad_proyectada": ("edad_proyectada", "edad_proy"),
+    "peso_muestreo_proy": ("peso_muestreo_proy", "peso_muestreo_proyectado", "peso_proy"),
+    "ganancia_diaria": ("ganancia_diaria", "ganancia"),
+    "dias_proyectados": ("dias_proyectados", "dias_proy"),
+    "edad_real": ("edad_real",),
+    "peso_muestreo_real": ("peso_muestreo_real", "peso_real"),
+    "fecha_ingreso": ("fecha_ingreso", "fecha_de_ingreso", "ingreso"),
+}
+_CAMPOS_OBLIGATORIOS = ("fecha_peso", "granja")
+
+# Versión del parser: forma parte de la clave del cache de parseos, así que
+# hay que incrementarla cada vez que cambie el resultado de leer_oferta_excel.
+PARSER_VERSION = "5"
+
+# Ancho de una fila en el layout fijo (COLUMNAS_OFERTA), y cuántas filas
+# vacías seguidas se toleran en .xlsx antes de dar la hoja por terminada (las
+# hojas con formato suelen declarar miles de filas vacías al final).
+COLUMNAS_LEIDAS = 14
+MAX_FILAS_VACIAS = 50
+
+_CAMPOS_FECHA = ("fecha_peso", "fecha_ingreso")
+
 
 def _parse_date(val) -> Optional[date]:
     """Convierte un valor de celda a date."""
@@ -89,41 +127,145 @@ def _parse_sexo(val) -> str:
     return ""
 
 
+def normalizar_encabezado(val) -> str:
+    """'Fecha de Peso' → 'fecha_de_peso' (sin acentos, minúsculas, '_')."""
+    import re
+    import unicodedata
+
+    texto = unicodedata.normalize("NFKD", str(val or "")).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "_", texto.lower()).strip("_")
+
+
+def mapear_encabezados(encabezados, sinonimos: Optional[dict] = None, obligatorios=None) -> dict:
+    """
+    {campo: índice} según los nombres de `encabezados`. Lanza ValueError si
+    falta alguno de los campos obligatorios (por defecto los de la oferta:
+    fecha de peso, granja).
+    """
+    sinonimos = SINONIMOS_OFERTA if sinonimos is None else sinonimos
+    obligatorios = _CAMPOS_OBLIGATORIOS if obligatorios is None else obligatorios
+    indices = {}
+    for i, encabezado in enumerate(encabezados):
+        nombre = normalizar_encabezado(encabezado)
+        for campo, nombres in sinonimos.items():
+            if nombre in nombres and campo not in indices:
+                indices[campo] = i
+                break
+    faltantes = [c for c in obligatorios if c not in indices]
+    if faltantes:
+        raise ValueError(f"Faltan columnas obligatorias en el encabezado: {', '.join(faltantes)}")
+    return indices
+
+
 def leer_oferta_excel(
-    file_content: bytes,
+    file_content: Union[bytes, str, os.PathLike, BinaryIO],
     sheet_name: Optional[str] = None
 ) -> List[LoteOferta]:
     """
     Lee un archivo Excel de oferta y devuelve la lista de LoteOferta.
     
     Args:
-        file_content: contenido binario del archivo Excel
+        file_content: contenido binario del archivo Excel, la ruta a un
+            archivo en disco o el archivo ya abierto (spool de un upload)
         sheet_name: nombre de la pestaña (si None, usa la primera o busca 'OFERTA')
     
     Returns:
         Lista de LoteOferta parseados
     """
-    # Detectar formato: intentar primero con openpyxl (.xlsx)
-    # Si falla, intentar con xlrd (.xls)
-    is_xls = False
+    return ofertas_desde_columnas(leer_oferta_columnas(file_content, sheet_name))
+
+
+# Firmas de archivo: .xlsx es un ZIP (OOXML); .xls es un compound file OLE2 (BIFF)
+FIRMA_ZIP = b"PK\x03\x04"
+FIRMA_OLE2 = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+
+def _es_archivo(file_content) -> bool:
+    return hasattr(file_content, "read")
+
+
+def _firma(file_content: Union[bytes, str, os.PathLike, BinaryIO]) -> bytes:
+    if isinstance(file_content, (bytes, bytearray)):
+        return bytes(file_content[:8])
+    if _es_archivo(file_content):
+        file_content.seek(0)
+        firma = file_content.read(8)
+        file_content.seek(0)
+        return firma
+    with open(file_content, "rb") as f:
+        return f.read(8)
+
+
+def _contenido_xls(archivo: BinaryIO):
+    """Contenido de un .xls abierto para xlrd: mapeado en memoria si está en disco."""
+    import mmap
+
     try:
-        wb = openpyxl.load_workbook(BytesIO(file_content), data_only=True)
-    except Exception:
-        # Probablemente es un .xls (formato binario antiguo)
-        try:
-            wb = xlrd.open_workbook(file_contents=file_content)
-            is_xls = True
-        except Exception as e:
-            raise ValueError(f"No se pudo abrir el archivo Excel: {e}")
+        return mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError):
+        archivo.seek(0)
+        return archivo.read()
 
-    if is_xls:
-        return _leer_oferta_xlrd(wb, sheet_name)
+
+def _abrir_libro(file_content: Union[bytes, str, os.PathLike, BinaryIO], on_demand: bool = True):
+    """
+    Abre el workbook en modo perezoso, eligiendo el lector por la firma del
+    archivo: openpyxl read_only para .xlsx (las filas se leen en streaming
+    desde el XML de la hoja) o xlrd para .xls (con `on_demand` cada hoja se
+    decodifica recién al pedirla). Retorna (workbook, es_xls).
+    """
+    es_bytes = isinstance(file_content, (bytes, bytearray))
+    firma = _firma(file_content)
+    try:
+        if firma.startswith(FIRMA_ZIP):
+            origen = BytesIO(file_content) if es_bytes else file_content
+            return openpyxl.load_workbook(origen, read_only=True, data_only=True), False
+        if firma == FIRMA_OLE2:
+            if es_bytes:
+                wb = xlrd.open_workbook(file_contents=file_content, on_demand=on_demand)
+            elif _es_archivo(file_content):
+                wb = xlrd.open_workbook(file_contents=_contenido_xls(file_content), on_demand=on_demand)
+            else:
+                wb = xlrd.open_workbook(filename=os.fspath(file_content), on_demand=on_demand)
+            return wb, True
+    except Exception as e:
+        raise ValueError(f"No se pudo abrir el archivo Excel: {e}")
+    raise ValueError("No se pudo abrir el archivo Excel: el contenido no es .xlsx ni .xls")
+
+
+def _cerrar_libro(wb, es_xls: bool) -> None:
+    if es_xls:
+        wb.release_resources()
     else:
-        return _leer_oferta_openpyxl(wb, sheet_name)
+        wb.close()
 
 
-def _leer_oferta_openpyxl(wb, sheet_name: Optional[str]) -> List[LoteOferta]:
-    """Lee oferta desde un workbook de openpyxl (.xlsx)."""
+def leer_oferta_columnas(
+    file_content: Union[bytes, str, os.PathLike, BinaryIO],
+    sheet_name: Optional[str] = None,
+    validar: bool = True,
+) -> dict:
+    """
+    Como leer_oferta_excel, pero retorna la oferta en forma columnar (ver
+    ofertas_a_columnas) sin construir un modelo por fila. Con `validar` las
+    columnas se validan contra LoteOferta en una sola pasada.
+    """
+    wb, is_xls = _abrir_libro(file_content)
+    try:
+        if is_xls:
+            # on_demand: solo se decodifica la hoja de oferta
+            titulo, filas = _filas_xlrd(wb, sheet_name)
+            _, crudas = _extraer_oferta(titulo, filas, cortar_vacias=False)
+        else:
+            titulo, filas = _filas_openpyxl(wb, sheet_name)
+            _, crudas = _extraer_oferta(titulo, filas, cortar_vacias=True)
+    finally:
+        _cerrar_libro(wb, is_xls)
+    return decodificar_columnas(crudas, validar=validar)
+
+
+def _filas_openpyxl(wb, sheet_name: Optional[str]) -> tuple[str, Iterator[tuple]]:
+    """Título de la hoja de oferta y sus filas crudas (openpyxl, .xlsx), en streaming."""
     # Buscar la pestaña adecuada
     if sheet_name and sheet_name in wb.sheetnames:
         ws = wb[sheet_name]
@@ -139,16 +281,7 @@ def _leer_oferta_openpyxl(wb, sheet_name: Optional[str]) -> List[LoteOferta]:
         else:
             ws = wb.active
 
-    lotes: List[LoteOferta] = []
-
-    for row_idx in range(FILA_INICIO_DATOS, ws.max_row + 1):
-        row = [ws.cell(row=row_idx, column=c + 1).value for c in range(14)]
-        lote = _parse_row_to_lote(row)
-        if lote:
-            lotes.append(lote)
-
-    wb.close()
-    return lotes
+    return ws.title, ws.iter_rows(max_col=COLUMNAS_MAX, values_only=True)
 
 
 def _xlrd_cell_value(sheet, row, col):
@@ -168,8 +301,8 @@ def _xlrd_cell_value(sheet, row, col):
     return cell.value
 
 
-def _leer_oferta_xlrd(wb, sheet_name: Optional[str]) -> List[LoteOferta]:
-    """Lee oferta desde un workbook de xlrd (.xls)."""
+def _filas_xlrd(wb, sheet_name: Optional[str]) -> tuple[str, Iterator[tuple]]:
+    """Título de la hoja de oferta y sus filas crudas (xlrd, .xls)."""
     # Buscar la pestaña adecuada
     if sheet_name and sheet_name in wb.sheet_names():
         ws = wb.sheet_by_name(sheet_name)
@@ -184,94 +317,604 @@ def _leer_oferta_xlrd(wb, sheet_name: Optional[str]) -> List[LoteOferta]:
         else:
             ws = wb.sheet_by_index(0)
 
-    lotes: List[LoteOferta] = []
+    columnas = min(ws.ncols, COLUMNAS_MAX)
+    filas = (
+        tuple(_xlrd_cell_value(ws, row_idx, c) for c in range(columnas))
+        for row_idx in range(ws.nrows)
+    )
+    return ws.name, filas
 
-    # xlrd usa índices 0-based; FILA_INICIO_DATOS es 4 (1-indexed) → fila 3 en 0-indexed
-    for row_idx in range(FILA_INICIO_DATOS - 1, ws.nrows):
-        row = [_xlrd_cell_value(ws, row_idx, c) for c in range(14)]
-        lote = _parse_row_to_lote(row)
-        if lote:
-            lotes.append(lote)
 
-    return lotes
+# ─── Detección de encabezados (layout de la hoja) ───────────────────────────────
+# La fila de encabezados se busca entre las primeras FILAS_BUSQUEDA_ENCABEZADO
+# y las columnas se mapean por nombre (SINONIMOS_OFERTA). El layout detectado
+# se recuerda por hoja + huella de la fila de encabezados: la próxima planilla
+# con la misma plantilla solo compara la huella de esa fila. Si no se encuentra
+# un encabezado reconocible se usa el layout fijo histórico (COLUMNAS_OFERTA
+# desde FILA_INICIO_DATOS).
 
+FILAS_BUSQUEDA_ENCABEZADO = 20
+MIN_COLUMNAS_ENCABEZADO = 4  # campos reconocidos para aceptar una fila como encabezado
+COLUMNAS_MAX = 40            # columnas leídas por fila (el layout puede correrse)
+MAX_LAYOUTS = 64
 
-def _parse_row_to_lote(row: list) -> Optional[LoteOferta]:
-    """Convierte una fila de datos a LoteOferta. Retorna None si la fila es inválida."""
-    granja = row[COLUMNAS_OFERTA["granja"]]
-    if not granja or str(granja).strip() == "":
-        return None
 
-    fecha_peso = _parse_date(row[COLUMNAS_OFERTA["fecha_peso"]])
-    fecha_ingreso = _parse_date(row[COLUMNAS_OFERTA["fecha_ingreso"]])
+class _Layout(NamedTuple):
+    fila_encabezado: int      # 0-based; los datos empiezan en la fila siguiente
+    huella: Optional[str]     # None: layout fijo (sin encabezado reconocido)
+    indices: dict             # {campo: columna 0-based}
+
+
+_LAYOUT_FIJO = _Layout(FILA_INICIO_DATOS - 2, None, COLUMNAS_OFERTA)
+_layouts: "OrderedDict[str, list[_Layout]]" = OrderedDict()
+_layouts_lock = threading.Lock()
+
+
+def _huella_encabezado(fila: tuple) -> str:
+    texto = "\x1f".join(str(v).strip() if v is not None else "" for v in fila).rstrip("\x1f")
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+def _layout_cacheado(titulo: str, primeras: List[tuple]) -> Optional[_Layout]:
+    with _layouts_lock:
+        candidatos = list(_layouts.get(titulo, ()))
+    for layout in candidatos:
+        if layout.fila_encabezado < len(primeras) and \
+                _huella_encabezado(primeras[layout.fila_encabezado]) == layout.huella:
+            return layout
+    return None
+
+
+def _recordar_layout(titulo: str, layout: _Layout) -> None:
+    with _layouts_lock:
+        conocidos = [l for l in _layouts.pop(titulo, []) if l.huella != layout.huella]
+        _layouts[titulo] = [layout, *conocidos][:4]
+        while len(_layouts) > MAX_LAYOUTS:
+            _layouts.popitem(last=False)
+
+
+def _completar_por_posicion(fila: tuple, indices: dict) -> dict:
+    """
+    Los campos cuyo encabezado no se reconoce toman la columna del layout fijo
+    (COLUMNAS_OFERTA), si esa columna tiene encabezado y no es de otro campo.
+    """
+    completos = dict(indices)
+    usadas = set(indices.values())
+    for campo, posicion in COLUMNAS_OFERTA.items():
+        if (campo not in completos and posicion not in usadas
+                and posicion < len(fila) and fila[posicion] not in (None, "")):
+            completos[campo] = posicion
+            usadas.add(posicion)
+    return completos
+
+
+def _detectar_layout(primeras: List[tuple]) -> _Layout:
+    """
+    Layout según la primera fila reconocible como encabezado. Lanza
+    ValueError si a ese encabezado le falta algún campo de la oferta (en vez
+    de leerlo vacío en todos los lotes).
+    """
+    for i, fila in enumerate(primeras):
+        try:
+            indices = mapear_encabezados(fila)
+        except ValueError:
+            continue
+        if len(indices) >= MIN_COLUMNAS_ENCABEZADO:
+            indices = _completar_por_posicion(fila, indices)
+            faltantes = [campo for campo in COLUMNAS_OFERTA if campo not in indices]
+            if faltantes:
+                raise ValueError(
+                    f"Faltan columnas en el encabezado (fila {i + 1}): {', '.join(faltantes)}"
+                )
+            return _Layout(i, _huella_encabezado(fila), indices)
+    return _LAYOUT_FIJO
+
+
+def layout_de_hoja(titulo: str, primeras: List[tuple]) -> _Layout:
+    """
+    Layout de la hoja `titulo` según sus primeras filas: el cacheado si la
+    huella del encabezado coincide, si no se detecta (y se cachea).
+    """
+    layout = _layout_cacheado(titulo, primeras)
+    if layout is None:
+        layout = _detectar_layout(primeras)
+        if layout.huella is not None:
+            _recordar_layout(titulo, layout)
+    return layout
+
+
+def _extraer_oferta(
+    titulo: str, filas: Iterator[tuple], cortar_vacias: bool, limite: Optional[int] = None,
+) -> tuple[_Layout, dict]:
+    """
+    Layout y columnas crudas ({campo: valores}) de la hoja. Con
+    `cortar_vacias` la lectura termina tras MAX_FILAS_VACIAS filas vacías
+    seguidas (hojas .xlsx con formato que declaran miles de filas vacías al
+    final); con `limite`, tras esa cantidad de filas de datos.
+    """
+    primeras = list(islice(filas, FILAS_BUSQUEDA_ENCABEZADO))
+    layout = layout_de_hoja(titulo, primeras)
+    columnas = list(layout.indices.items())
+    crudas = {campo: [] for campo, _ in columnas}
+    vacias = 0
+    leidas = 0
+
+    for fila in chain(primeras[layout.fila_encabezado + 1:], filas):
+        if all(v is None or v == "" for v in fila):
+            vacias += 1
+            if cortar_vacias and vacias >= MAX_FILAS_VACIAS:
+                break
+            continue
+        if limite is not None and leidas >= limite:
+            break
+        leidas += 1
+        vacias = 0
+        largo = len(fila)
+        for campo, i in columnas:
+            crudas[campo].append(fila[i] if i < largo else None)
+    return layout, crudas
+
+
+# ─── Inspección (elegir hoja antes de subir) ────────────────────────────────────
+
+FILAS_VISTA_PREVIA = 10
+
+
+def inspeccionar_excel(
+    file_content: Union[bytes, str, os.PathLike, BinaryIO],
+    sheet_name: Optional[str] = None,
+    filas: int = FILAS_VISTA_PREVIA,
+) -> dict:
+    """
+    Hojas del libro (nombre y cantidad de filas) y las primeras `filas`
+    filas de oferta parseadas de la hoja que se usaría con `sheet_name`.
+    Solo se lee el comienzo de esa hoja; las demás no se decodifican. En
+    .xlsx la cantidad de filas sale de la dimensión declarada en la hoja (None
+    si el archivo no la trae); en .xls solo se conoce la de las hojas ya
+    cargadas (la elegida), las demás van con None.
+    """
+    wb, is_xls = _abrir_libro(file_content)
+    try:
+        if is_xls:
+            titulo, filas_hoja = _filas_xlrd(wb, sheet_name)
+            hojas = [
+                {"nombre": nombre, "filas": wb.sheet_by_name(nombre).nrows if wb.sheet_loaded(nombre) else None}
+                for nombre in wb.sheet_names()
+            ]
+        else:
+            titulo, filas_hoja = _filas_openpyxl(wb, sheet_name)
+            hojas = [{"nombre": ws.title, "filas": ws.max_row} for ws in wb.worksheets]
+        layout, crudas = _extraer_oferta(titulo, filas_hoja, cortar_vacias=True, limite=filas)
+    finally:
+        if is_xls:
+            for nombre in wb.sheet_names():
+                if wb.sheet_loaded(nombre):
+                    wb.unload_sheet(nombre)
+        _cerrar_libro(wb, is_xls)
+
+    ofertas = ofertas_desde_columnas(decodificar_columnas(crudas, validar=False))
+    return {
+        "hojas": hojas,
+        "hoja": titulo,
+        # 1-based como en Excel; None si se usó el layout fijo
+        "fila_encabezado": layout.fila_encabezado + 1 if layout.huella else None,
+        "columnas": {campo: i for campo, i in layout.indices.items()},
+        "vista_previa": [o.model_dump(mode="json") for o in ofertas],
+    }
+
+
+# ─── Decodificación por columnas ────────────────────────────────────────────────
+# Las filas crudas se transponen y cada columna se convierte de una vez, con
+# un conversor por tipo: los valores que ya vienen tipados (int/float/date de
+# openpyxl) pasan por el camino rápido, y los textos repetidos (sexo, fechas)
+# se convierten una sola vez por valor distinto.
+
+_FORMATOS_FECHA = ("%d/%m/%Y", "%Y-%m-%d", "%m/%d/%Y")
+
+
+class _ColumnaFecha:
+    """
+    Conversor de una columna de fechas. El formato de los textos se infiere
+    con el primero que se puede leer y se mantiene para toda la columna (una
+    fecha ambigua como 01/02 se lee igual que el resto de la columna); cada
+    texto distinto se convierte una sola vez.
+    """
+
+    def __init__(self):
+        self.formato: Optional[str] = None
+        self._cache: dict = {}
+
+    def _texto(self, val: str) -> Optional[date]:
+        val = val.strip()
+        formatos = _FORMATOS_FECHA if self.formato is None else (self.formato, *_FORMATOS_FECHA)
+        for fmt in formatos:
+            try:
+                resultado = datetime.strptime(val, fmt).date()
+            except ValueError:
+                continue
+            self.formato = self.formato or fmt
+            return resultado
+        return None
 
-    if not fecha_peso:
+    def __call__(self, val) -> Optional[date]:
+        if isinstance(val, datetime):
+            return val.date()
+        if isinstance(val, date):
+            return val
+        if isinstance(val, str):
+            if val not in self._cache:
+                self._cache[val] = self._texto(val)
+            return self._cache[val]
         return None
 
-    cantidad_raw = row[COLUMNAS_OFERTA["cantidad"]]
-    cantidad = _parse_int(cantidad_raw)
-    # Si la cantidad tiene punto de miles (ej: 15.685 → 15685)
-    if isinstance(cantidad_raw, float) and cantidad_raw > 100:
-        cantidad = int(cantidad_raw)
-    elif isinstance(cantidad_raw, (int, float)):
-        cantidad = int(cantidad_raw)
-
-    return LoteOferta(
-        fecha_peso=fecha_peso,
-        granja=str(granja).strip(),
-        galpon=_parse_int(row[COLUMNAS_OFERTA["galpon"]]),
-        nucleo=_parse_int(row[COLUMNAS_OFERTA["nucleo"]]),
-        cantidad=cantidad,
-        sexo=_parse_sexo(row[COLUMNAS_OFERTA["sexo"]]),
-        edad_proyectada=_parse_int(row[COLUMNAS_OFERTA["edad_proyectada"]]),
-        peso_muestreo_proy=_parse_float(row[COLUMNAS_OFERTA["peso_muestreo_proy"]]),
-        ganancia_diaria=_parse_float(row[COLUMNAS_OFERTA["ganancia_diaria"]]),
-        dias_proyectados=_parse_int(row[COLUMNAS_OFERTA["dias_proyectados"]]),
-        edad_real=_parse_int(row[COLUMNAS_OFERTA["edad_real"]]),
-        peso_muestreo_real=_parse_float(row[COLUMNAS_OFERTA["peso_muestreo_real"]]),
-        fecha_ingreso=fecha_ingreso or fecha_peso,
+
+def _columna_int(valores) -> List[int]:
+    return [v if type(v) is int else _parse_int(v) for v in valores]
+
+
+def _columna_float(valores) -> List[float]:
+    return [float(v) if type(v) in (int, float) else _parse_float(v) for v in valores]
+
+
+def _columna_sexo(valores) -> List[str]:
+    cache: dict = {}
+    return [cache[v] if v in cache else cache.setdefault(v, _parse_sexo(v)) for v in valores]
+
+
+def _columna_cantidad(valores) -> List[int]:
+    # Numéricas se truncan tal cual (15.685 leído como float ya son 15685 pollos)
+    return [int(v) if isinstance(v, (int, float)) else _parse_int(v) for v in valores]
+
+
+_ADAPTADOR_COLUMNAS = None
+
+
+def _adaptador_columnas():
+    """TypeAdapter de {campo: lista de valores} con los tipos de LoteOferta."""
+    global _ADAPTADOR_COLUMNAS
+    if _ADAPTADOR_COLUMNAS is None:
+        from pydantic import TypeAdapter
+        from typing_extensions import TypedDict
+
+        ColumnasOferta = TypedDict(
+            "ColumnasOferta", {c: List[f.annotation] for c, f in LoteOferta.model_fields.items()}
+        )
+        _ADAPTADOR_COLUMNAS = TypeAdapter(ColumnasOferta)
+    return _ADAPTADOR_COLUMNAS
+
+
+def validar_columnas(columnas: dict) -> dict:
+    """
+    Valida la oferta columnar contra los tipos de LoteOferta con una sola
+    llamada a pydantic (en vez de un modelo por fila). Lanza ValueError.
+    """
+    from pydantic import ValidationError
+
+    largos = {len(v) for v in columnas.values()}
+    if len(largos) > 1:
+        raise ValueError(f"Columnas de distinto largo: {sorted(largos)}")
+    try:
+        return _adaptador_columnas().validate_python(columnas)
+    except ValidationError as e:
+        raise ValueError(f"Oferta inválida: {e}")
+
+
+def decodificar_filas(filas: List[tuple], validar: bool = True) -> dict:
+    """
+    Convierte filas crudas de la hoja de oferta (posiciones de
+    COLUMNAS_OFERTA) a la forma columnar.
+    """
+    transpuestas = list(zip(*filas)) if filas else [()] * COLUMNAS_LEIDAS
+    return decodificar_columnas(
+        {campo: transpuestas[i] for campo, i in COLUMNAS_OFERTA.items()}, validar=validar,
     )
 
 
+def decodificar_columnas(crudas: dict, validar: bool = True) -> dict:
+    """
+    Convierte columnas crudas ({campo: valores}, p. ej. de un CSV o un
+    Parquet) a la forma columnar. Los campos ausentes se toman como celdas
+    vacías. Se descartan las filas sin granja o sin fecha de peso legible.
+    """
+    n = max((len(v) for v in crudas.values()), default=0)
+    vacia = (None,) * n
+    crudas = {campo: crudas.get(campo, vacia) for campo in COLUMNAS_OFERTA}
+
+    fechas_peso = list(map(_ColumnaFecha(), crudas["fecha_peso"]))
+    granjas = crudas["granja"]
+    validas = [
+        i for i, (g, f) in enumerate(zip(granjas, fechas_peso))
+        if g and str(g).strip() != "" and f is not None
+    ]
+
+    def columna(campo: str) -> list:
+        valores = crudas[campo]
+        return [valores[i] for i in validas]
+
+    fecha_peso = [fechas_peso[i] for i in validas]
+    fecha_ingreso = list(map(_ColumnaFecha(), columna("fecha_ingreso")))
+    columnas = {
+        "fecha_peso": fecha_peso,
+        "granja": [str(g).strip() for g in columna("granja")],
+        "galpon": _columna_int(columna("galpon")),
+        "nucleo": _columna_int(columna("nucleo")),
+        "cantidad": _columna_cantidad(columna("cantidad")),
+        "sexo": _columna_sexo(columna("sexo")),
+        "edad_proyectada": _columna_int(columna("edad_proyectada")),
+        "peso_muestreo_proy": _columna_float(columna("peso_muestreo_proy")),
+        "ganancia_diaria": _columna_float(columna("ganancia_diaria")),
+        "dias_proyectados": _columna_int(columna("dias_proyectados")),
+        "edad_real": _columna_int(columna("edad_real")),
+        "peso_muestreo_real": _columna_float(columna("peso_muestreo_real")),
+        "fecha_ingreso": [fi or fp for fi, fp in zip(fecha_ingreso, fecha_peso)],
+    }
+    if validar:
+        columnas = validar_columnas(columnas)
+    return {"parser": PARSER_VERSION, "n": len(validas), "columnas": columnas}
+
+
+# ─── Forma columnar (cache de parseos) ──────────────────────────────────────────
+
+def ofertas_a_columnas(lotes: List[LoteOferta]) -> dict:
+    """
+    Serializa lotes en forma columnar: una lista por campo. Es más compacta
+    que una lista de dicts (los nombres de campo no se repiten por fila) y
+    se decodifica columna por columna.
+    """
+    campos = list(LoteOferta.model_fields)
+    columnas = {campo: [getattr(l, campo) for l in lotes] for campo in campos}
+    for campo in _CAMPOS_FECHA:
+        columnas[campo] = [f.isoformat() for f in columnas[campo]]
+    return {"parser": PARSER_VERSION, "n": len(lotes), "columnas": columnas}
+
+
+def columnas_con_fechas(data: dict) -> dict:
+    """
+    Columnas de una oferta columnar con las fechas como date (según el codec
+    del storage, una oferta cacheada puede traerlas como texto ISO).
+    """
+    columnas = dict(data["columnas"])
+    for campo in _CAMPOS_FECHA:
+        columnas[campo] = [
+            f if isinstance(f, date) else date.fromisoformat(f) for f in columnas[campo]
+        ]
+    return columnas
+
+
+def ofertas_desde_columnas(data: dict, validar: bool = False) -> List[LoteOferta]:
+    """
+    Inversa de ofertas_a_columnas. Los datos ya fueron validados al parsear,
+    así que se construyen los modelos sin volver a validar fila por fila;
+    con `validar` (datos de otro origen) se validan antes por columnas.
+    """
+    columnas = validar_columnas(data["columnas"]) if validar else columnas_con_fechas(data)
+    campos = list(columnas)
+    return [
+        LoteOferta.model_construct(**dict(zip(campos, fila)))
+        for fila in zip(*(columnas[c] for c in campos))
+    ]
+
+
 def leer_proyeccion_excel(
-    file_content: bytes,
+    file_content: Union[bytes, str, os.PathLike, BinaryIO],
     sheet_name: str = "PROYEC1"
 ) -> dict:
     """
     Lee la pestaña PROYEC1 del Excel para extraer la configuración existente.
     Retorna los parámetros y la estructura de la proyección.
-    Soporta tanto .xlsx (openpyxl) como .xls (xlrd).
+    Soporta tanto .xlsx (openpyxl) como .xls (xlrd); de un .xls solo se
+    decodifica esa pestaña.
     """
-    is_xls = False
+    wb, is_xls = _abrir_libro(file_content)
     try:
-        wb = openpyxl.load_workbook(BytesIO(file_content), data_only=True)
-    except Exception:
-        try:
-            wb = xlrd.open_workbook(file_contents=file_content)
-            is_xls = True
-        except Exception as e:
-            raise ValueError(f"No se pudo abrir el archivo Excel: {e}")
-
-    if is_xls:
-        if sheet_name in wb.sheet_names():
-            ws = wb.sheet_by_name(sheet_name)
+        if is_xls:
+            if sheet_name in wb.sheet_names():
+                ws = wb.sheet_by_name(sheet_name)
+            else:
+                ws = wb.sheet_by_index(0)
+            resultado = {
+                "fecha_base": _parse_date(_xlrd_cell_value(ws, 3, 3)),   # D4 (0-indexed: row=3, col=3)
+                "ganancia_macho": _parse_float(_xlrd_cell_value(ws, 4, 13)),   # N5
+                "ganancia_hembra": _parse_float(_xlrd_cell_value(ws, 4, 15)),  # P5
+            }
         else:
-            ws = wb.sheet_by_index(0)
-        resultado = {
-            "fecha_base": _parse_date(_xlrd_cell_value(ws, 3, 3)),   # D4 (0-indexed: row=3, col=3)
-            "ganancia_macho": _parse_float(_xlrd_cell_value(ws, 4, 13)),   # N5
-            "ganancia_hembra": _parse_float(_xlrd_cell_value(ws, 4, 15)),  # P5
-        }
-    else:
-        if sheet_name in wb.sheetnames:
-            ws = wb[sheet_name]
-        else:
-            ws = wb.active
-        resultado = {
-            "fecha_base": _parse_date(ws.cell(row=4, column=4).value),
-            "ganancia_macho": _parse_float(ws.cell(row=5, column=14).value),  # N5
-            "ganancia_hembra": _parse_float(ws.cell(row=5, column=16).value),  # P5
-        }
-        wb.close()
+            if sheet_name in wb.sheetnames:
+                ws = wb[sheet_name]
+            else:
+                ws = wb.active
+            # read_only: las celdas se leen en streaming, así que se toman
+            # solo las dos filas necesarias (4 y 5) de una vez
+            filas = list(ws.iter_rows(min_row=4, max_row=5, max_col=16, values_only=True))
+            fila4, fila5 = [tuple(f) + (None,) * (16 - len(f)) for f in filas + [()] * (2 - len(filas))]
+            resultado = {
+                "fecha_base": _parse_date(fila4[3]),          # D4
+                "ganancia_macho": _parse_float(fila5[13]),    # N5
+                "ganancia_hembra": _parse_float(fila5[15]),   # P5
+            }
+    finally:
+        _cerrar_libro(wb, is_xls)
 
     return resultado
+
+
+# ─── PROYEC1 completa (importación del histórico) ───────────────────────────────
+# Además de la configuración (D4, N5, P5), PROYEC1 tiene la tabla de lotes
+# asignados: una fila por lote con su día de faena. La tabla se ubica por su
+# fila de encabezados (SINONIMOS_PROYEC1) entre las primeras
+# FILAS_BUSQUEDA_ENCABEZADO filas, igual que en la oferta, y las filas se leen
+# en streaming. El día suele figurar solo en el primer lote de cada día (celda
+# combinada): una fecha vacía repite la anterior. Las filas sin granja o de
+# totales se saltean.
+
+HOJA_PROYEC1 = "PROYEC1"
+
+# Columnas de la tabla de lotes, en el orden en que se exportan
+COLUMNAS_PROYEC1 = (
+    ("fecha", "Fecha Faena"),
+    ("granja", "Granja"),
+    ("galpon", "Galpón"),
+    ("nucleo", "Núcleo"),
+    ("cantidad", "Cantidad"),
+    ("sexo", "Sexo"),
+    ("edad_actual", "Edad Actual"),
+    ("peso_actual", "Peso Actual"),
+    ("fecha_ingreso_original", "Fecha Ingreso"),
+    ("edad_fin_retiro", "Edad Fin Retiro"),
+    ("diferencia_edad_ideal", "Dif. Edad Ideal"),
+    ("peso_vivo_retiro", "Peso Vivo Retiro"),
+    ("peso_faenado", "Peso Faenado"),
+    ("calibre_promedio", "Calibre"),
+    ("cajas", "Cajas"),
+)
+FILA_ENCABEZADO_PROYEC1 = 7  # 1-based; las filas 4 y 5 tienen la configuración
+
+SINONIMOS_PROYEC1 = {
+    "fecha": ("fecha_faena", "fecha", "dia_faena", "fecha_retiro", "fecha_fin_retiro", "fin_retiro"),
+    "granja": ("granja",),
+    "galpon": ("galpon", "pabellon"),
+    "nucleo": ("nucleo",),
+    "cantidad": ("cantidad", "pollos", "aves"),
+    "sexo": ("sexo", "sexo_m_h", "sexo_h_m"),
+    "edad_actual": ("edad_actual", "edad", "edad_proyectada", "edad_proy"),
+    "peso_actual": ("peso_actual", "peso", "peso_muestreo", "peso_muestreo_proy", "peso_proy"),
+    "fecha_ingreso_original": ("fecha_ingreso", "fecha_de_ingreso", "ingreso"),
+    "edad_fin_retiro": ("edad_fin_retiro", "edad_fin", "edad_retiro"),
+    "diferencia_edad_ideal": ("dif_edad_ideal", "diferencia_edad_ideal", "dif_edad", "diferencia_edad"),
+    "peso_vivo_retiro": ("peso_vivo_retiro", "peso_vivo"),
+    "peso_faenado": ("peso_faenado", "peso_faen"),
+    "calibre_promedio": ("calibre", "calibre_promedio"),
+    "cajas": ("cajas",),
+}
+_CAMPOS_OBLIGATORIOS_PROYEC1 = ("fecha", "granja", "cantidad")
+
+
+def _filas_hoja(wb, is_xls: bool, sheet_name: str) -> Iterator[tuple]:
+    """Filas crudas de la hoja `sheet_name` (o la primera si no existe), en streaming."""
+    if is_xls:
+        nombres = wb.sheet_names()
+        ws = wb.sheet_by_name(sheet_name) if sheet_name in nombres else wb.sheet_by_index(0)
+        columnas = min(ws.ncols, COLUMNAS_MAX)
+        return (
+            tuple(_xlrd_cell_value(ws, row_idx, c) for c in range(columnas))
+            for row_idx in range(ws.nrows)
+        )
+    ws = wb[sheet_name] if sheet_name in wb.sheetnames else wb.active
+    return ws.iter_rows(max_col=COLUMNAS_MAX, values_only=True)
+
+
+def _celda(filas: List[tuple], fila: int, columna: int):
+    return filas[fila][columna] if fila < len(filas) and columna < len(filas[fila]) else None
+
+
+def _parametros_proyec1(ganancia_macho: float, ganancia_hembra: float) -> Parametros:
+    """Parámetros por defecto con las ganancias de la planilla (las vacías o en 0 no se usan)."""
+    ganancias = {}
+    if ganancia_macho > 0:
+        ganancias["ganancia_diaria_macho"] = ganancia_macho
+    if ganancia_hembra > 0:
+        ganancias["ganancia_diaria_hembra"] = ganancia_hembra
+    return Parametros(**ganancias)
+
+
+def _lote_proyectado(fila: tuple, indices: dict, fecha: date, fechas_ingreso, params: Parametros) -> LoteProyectado:
+    def valor(campo):
+        i = indices.get(campo)
+        return fila[i] if i is not None and i < len(fila) else None
+
+    peso_vivo = _parse_float(valor("peso_vivo_retiro"))
+    # Las columnas derivadas que falten se recalculan desde el peso vivo
+    faenado = _parse_float(valor("peso_faenado")) or calculo.peso_faenado(peso_vivo, params.rendimiento_canal)
+    calibre = _parse_float(valor("calibre_promedio")) or calculo.calibre_promedio(faenado, params.kg_por_caja)
+    cantidad = _parse_int(valor("cantidad"))
+    sexo = _parse_sexo(valor("sexo"))
+    return LoteProyectado(
+        granja=str(valor("granja")).strip(),
+        galpon=_parse_int(valor("galpon")),
+        nucleo=_parse_int(valor("nucleo")),
+        cantidad=cantidad,
+        sexo=sexo,
+        edad_actual=_parse_int(valor("edad_actual")),
+        peso_actual=_parse_float(valor("peso_actual")),
+        fecha_fin_retiro=fecha,
+        edad_fin_retiro=_parse_int(valor("edad_fin_retiro")),
+        diferencia_edad_ideal=_parse_int(valor("diferencia_edad_ideal")),
+        peso_vivo_retiro=peso_vivo,
+        peso_faenado=faenado,
+        calibre_promedio=calibre,
+        cajas=_parse_float(valor("cajas")) or calculo.cajas_lote(cantidad, calibre),
+        fecha_ingreso_original=fechas_ingreso(valor("fecha_ingreso_original")),
+        # Ganancia de la planilla por sexo: la usan las ediciones al mover el lote
+        ganancia_diaria_original=params.ganancia_diaria_macho if sexo == "M" else params.ganancia_diaria_hembra,
+    )
+
+
+def leer_proyeccion_completa(
+    file_content: Union[bytes, str, os.PathLike, BinaryIO],
+    sheet_name: str = HOJA_PROYEC1,
+    params: Optional[Parametros] = None,
+) -> SemanaFaena:
+    """
+    Lee la tabla de lotes de la pestaña PROYEC1, agrupados por día de faena
+    con los agregados de día y semana recalculados. Sin `params` se usan las
+    ganancias de la planilla (N5/P5, como en leer_proyeccion_excel) sobre
+    los parámetros por defecto. La semana empieza el lunes de la fecha base
+    (D4), o el de la primera fecha de faena. Lanza ValueError si no se
+    encuentra la tabla de lotes.
+    """
+    wb, is_xls = _abrir_libro(file_content)
+    try:
+        filas = _filas_hoja(wb, is_xls, sheet_name)
+        primeras = list(islice(filas, FILAS_BUSQUEDA_ENCABEZADO))
+        fecha_base = _parse_date(_celda(primeras, 3, 3))   # D4
+        if params is None:
+            params = _parametros_proyec1(
+                _parse_float(_celda(primeras, 4, 13)),   # N5
+                _parse_float(_celda(primeras, 4, 15)),   # P5
+            )
+
+        encabezado = None
+        for i, fila in enumerate(primeras):
+            try:
+                indices = mapear_encabezados(fila, SINONIMOS_PROYEC1, _CAMPOS_OBLIGATORIOS_PROYEC1)
+            except ValueError:
+                continue
+            if len(indices) >= MIN_COLUMNAS_ENCABEZADO:
+                encabezado = i
+                break
+        if encabezado is None:
+            raise ValueError(f"No se encontró la tabla de lotes en la hoja {sheet_name}")
+
+        fechas, fechas_ingreso = _ColumnaFecha(), _ColumnaFecha()
+        i_fecha, i_granja, i_cantidad = indices["fecha"], indices["granja"], indices["cantidad"]
+        dias: dict[date, list[LoteProyectado]] = {}
+        fecha_actual: Optional[date] = None
+        vacias = 0
+        for fila in chain(primeras[encabezado + 1:], filas):
+            if all(v is None or v == "" for v in fila):
+                vacias += 1
+                if not is_xls and vacias >= MAX_FILAS_VACIAS:
+                    break
+                continue
+            vacias = 0
+            largo = len(fila)
+            fecha_actual = (fechas(fila[i_fecha]) if i_fecha < largo else None) or fecha_actual
+            granja = fila[i_granja] if i_granja < largo else None
+            if fecha_actual is None or granja is None or str(granja).strip() == "":
+                continue
+            if normalizar_encabezado(granja).startswith("total"):
+                continue
+            if _parse_int(fila[i_cantidad] if i_cantidad < largo else None) <= 0:
+                continue
+            dias.setdefault(fecha_actual, []).append(
+                _lote_proyectado(fila, indices, fecha_actual, fechas_ingreso, params)
+            )
+    finally:
+        _cerrar_libro(wb, is_xls)
+
+    if not dias:
+        raise ValueError(f"La hoja {sheet_name} no tiene lotes")
+    inicio = fecha_base or min(dias)
+    lunes = inicio - timedelta(days=inicio.weekday())
+    return calculo.calcular_semana_faena(
+        lunes, [calculo.calcular_dia_faena(f, lotes) for f, lotes in sorted(dias.items())], params,
+    )
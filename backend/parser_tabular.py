@@ -0,0 +1,159 @@
+"""
+Parsers de oferta para los formatos que exporta el sistema de granjas:
+CSV, Parquet y Arrow IPC (.arrow / .feather).
+
+Las columnas se identifican por encabezado (parser_excel.SINONIMOS_OFERTA),
+no por posición, y se decodifican con el mismo conversor columnar que el
+Excel (parser_excel.decodificar_columnas), así que el resultado es idéntico
+al de leer_oferta_columnas.
+
+- CSV: se lee en streaming con el módulo csv (separador detectado entre
+  , ; y tabulador; UTF-8, o latin-1 si no decodifica).
+- Parquet / Arrow: con pyarrow (opcional, solo se importa si se usa). Se
+  leen solo las columnas mapeadas, ya tipadas.
+"""
+from __future__ import annotations
+
+import codecs
+import csv
+import io
+import os
+from typing import BinaryIO, Optional, Union
+
+from .parser_excel import decodificar_columnas, leer_oferta_columnas, mapear_encabezados
+
+FORMATO_EXCEL = "excel"
+FORMATO_CSV = "csv"
+FORMATO_PARQUET = "parquet"
+FORMATO_ARROW = "arrow"
+
+EXTENSIONES_OFERTA = {
+    ".xlsx": FORMATO_EXCEL,
+    ".xls": FORMATO_EXCEL,
+    ".csv": FORMATO_CSV,
+    ".txt": FORMATO_CSV,
+    ".parquet": FORMATO_PARQUET,
+    ".arrow": FORMATO_ARROW,
+    ".feather": FORMATO_ARROW,
+    ".ipc": FORMATO_ARROW,
+}
+
+_SEPARADORES = ",;\t"
+_MUESTRA_CSV = 64 * 1024
+
+Fuente = Union[bytes, str, os.PathLike, BinaryIO]
+
+
+def formato_de(nombre: str) -> Optional[str]:
+    """Formato de oferta según la extensión del archivo (None si no se soporta)."""
+    return EXTENSIONES_OFERTA.get(os.path.splitext(nombre or "")[1].lower())
+
+
+def leer_oferta_archivo(
+    fuente: Fuente, nombre: str, sheet_name: Optional[str] = None, validar: bool = True,
+) -> dict:
+    """
+    Oferta en forma columnar desde cualquier formato soportado, elegido por
+    la extensión de `nombre`. `sheet_name` solo aplica a Excel.
+    """
+    formato = formato_de(nombre)
+    if formato == FORMATO_EXCEL:
+        return leer_oferta_columnas(fuente, sheet_name, validar=validar)
+    if formato == FORMATO_CSV:
+        return leer_oferta_csv(fuente, validar=validar)
+    if formato == FORMATO_PARQUET:
+        return leer_oferta_parquet(fuente, validar=validar)
+    if formato == FORMATO_ARROW:
+        return leer_oferta_arrow(fuente, validar=validar)
+    raise ValueError(f"Formato de archivo no soportado: {nombre}")
+
+
+def _abrir_binario(fuente: Fuente) -> BinaryIO:
+    if isinstance(fuente, (bytes, bytearray)):
+        return io.BytesIO(fuente)
+    if hasattr(fuente, "read"):
+        # Archivo ya abierto (spool de un upload): se lee por un descriptor
+        # duplicado, así cerrarlo acá no cierra el del upload
+        fuente.seek(0)
+        try:
+            return os.fdopen(os.dup(fuente.fileno()), "rb")
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return io.BytesIO(fuente.read())
+    return open(fuente, "rb")
+
+
+# ─── CSV ────────────────────────────────────────────────────────────────────────
+
+def _codificacion(muestra: bytes) -> str:
+    # Se prueba el decoder incremental: la muestra puede cortar un carácter
+    try:
+        codecs.getincrementaldecoder("utf-8-sig")().decode(muestra, final=False)
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def leer_oferta_csv(fuente: Fuente, validar: bool = True) -> dict:
+    """Oferta desde un CSV con fila de encabezados."""
+    with _abrir_binario(fuente) as binario:
+        muestra = binario.read(_MUESTRA_CSV)
+        binario.seek(0)
+        codificacion = _codificacion(muestra)
+        texto = io.TextIOWrapper(binario, encoding=codificacion, newline="")
+        try:
+            dialecto = csv.Sniffer().sniff(muestra.decode(codificacion, errors="ignore"), _SEPARADORES)
+        except csv.Error:
+            dialecto = csv.excel
+        lector = csv.reader(texto, dialecto)
+
+        encabezados = next(lector, None)
+        if encabezados is None:
+            raise ValueError("El CSV está vacío")
+        indices = mapear_encabezados(encabezados)
+        crudas = {campo: [] for campo in indices}
+        columnas = list(indices.items())
+        for fila in lector:
+            if not any(fila):
+                continue
+            largo = len(fila)
+            for campo, i in columnas:
+                # Celda vacía como None, igual que en Excel
+                crudas[campo].append(fila[i] if i < largo and fila[i] != "" else None)
+        texto.detach()
+    return decodificar_columnas(crudas, validar=validar)
+
+
+# ─── Parquet / Arrow IPC ────────────────────────────────────────────────────────
+
+def _columnas_tabla(tabla, validar: bool) -> dict:
+    indices = mapear_encabezados(tabla.column_names)
+    nombres = tabla.column_names
+    crudas = {campo: tabla.column(nombres[i]).to_pylist() for campo, i in indices.items()}
+    return decodificar_columnas(crudas, validar=validar)
+
+
+def leer_oferta_parquet(fuente: Fuente, validar: bool = True) -> dict:
+    """Oferta desde un Parquet. Requiere pyarrow."""
+    import pyarrow.parquet as pq
+
+    with _abrir_binario(fuente) as binario:
+        archivo = pq.ParquetFile(binario)
+        indices = mapear_encabezados(archivo.schema_arrow.names)
+        nombres = archivo.schema_arrow.names
+        # Solo se leen (y descomprimen) las columnas de la oferta
+        tabla = archivo.read(columns=[nombres[i] for i in indices.values()])
+    return _columnas_tabla(tabla, validar)
+
+
+def leer_oferta_arrow(fuente: Fuente, validar: bool = True) -> dict:
+    """Oferta desde Arrow IPC (formato archivo / Feather v2, o stream). Requiere pyarrow."""
+    import pyarrow as pa
+    import pyarrow.ipc
+
+    with _abrir_binario(fuente) as binario:
+        try:
+            tabla = pa.ipc.open_file(binario).read_all()
+        except pa.ArrowInvalid:
+            binario.seek(0)
+            tabla = pa.ipc.open_stream(binario).read_all()
+    return _columnas_tabla(tabla, validar)
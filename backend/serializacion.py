@@ -0,0 +1,208 @@
+"""
+Codecs de serialización para el estado persistido (ofertas, parámetros, proyección).
+
+Formatos disponibles (STORAGE_CODEC):
+- json:    JSON con indentación, legible a mano. Formato histórico.
+- orjson:  JSON compacto codificado con orjson (varias veces más rápido).
+- msgpack: binario; las fechas se guardan como ordinales (ExtType).
+- zstd:    JSON compacto comprimido con Zstandard.
+
+Todos los codecs decodifican a la misma forma: las fechas vuelven como
+texto ISO 8601, igual que de JSON (msgpack las guarda como ordinal, pero las
+entrega en ISO). Así lo que lee el resto del código no depende del codec
+configurado.
+
+Todo objeto no-JSON lleva una cabecera de 4 bytes (MAGIA + id de codec), así
+que el lector detecta el formato de cada objeto por separado. Un objeto sin
+cabecera es JSON plano: los archivos viejos se siguen leyendo y se migran
+solos la próxima vez que se guardan.
+
+orjson, msgpack y zstandard son opcionales; solo se importan si se usan.
+"""
+from __future__ import annotations
+
+import json
+import struct
+from datetime import date, datetime
+from typing import Any, BinaryIO, Optional
+
+MAGIA = b"\xffFK"
+
+CODEC_JSON = "json"
+CODEC_ORJSON = "orjson"
+CODEC_MSGPACK = "msgpack"
+CODEC_ZSTD = "zstd"
+
+_IDS = {CODEC_ORJSON: 1, CODEC_MSGPACK: 2, CODEC_ZSTD: 3}
+_NOMBRES = {v: k for k, v in _IDS.items()}
+
+CONTENT_TYPES = {
+    CODEC_JSON: "application/json",
+    CODEC_ORJSON: "application/json",
+    CODEC_MSGPACK: "application/msgpack",
+    CODEC_ZSTD: "application/zstd",
+}
+
+# ExtType de msgpack
+_EXT_DATE = 1      # payload: ordinal (uint32 big-endian)
+_EXT_DATETIME = 2  # payload: ISO 8601 en UTF-8
+
+
+class DateEncoder(json.JSONEncoder):
+    """Serializa date/datetime a ISO 8601."""
+    def default(self, obj):
+        if isinstance(obj, (date, datetime)):
+            return obj.isoformat()
+        return super().default(obj)
+
+
+# ─── JSON ───────────────────────────────────────────────────────────────────────
+
+def _json_compacto(data: Any) -> bytes:
+    try:
+        import orjson
+    except ImportError:
+        return json.dumps(data, cls=DateEncoder, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return orjson.dumps(data)
+
+
+def _json_loads(raw: bytes) -> Any:
+    try:
+        import orjson
+    except ImportError:
+        return json.loads(raw)
+    return orjson.loads(raw)
+
+
+# ─── msgpack ────────────────────────────────────────────────────────────────────
+
+def _msgpack_default(obj):
+    import msgpack
+    # datetime hereda de date: se evalúa primero
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(_EXT_DATETIME, obj.isoformat().encode("utf-8"))
+    if isinstance(obj, date):
+        return msgpack.ExtType(_EXT_DATE, struct.pack(">I", obj.toordinal()))
+    raise TypeError(f"Tipo no serializable: {type(obj).__name__}")
+
+
+def _msgpack_ext_hook(code: int, payload: bytes):
+    import msgpack
+    # Misma forma que los codecs JSON: ISO 8601
+    if code == _EXT_DATE:
+        return date.fromordinal(struct.unpack(">I", payload)[0]).isoformat()
+    if code == _EXT_DATETIME:
+        return payload.decode("utf-8")
+    return msgpack.ExtType(code, payload)
+
+
+# ─── API ────────────────────────────────────────────────────────────────────────
+
+def codec_configurado() -> str:
+    from .config import STORAGE_CODEC
+    return STORAGE_CODEC
+
+
+def serializar(data: Any, codec: Optional[str] = None) -> bytes:
+    """Codifica `data` con el codec indicado (o el configurado)."""
+    codec = codec or codec_configurado()
+    if codec == CODEC_JSON:
+        return json.dumps(data, cls=DateEncoder, ensure_ascii=False, indent=2).encode("utf-8")
+    if codec == CODEC_ORJSON:
+        import orjson
+        cuerpo = orjson.dumps(data)
+    elif codec == CODEC_MSGPACK:
+        import msgpack
+        cuerpo = msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
+    elif codec == CODEC_ZSTD:
+        import zstandard
+        cuerpo = zstandard.ZstdCompressor(level=3).compress(_json_compacto(data))
+    else:
+        raise ValueError(f"Codec de storage desconocido: {codec!r}")
+    return MAGIA + bytes([_IDS[codec]]) + cuerpo
+
+
+def deserializar(raw: bytes | str) -> Any:
+    """Decodifica un objeto detectando el formato por su cabecera."""
+    if isinstance(raw, str):
+        return json.loads(raw)
+    if not raw.startswith(MAGIA):
+        return _json_loads(raw)
+    codec = _NOMBRES.get(raw[len(MAGIA)])
+    cuerpo = memoryview(raw)[len(MAGIA) + 1:]
+    if codec == CODEC_ORJSON:
+        return _json_loads(cuerpo)
+    if codec == CODEC_MSGPACK:
+        import msgpack
+        return msgpack.unpackb(cuerpo, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+    if codec == CODEC_ZSTD:
+        import zstandard
+        return _json_loads(zstandard.ZstdDecompressor().decompress(cuerpo))
+    raise ValueError(f"Cabecera de formato desconocida: {raw[:len(MAGIA) + 1]!r}")
+
+
+# ─── Compresión de binarios (uploads) ──────────────────────────────────────────
+
+COMPRESION_NINGUNA = "ninguna"
+COMPRESION_ZLIB = "zlib"
+COMPRESION_ZSTD = "zstd"
+BLOQUE_COMPRESION = 1024 * 1024
+
+
+def comprimir_bytes(raw: bytes) -> tuple[bytes, str]:
+    """
+    Comprime un binario con zstd (o zlib si zstandard no está instalado).
+    Si no se gana espacio (p. ej. un .xlsx, que ya es un zip) se deja igual.
+    Retorna (bytes, algoritmo).
+    """
+    try:
+        import zstandard
+    except ImportError:
+        import zlib
+        comprimido, algoritmo = zlib.compress(raw, 6), COMPRESION_ZLIB
+    else:
+        comprimido, algoritmo = zstandard.ZstdCompressor(level=10).compress(raw), COMPRESION_ZSTD
+    if len(comprimido) >= len(raw):
+        return raw, COMPRESION_NINGUNA
+    return comprimido, algoritmo
+
+
+def comprimir_archivo(origen: BinaryIO, destino: BinaryIO, tamano: int) -> str:
+    """
+    Versión por bloques de comprimir_bytes, para binarios que no conviene
+    tener enteros en memoria: lee `origen` (`tamano` bytes desde su posición
+    actual) y escribe el resultado en `destino`. Retorna el algoritmo; si es
+    COMPRESION_NINGUNA, `destino` no sirve y hay que guardar `origen` tal cual.
+    """
+    try:
+        import zstandard
+    except ImportError:
+        import zlib
+        compresor, algoritmo = zlib.compressobj(6), COMPRESION_ZLIB
+    else:
+        # size: zstd lo anota en el frame y descomprimir_bytes puede usar decompress()
+        compresor, algoritmo = zstandard.ZstdCompressor(level=10).compressobj(size=tamano), COMPRESION_ZSTD
+    escritos = 0
+    while bloque := origen.read(BLOQUE_COMPRESION):
+        escritos += destino.write(compresor.compress(bloque))
+        if escritos >= tamano:
+            return COMPRESION_NINGUNA
+    escritos += destino.write(compresor.flush())
+    return COMPRESION_NINGUNA if escritos >= tamano else algoritmo
+
+
+def descomprimir_bytes(raw: bytes, algoritmo: str) -> bytes:
+    if algoritmo == COMPRESION_ZSTD:
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(raw)
+    if algoritmo == COMPRESION_ZLIB:
+        import zlib
+        return zlib.decompress(raw)
+    return raw
+
+
+def codec_de(raw: bytes) -> str:
+    """Codec con el que fue escrito `raw` (útil para migraciones)."""
+    if raw.startswith(MAGIA):
+        return _NOMBRES.get(raw[len(MAGIA)], "desconocido")
+    return CODEC_JSON
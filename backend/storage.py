@@ -7,36 +7,74 @@ Provee una interfaz abstracta con dos implementaciones:
 
 Ambas comparten la misma API: save/load/delete/list, lo que permite
 cambiar de backend con solo una variable de entorno (STORAGE_BACKEND).
+
+Las funciones de la capa de acceso a datos (al final del módulo) son
+asíncronas y usan la variante de storage_async.py.
 """
 from __future__ import annotations
 
-import json
+import hashlib
 import os
 import logging
+import shutil
+import threading
+import time
+import uuid
 from abc import ABC, abstractmethod
-from datetime import date, datetime
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, BinaryIO, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos
+    fcntl = None
+
+from .serializacion import (
+    COMPRESION_NINGUNA, CONTENT_TYPES, DateEncoder, codec_configurado, comprimir_archivo,
+    comprimir_bytes, descomprimir_bytes, deserializar, serializar,
+)
 
 logger = logging.getLogger(__name__)
 
 
-# ─── JSON serializer personalizado ──────────────────────────────────────────────
+# ─── Serialización ──────────────────────────────────────────────────────────────
+# El formato concreto lo decide STORAGE_CODEC (ver serializacion.py). Las
+# claves siguen usando la extensión .json aunque el contenido sea binario,
+# para que list_keys y los objetos existentes no cambien de nombre.
+
+def _serialize(data: Any) -> bytes:
+    return serializar(data)
+
+
+def _deserialize(raw: bytes | str) -> Any:
+    return deserializar(raw)
+
+
+def _content_type() -> str:
+    return CONTENT_TYPES[codec_configurado()]
+
 
-class DateEncoder(json.JSONEncoder):
-    """Serializa date/datetime a ISO 8601."""
-    def default(self, obj):
-        if isinstance(obj, (date, datetime)):
-            return obj.isoformat()
-        return super().default(obj)
+# Tamaño de bloque al copiar binarios por stream (save_bytes_desde)
+BLOQUE_STREAM = 1024 * 1024
 
 
-def _serialize(data: Any) -> str:
-    return json.dumps(data, cls=DateEncoder, ensure_ascii=False, indent=2)
+# ─── Concurrencia optimista ─────────────────────────────────────────────────────
 
+# Valor de `if_version` que exige que la clave todavía no exista
+VERSION_INEXISTENTE = "0"
 
-def _deserialize(raw: str) -> Any:
-    return json.loads(raw)
+
+class ConflictoVersion(Exception):
+    """La clave fue modificada por otro escritor desde que se leyó (CAS fallido)."""
+
+    def __init__(self, key: str, esperada: Optional[str], actual: Optional[str] = None):
+        self.key = key
+        self.esperada = esperada
+        self.actual = actual
+        super().__init__(f"Conflicto de versión en '{key}': esperada {esperada}, actual {actual}")
 
 
 # ─── Interfaz abstracta ─────────────────────────────────────────────────────────
@@ -45,8 +83,20 @@ class StorageBackend(ABC):
     """Interfaz que deben cumplir todos los backends de almacenamiento."""
 
     @abstractmethod
-    def save(self, key: str, data: Any) -> None:
-        """Guarda data (dict/list) bajo la clave `key` (e.g. 'ofertas')."""
+    def save(self, key: str, data: Any, if_version: Optional[str] = None,
+             raw: Optional[bytes] = None) -> Optional[str]:
+        """
+        Guarda data (dict/list) bajo la clave `key` (e.g. 'ofertas').
+        Retorna la nueva versión del objeto (ver `version`).
+
+        Con `if_version` la escritura es compare-and-swap: solo se aplica si la
+        versión actual es esa (VERSION_INEXISTENTE = la clave no debe existir);
+        si no, lanza ConflictoVersion sin modificar nada.
+
+        `raw` es `data` ya serializado con _serialize, si quien llama lo tiene
+        (CachedStorage lo necesita para el cache compartido): no se serializa
+        de nuevo.
+        """
         ...
 
     @abstractmethod
@@ -64,11 +114,47 @@ class StorageBackend(ABC):
         """Verifica si existe la clave `key`."""
         ...
 
+    @abstractmethod
+    def version(self, key: str) -> Optional[str]:
+        """
+        Token opaco que cambia cada vez que se reescribe `key`.
+        Retorna None si no existe. Sirve para ETags sin descargar el contenido.
+        """
+        ...
+
     @abstractmethod
     def list_keys(self, prefix: str = "") -> list[str]:
         """Lista las claves que empiezan con `prefix`."""
         ...
 
+    def load_versioned(self, key: str) -> tuple[Optional[Any], Optional[str]]:
+        """
+        Carga `key` junto con su versión. La versión se lee antes que el
+        contenido: si alguien escribe en el medio, la versión queda vieja y
+        la próxima validación fuerza una relectura (nunca al revés).
+        """
+        version = self.version(key)
+        if version is None:
+            return None, None
+        return self.load(key), version
+
+    def load_many_versioned(self, keys: list[str]) -> dict[str, tuple[Optional[Any], Optional[str]]]:
+        """Carga varias claves con su versión. Los backends remotos lo paralelizan."""
+        return {key: self.load_versioned(key) for key in keys}
+
+    def load_many(self, keys: list[str]) -> dict[str, Optional[Any]]:
+        """Carga varias claves de una vez. Las inexistentes quedan en None."""
+        return {key: data for key, (data, _) in self.load_many_versioned(keys).items()}
+
+    def save_dias(self, key: str, data: Any, dias: list[int], if_version: Optional[str] = None,
+                  raw: Optional[bytes] = None) -> Optional[str]:
+        """
+        Guarda una proyección de la que solo cambiaron los días `dias` (índices).
+        Los backends de blobs reescriben el objeto entero; SQLiteStorage
+        actualiza solo las filas de esos días y los agregados de la semana.
+        """
+        return self.save(key, data, if_version=if_version, raw=raw)
+
     @abstractmethod
     def save_bytes(self, key: str, data: bytes, content_type: str = "application/octet-stream") -> None:
         """Guarda datos binarios (e.g. archivos Excel originales)."""
@@ -79,66 +165,259 @@ class StorageBackend(ABC):
         """Carga datos binarios. Retorna None si no existe."""
         ...
 
+    def save_bytes_desde(self, key: str, archivo: BinaryIO, content_type: str = "application/octet-stream") -> None:
+        """
+        Guarda un binario leyendo de `archivo` (desde su posición actual).
+        Los backends que pueden hacerlo lo copian por bloques sin cargarlo
+        entero en memoria; por defecto se lee y se delega a save_bytes.
+        """
+        self.save_bytes(key, archivo.read(), content_type=content_type)
+
 
 # ─── Implementación: Filesystem local ───────────────────────────────────────────
 
 class LocalStorage(StorageBackend):
-    """Almacena JSON en archivos locales. Ideal para desarrollo."""
+    """
+    Almacena JSON en archivos locales. Para desarrollo y despliegues on-prem.
+
+    - Escrituras atómicas y durables: archivo temporal + fsync + rename +
+      fsync del directorio. Un corte a mitad de escritura deja la versión
+      anterior intacta, nunca un archivo truncado.
+    - Cada clave tiene un archivo de versión (`<key>.json.version`) con un
+      contador que se incrementa en cada escritura, tomado bajo un lock
+      exclusivo por clave (flock, válido entre procesos).
+    - Los directorios ya creados se recuerdan: no hay mkdir por operación.
+    - `list_keys` usa un manifiesto (`.manifest`) con el conjunto de claves,
+      mantenido en cada alta/baja; se reconstruye con rglob si falta.
+    """
+
+    MANIFEST = ".manifest"
 
     def __init__(self, base_path: str):
         self.base_path = Path(base_path)
         self.base_path.mkdir(parents=True, exist_ok=True)
+        self._directorios: set[Path] = {self.base_path}
+        self._dir_lock = threading.Lock()
+        self._manifest_path = self.base_path / self.MANIFEST
+        self._manifest_lock_path = self.base_path / (self.MANIFEST + ".lock")
+        self._manifest: Optional[set[str]] = None
+        self._manifest_firma: Optional[tuple[int, int]] = None
+        self._manifest_mutex = threading.Lock()
         logger.info(f"LocalStorage inicializado en: {self.base_path}")
 
+    # ── rutas y directorios ──
+
     def _key_path(self, key: str) -> Path:
-        path = self.base_path / f"{key}.json"
-        path.parent.mkdir(parents=True, exist_ok=True)
-        return path
+        return self.base_path / f"{key}.json"
 
     def _bin_path(self, key: str) -> Path:
-        path = self.base_path / key
-        path.parent.mkdir(parents=True, exist_ok=True)
-        return path
-
-    def save(self, key: str, data: Any) -> None:
+        return self.base_path / key
+
+    def _asegurar_directorio(self, directorio: Path) -> None:
+        """mkdir solo la primera vez que se escribe en `directorio`."""
+        if directorio in self._directorios:
+            return
+        directorio.mkdir(parents=True, exist_ok=True)
+        with self._dir_lock:
+            self._directorios.add(directorio)
+
+    @staticmethod
+    def _version_path(path: Path) -> Path:
+        return path.with_name(path.name + ".version")
+
+    @staticmethod
+    def _fsync_directorio(directorio: Path) -> None:
+        if os.name != "posix":
+            return
+        fd = os.open(directorio, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @classmethod
+    def _reemplazar(cls, path: Path, contenido: bytes | BinaryIO) -> None:
+        """
+        Escribe a un temporal en el mismo directorio, fsync y rename atómico.
+        `contenido` puede ser un archivo abierto: se copia por bloques.
+        """
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                if isinstance(contenido, (bytes, bytearray)):
+                    f.write(contenido)
+                else:
+                    shutil.copyfileobj(contenido, f, BLOQUE_STREAM)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        cls._fsync_directorio(path.parent)
+
+    @contextmanager
+    def _lock_archivo(self, lock_path: Path):
+        with open(lock_path, "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _lock_escritura(self, path: Path):
+        return self._lock_archivo(path.with_name(path.name + ".lock"))
+
+    # ── versiones ──
+
+    def _leer_contador(self, path: Path) -> int:
+        try:
+            return int(self._version_path(path).read_text(encoding="utf-8").strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _version_de(self, path: Path) -> Optional[str]:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        contador = self._leer_contador(path)
+        if contador:
+            return str(contador)
+        # Archivo previo al control de versiones: se identifica por mtime
+        return f"m{st.st_mtime_ns:x}-{st.st_size:x}"
+
+    # ── manifiesto de claves ──
+
+    def _firma_manifest(self) -> Optional[tuple[int, int]]:
+        try:
+            st = self._manifest_path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _escanear_claves(self) -> set[str]:
+        return {
+            p.relative_to(self.base_path).with_suffix("").as_posix()
+            for p in self.base_path.rglob("*.json")
+        }
+
+    def _claves(self) -> set[str]:
+        """Conjunto de claves, releyendo el manifiesto solo si otro proceso lo cambió."""
+        firma = self._firma_manifest()
+        with self._manifest_mutex:
+            if self._manifest is not None and firma == self._manifest_firma:
+                return self._manifest
+        if firma is None:
+            # Directorio sin manifiesto (previo a esta versión): se construye una vez
+            with self._lock_archivo(self._manifest_lock_path):
+                if self._firma_manifest() is None:
+                    self._reemplazar(self._manifest_path, _serialize_manifest(self._escanear_claves()))
+            firma = self._firma_manifest()
+        claves = self._leer_manifest()
+        with self._manifest_mutex:
+            self._manifest, self._manifest_firma = claves, firma
+        return claves
+
+    def _leer_manifest(self) -> set[str]:
+        try:
+            return set(_deserialize(self._manifest_path.read_bytes()))
+        except FileNotFoundError:
+            return self._escanear_claves()
+
+    def _actualizar_manifest(self, agregar: Optional[str] = None, quitar: Optional[str] = None) -> None:
+        if agregar is not None and agregar in self._claves():
+            return
+        if quitar is not None and quitar not in self._claves():
+            return
+        with self._lock_archivo(self._manifest_lock_path):
+            # Releer dentro del lock: otro proceso pudo agregar claves
+            claves = self._leer_manifest()
+            if agregar is not None:
+                claves.add(agregar)
+            if quitar is not None:
+                claves.discard(quitar)
+            self._reemplazar(self._manifest_path, _serialize_manifest(claves))
+            with self._manifest_mutex:
+                self._manifest, self._manifest_firma = claves, self._firma_manifest()
+
+    # ── API ──
+
+    def save(self, key: str, data: Any, if_version: Optional[str] = None,
+             raw: Optional[bytes] = None) -> Optional[str]:
         path = self._key_path(key)
-        path.write_text(_serialize(data), encoding="utf-8")
-        logger.debug(f"LocalStorage: guardado {key}")
+        raw = _serialize(data) if raw is None else raw
+        self._asegurar_directorio(path.parent)
+        with self._lock_escritura(path):
+            if if_version is not None:
+                actual = self._version_de(path)
+                if (actual or VERSION_INEXISTENTE) != if_version:
+                    raise ConflictoVersion(key, if_version, actual)
+            # Primero los datos, después la versión: un lector concurrente puede
+            # ver datos nuevos con versión vieja (fuerza una relectura), nunca
+            # versión nueva con datos viejos.
+            nueva = str(self._leer_contador(path) + 1)
+            self._reemplazar(path, raw)
+            self._reemplazar(self._version_path(path), nueva.encode("utf-8"))
+        self._actualizar_manifest(agregar=key)
+        logger.debug(f"LocalStorage: guardado {key} (v{nueva})")
+        return nueva
 
     def load(self, key: str) -> Optional[Any]:
-        path = self._key_path(key)
-        if not path.exists():
+        try:
+            raw = self._key_path(key).read_bytes()
+        except FileNotFoundError:
             return None
-        raw = path.read_text(encoding="utf-8")
         return _deserialize(raw)
 
     def delete(self, key: str) -> None:
         path = self._key_path(key)
-        if path.exists():
-            path.unlink()
-            logger.debug(f"LocalStorage: eliminado {key}")
+        if not path.parent.exists():
+            return
+        # El archivo de versión se conserva: si la clave se vuelve a crear, el
+        # contador sigue subiendo y no se repiten versiones (ni ETags).
+        with self._lock_escritura(path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                return
+            self._fsync_directorio(path.parent)
+        self._actualizar_manifest(quitar=key)
+        logger.debug(f"LocalStorage: eliminado {key}")
 
     def exists(self, key: str) -> bool:
         return self._key_path(key).exists()
 
+    def version(self, key: str) -> Optional[str]:
+        return self._version_de(self._key_path(key))
+
     def list_keys(self, prefix: str = "") -> list[str]:
-        keys = []
-        for p in self.base_path.rglob("*.json"):
-            rel = p.relative_to(self.base_path).with_suffix("").as_posix()
-            if rel.startswith(prefix):
-                keys.append(rel)
-        return keys
+        return sorted(k for k in self._claves() if k.startswith(prefix))
 
     def save_bytes(self, key: str, data: bytes, content_type: str = "application/octet-stream") -> None:
         path = self._bin_path(key)
-        path.write_bytes(data)
+        self._asegurar_directorio(path.parent)
+        self._reemplazar(path, data)
         logger.debug(f"LocalStorage: guardado binario {key}")
 
-    def load_bytes(self, key: str) -> Optional[bytes]:
+    def save_bytes_desde(self, key: str, archivo: BinaryIO, content_type: str = "application/octet-stream") -> None:
         path = self._bin_path(key)
-        if not path.exists():
+        self._asegurar_directorio(path.parent)
+        self._reemplazar(path, archivo)
+        logger.debug(f"LocalStorage: guardado binario {key} (stream)")
+
+    def load_bytes(self, key: str) -> Optional[bytes]:
+        try:
+            return self._bin_path(key).read_bytes()
+        except FileNotFoundError:
             return None
-        return path.read_bytes()
+
+
+def _serialize_manifest(claves: set[str]) -> bytes:
+    # El manifiesto es interno: siempre JSON plano, sin importar STORAGE_CODEC
+    return serializar(sorted(claves), codec="json")
 
 
 # ─── Implementación: Google Cloud Storage ────────────────────────────────────────
@@ -146,41 +425,97 @@ class LocalStorage(StorageBackend):
 class GCSStorage(StorageBackend):
     """Almacena JSON y binarios en Google Cloud Storage. Para producción."""
 
-    def __init__(self, bucket_name: str, prefix: str = "data/"):
+    def __init__(self, bucket_name: str, prefix: str = "data/", pool_size: int = 8):
         from google.cloud import storage as gcs_lib
+        from google.api_core.exceptions import NotFound, PreconditionFailed
+        self._not_found = NotFound
+        self._precondition_failed = PreconditionFailed
         self.client = gcs_lib.Client()
         self.bucket = self.client.bucket(bucket_name)
         self.prefix = prefix.rstrip("/") + "/" if prefix else ""
+        self.pool_size = pool_size
+        self._configurar_pool_http(pool_size)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="gcs-load")
         logger.info(f"GCSStorage inicializado: bucket={bucket_name}, prefix={self.prefix}")
 
+    def _configurar_pool_http(self, pool_size: int) -> None:
+        """
+        La sesión HTTP del cliente (requests) trae un pool de 10 conexiones por
+        host; se ajusta al número de descargas concurrentes de load_many para
+        reutilizar conexiones TLS en vez de abrir una por lectura.
+        """
+        try:
+            from requests.adapters import HTTPAdapter
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            self.client._http.mount("https://", adapter)
+        except Exception as e:
+            logger.warning(f"GCSStorage: no se pudo configurar el pool HTTP: {e}")
+
     def _blob_name(self, key: str, ext: str = ".json") -> str:
         return f"{self.prefix}{key}{ext}"
 
-    def save(self, key: str, data: Any) -> None:
+    def _download(self, blob_name: str) -> tuple[Optional[bytes], Optional[str]]:
+        """
+        Descarga en un solo round trip (sin exists() previo). La generación
+        viene en los headers de la respuesta (x-goog-generation).
+        """
+        blob = self.bucket.blob(blob_name)
+        try:
+            raw = blob.download_as_bytes()
+        except self._not_found:
+            return None, None
+        return raw, str(blob.generation) if blob.generation is not None else None
+
+    def save(self, key: str, data: Any, if_version: Optional[str] = None,
+             raw: Optional[bytes] = None) -> Optional[str]:
         blob = self.bucket.blob(self._blob_name(key))
-        blob.upload_from_string(
-            _serialize(data),
-            content_type="application/json"
-        )
+        try:
+            blob.upload_from_string(
+                _serialize(data) if raw is None else raw,
+                content_type=_content_type(),
+                # 0 = "no debe existir", igual que VERSION_INEXISTENTE
+                if_generation_match=int(if_version) if if_version is not None else None,
+            )
+        except self._precondition_failed:
+            raise ConflictoVersion(key, if_version)
         logger.debug(f"GCSStorage: guardado {key}")
+        # upload_from_string actualiza las propiedades del blob con la respuesta
+        return str(blob.generation) if blob.generation is not None else None
 
     def load(self, key: str) -> Optional[Any]:
-        blob = self.bucket.blob(self._blob_name(key))
-        if not blob.exists():
-            return None
-        raw = blob.download_as_text(encoding="utf-8")
-        return _deserialize(raw)
+        return self.load_versioned(key)[0]
+
+    def load_versioned(self, key: str) -> tuple[Optional[Any], Optional[str]]:
+        raw, version = self._download(self._blob_name(key))
+        if raw is None:
+            return None, None
+        return _deserialize(raw), version
+
+    def load_many_versioned(self, keys: list[str]) -> dict[str, tuple[Optional[Any], Optional[str]]]:
+        if len(keys) <= 1:
+            return {key: self.load_versioned(key) for key in keys}
+        resultados = self._executor.map(self.load_versioned, keys)
+        return dict(zip(keys, resultados))
 
     def delete(self, key: str) -> None:
         blob = self.bucket.blob(self._blob_name(key))
-        if blob.exists():
+        try:
             blob.delete()
-            logger.debug(f"GCSStorage: eliminado {key}")
+        except self._not_found:
+            return
+        logger.debug(f"GCSStorage: eliminado {key}")
 
     def exists(self, key: str) -> bool:
         blob = self.bucket.blob(self._blob_name(key))
         return blob.exists()
 
+    def version(self, key: str) -> Optional[str]:
+        # get_blob solo trae metadata; la generación cambia en cada escritura
+        blob = self.bucket.get_blob(self._blob_name(key))
+        if blob is None:
+            return None
+        return str(blob.generation)
+
     def list_keys(self, prefix: str = "") -> list[str]:
         full_prefix = f"{self.prefix}{prefix}"
         blobs = self.client.list_blobs(self.bucket, prefix=full_prefix)
@@ -200,11 +535,323 @@ class GCSStorage(StorageBackend):
         blob.upload_from_string(data, content_type=content_type)
         logger.debug(f"GCSStorage: guardado binario {key}")
 
-    def load_bytes(self, key: str) -> Optional[bytes]:
+    def save_bytes_desde(self, key: str, archivo: BinaryIO, content_type: str = "application/octet-stream") -> None:
         blob = self.bucket.blob(self._blob_name(key, ext=""))
-        if not blob.exists():
+        blob.upload_from_file(archivo, content_type=content_type)
+        logger.debug(f"GCSStorage: guardado binario {key} (stream)")
+
+    def load_bytes(self, key: str) -> Optional[bytes]:
+        return self._download(self._blob_name(key, ext=""))[0]
+
+
+# ─── Cache en proceso (read-through / write-through) ────────────────────────────
+
+class _EntradaCache:
+    __slots__ = ("data", "version", "verificado_en")
+
+    def __init__(self, data: Optional[Any], version: Optional[str], verificado_en: float):
+        self.data = data
+        self.version = version
+        self.verificado_en = verificado_en
+
+
+class CachedStorage(StorageBackend):
+    """
+    Envuelve otro backend y mantiene en memoria los objetos JSON ya decodificados.
+
+    - Dentro del TTL una lectura no toca el backend (cero round trips).
+    - Vencido el TTL se compara la versión (generación GCS / mtime local) y solo
+      se vuelve a descargar si cambió.
+    - `save` escribe en el backend y actualiza la entrada (write-through).
+    - También se cachea la ausencia de una clave (p. ej. parámetros sin guardar).
+
+    Con `shared` (ver cache_compartido.py) se agrega un nivel común a todas las
+    instancias: los misses locales se resuelven desde ahí antes de ir al
+    backend, y cada escritura publica una invalidación que descarta la copia
+    local en las demás réplicas.
+
+    El cache local es un LRU de como mucho `max_entradas` claves. Las claves
+    bajo PREFIJOS_SIN_CACHE (objetos append-only que se leen pocas veces:
+    historial, operaciones de la bitácora, uploads y sus parseos) pasan
+    directo al backend sin ocupar memoria, igual que los binarios.
+
+    Los objetos devueltos por `load` se comparten entre requests: no mutarlos.
+    """
+
+    def __init__(self, backend: StorageBackend, ttl: float = 2.0, shared=None, max_entradas: int = 256):
+        self.backend = backend
+        self.ttl = ttl
+        self.shared = shared
+        self.max_entradas = max_entradas
+        self.instancia_id = uuid.uuid4().hex
+        self._entradas: "OrderedDict[str, _EntradaCache]" = OrderedDict()
+        self._lock = threading.Lock()
+        if shared is not None:
+            shared.subscribe(self._on_invalidacion)
+        logger.info(
+            f"CachedStorage sobre {type(backend).__name__} "
+            f"(ttl={ttl}s, max {max_entradas} claves, compartido={type(shared).__name__ if shared else 'no'})"
+        )
+
+    @staticmethod
+    def cacheable(key: str) -> bool:
+        return key in CLAVES_CACHEADAS or not key.startswith(PREFIJOS_SIN_CACHE)
+
+    def _on_invalidacion(self, key: str, origen: str) -> None:
+        if origen != self.instancia_id:
+            self.invalidate(key)
+
+    def _version_remota(self, key: str) -> Optional[str]:
+        """Versión vigente, siempre la del backend (el cache compartido puede atrasar)."""
+        return self.backend.version(key)
+
+    def _consultar(self, key: str) -> tuple[Optional[_EntradaCache], bool]:
+        """
+        Mira la entrada local sin tocar el backend. Retorna (entrada, fresca):
+        fresca=False significa que venció el TTL y hay que confirmar la versión.
+        """
+        with self._lock:
+            entrada = self._entradas.get(key)
+            if entrada is not None:
+                self._entradas.move_to_end(key)
+        if entrada is None:
+            return None, False
+        return entrada, time.monotonic() - entrada.verificado_en < self.ttl
+
+    def _confirmar(self, key: str, entrada: _EntradaCache, version_remota: Optional[str]) -> Optional[_EntradaCache]:
+        """Renueva la entrada si la versión remota no cambió; si cambió, la descarta."""
+        with self._lock:
+            if version_remota != entrada.version:
+                self._entradas.pop(key, None)
+                return None
+            entrada.verificado_en = time.monotonic()
+        return entrada
+
+    def _entrada_vigente(self, key: str) -> Optional[_EntradaCache]:
+        """Entrada validada (por TTL o por versión), o None si hay que recargar."""
+        entrada, fresca = self._consultar(key)
+        if entrada is None or fresca:
+            return entrada
+        return self._confirmar(key, entrada, self._version_remota(key))
+
+    def _guardar_entrada(self, key: str, data: Optional[Any], version: Optional[str]) -> None:
+        if not self.cacheable(key):
+            return
+        with self._lock:
+            self._entradas[key] = _EntradaCache(data, version, time.monotonic())
+            self._entradas.move_to_end(key)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def _publicar(self, key: str, raw: Optional[bytes], version: Optional[str]) -> None:
+        """
+        Publica la escritura en el cache compartido. `set` solo reemplaza una
+        versión anterior, así que una publicación demorada no pisa otra más
+        nueva. Si falla, se intenta borrar la entrada (que quedó vieja).
+        """
+        if self.shared is None:
+            return
+        try:
+            if raw is None:
+                self.shared.delete(key)
+            else:
+                self.shared.set(key, raw, version)
+            self.shared.publish_invalidation(key, self.instancia_id)
+        except Exception as e:
+            # El backend ya tiene el dato: un fallo del cache compartido no
+            # debe romper la escritura, solo degradar a lecturas del backend.
+            logger.warning(f"CachedStorage: no se pudo publicar {key} en cache compartido: {e}")
+            self._descartar_compartido(key)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Descarta una entrada (o todas si `key` es None)."""
+        with self._lock:
+            if key is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(key, None)
+
+    def save(self, key: str, data: Any, if_version: Optional[str] = None,
+             raw: Optional[bytes] = None) -> Optional[str]:
+        return self._escribir(
+            key, data, raw, lambda raw: self.backend.save(key, data, if_version=if_version, raw=raw),
+        )
+
+    def _escribir(self, key: str, data: Any, raw: Optional[bytes], escritura) -> Optional[str]:
+        """
+        Ejecuta la escritura en el backend y actualiza cache local y
+        compartido. `data` se serializa una sola vez: `escritura(raw)` recibe
+        los mismos bytes que se publican.
+        """
+        if not self.cacheable(key):
+            return escritura(raw)
+        raw = _serialize(data) if raw is None else raw
+        # Mientras se escribe, las demás instancias leen del backend: si la
+        # publicación posterior falla, no queda la versión anterior publicada
+        self._descartar_compartido(key)
+        try:
+            version = escritura(raw)
+        except ConflictoVersion:
+            # Lo que tenemos en memoria quedó viejo
+            self.invalidate(key)
+            raise
+        # Se cachea la forma decodificada (tal como la devolvería un load),
+        # no el objeto del llamador, que puede tener date en vez de str.
+        self._guardar_entrada(key, _deserialize(raw), version)
+        self._publicar(key, raw, version)
+        return version
+
+    def save_dias(self, key: str, data: Any, dias: list[int], if_version: Optional[str] = None,
+                  raw: Optional[bytes] = None) -> Optional[str]:
+        return self._escribir(
+            key, data, raw,
+            lambda raw: self.backend.save_dias(key, data, dias, if_version=if_version, raw=raw),
+        )
+
+    def load(self, key: str) -> Optional[Any]:
+        return self.load_versioned(key)[0]
+
+    def _load_compartido(self, key: str) -> Optional[tuple[bytes, Optional[str]]]:
+        """Entrada del cache compartido (raw, versión), todavía sin confirmar."""
+        if self.shared is None:
+            return None
+        try:
+            return self.shared.get(key)
+        except Exception as e:
+            logger.warning(f"CachedStorage: cache compartido no disponible: {e}")
+            return None
+
+    def _usar_compartido(self, key: str, compartido, version_backend: Optional[str]):
+        """
+        (data, versión) de la entrada compartida si su versión es la del
+        backend; si no, la entrada quedó vieja: se retira y retorna None.
+        """
+        if compartido is None:
             return None
-        return blob.download_as_bytes()
+        raw, version = compartido
+        if version != version_backend:
+            self._retirar_compartido(key, version)
+            return None
+        return _deserialize(raw), version
+
+    def _load_compartido_vigente(self, key: str) -> Optional[tuple[Any, Optional[str]]]:
+        compartido = self._load_compartido(key)
+        if compartido is None:
+            return None
+        return self._usar_compartido(key, compartido, self.backend.version(key))
+
+    def load_versioned(self, key: str) -> tuple[Optional[Any], Optional[str]]:
+        if not self.cacheable(key):
+            return self.backend.load_versioned(key)
+        entrada = self._entrada_vigente(key)
+        if entrada is not None:
+            return entrada.data, entrada.version
+        compartido = self._load_compartido_vigente(key)
+        if compartido is not None:
+            data, version = compartido
+        else:
+            data, version = self.backend.load_versioned(key)
+            if self._poblar_compartido(key, data, version):
+                self._confirmar_poblado(key, version)
+        self._guardar_entrada(key, data, version)
+        return data, version
+
+    def _poblar_compartido(self, key: str, data: Optional[Any], version: Optional[str]) -> bool:
+        """
+        Sube al cache compartido lo que se leyó del backend (miss en ambos
+        niveles), solo si la clave no está: si un escritor ya publicó una
+        versión, esa gana. Retorna True si se publicó; en ese caso quien
+        llama debe confirmarla con _confirmar_poblado.
+        """
+        if data is None or self.shared is None:
+            return False
+        try:
+            return self.shared.set_si_ausente(key, _serialize(data), version)
+        except Exception as e:
+            logger.warning(f"CachedStorage: no se pudo poblar cache compartido: {e}")
+            return False
+
+    def _retirar_compartido(self, key: str, version: Optional[str]) -> None:
+        """
+        La entrada compartida en `version` resultó vieja (un escritor guardó
+        otra versión y no llegó a publicarla): se retira, salvo que ya la haya
+        reemplazado otra.
+        """
+        logger.info(f"CachedStorage: la entrada compartida de {key} (v{version}) está desactualizada")
+        try:
+            self.shared.delete_si_version(key, version)
+        except Exception as e:
+            logger.warning(f"CachedStorage: no se pudo retirar {key} del cache compartido: {e}")
+
+    def _confirmar_poblado(self, key: str, version: Optional[str]) -> None:
+        if self.backend.version(key) != version:
+            self._retirar_compartido(key, version)
+
+    def _descartar_compartido(self, key: str) -> None:
+        """Elimina la entrada compartida de `key` (antes de escribir, o si publicar falló)."""
+        if self.shared is None:
+            return
+        try:
+            self.shared.delete(key)
+        except Exception as e:
+            logger.warning(f"CachedStorage: no se pudo descartar {key} del cache compartido: {e}")
+
+    def load_many_versioned(self, keys: list[str]) -> dict[str, tuple[Optional[Any], Optional[str]]]:
+        resultado: dict[str, tuple[Optional[Any], Optional[str]]] = {}
+        faltantes = [key for key in keys if not self.cacheable(key)]
+        for key in keys:
+            if not self.cacheable(key):
+                continue
+            entrada = self._entrada_vigente(key)
+            if entrada is not None:
+                resultado[key] = (entrada.data, entrada.version)
+                continue
+            compartido = self._load_compartido_vigente(key)
+            if compartido is not None:
+                self._guardar_entrada(key, *compartido)
+                resultado[key] = compartido
+                continue
+            faltantes.append(key)
+        if faltantes:
+            # Un solo lote concurrente al backend para todo lo que no estaba en cache
+            for key, (data, version) in self.backend.load_many_versioned(faltantes).items():
+                if self.cacheable(key):
+                    if self._poblar_compartido(key, data, version):
+                        self._confirmar_poblado(key, version)
+                    self._guardar_entrada(key, data, version)
+                resultado[key] = (data, version)
+        return {key: resultado[key] for key in keys}
+
+    def delete(self, key: str) -> None:
+        if self.cacheable(key):
+            self._descartar_compartido(key)
+        self.backend.delete(key)
+        if self.cacheable(key):
+            self._guardar_entrada(key, None, None)
+            self._publicar(key, None, None)
+
+    def exists(self, key: str) -> bool:
+        return self.version(key) is not None
+
+    def version(self, key: str) -> Optional[str]:
+        if not self.cacheable(key):
+            return self.backend.version(key)
+        entrada = self._entrada_vigente(key)
+        if entrada is not None:
+            return entrada.version
+        return self.load_versioned(key)[1]
+
+    def list_keys(self, prefix: str = "") -> list[str]:
+        return self.backend.list_keys(prefix)
+
+    def save_bytes(self, key: str, data: bytes, content_type: str = "application/octet-stream") -> None:
+        self.backend.save_bytes(key, data, content_type=content_type)
+
+    def save_bytes_desde(self, key: str, archivo: BinaryIO, content_type: str = "application/octet-stream") -> None:
+        self.backend.save_bytes_desde(key, archivo, content_type=content_type)
+
+    def load_bytes(self, key: str) -> Optional[bytes]:
+        return self.backend.load_bytes(key)
 
 
 # ─── Factory ────────────────────────────────────────────────────────────────────
@@ -221,7 +868,11 @@ def get_storage() -> StorageBackend:
     if _storage_instance is not None:
         return _storage_instance
 
-    from .config import STORAGE_BACKEND, GCS_BUCKET_NAME, GCS_PREFIX, LOCAL_STORAGE_PATH
+    from .config import (
+        STORAGE_BACKEND, GCS_BUCKET_NAME, GCS_PREFIX, LOCAL_STORAGE_PATH,
+        GCS_HTTP_POOL_SIZE, STORAGE_CACHE_ENABLED, STORAGE_CACHE_TTL, STORAGE_CACHE_MAX_ENTRADAS,
+        SHARED_CACHE_URL, SHARED_CACHE_TTL, SQLITE_PATH,
+    )
 
     if STORAGE_BACKEND == "gcs":
         if not GCS_BUCKET_NAME:
@@ -232,51 +883,116 @@ def get_storage() -> StorageBackend:
         _storage_instance = GCSStorage(
             bucket_name=GCS_BUCKET_NAME,
             prefix=GCS_PREFIX,
+            pool_size=GCS_HTTP_POOL_SIZE,
         )
+    elif STORAGE_BACKEND == "sqlite":
+        from .storage_sqlite import SQLiteStorage
+        _storage_instance = SQLiteStorage(path=SQLITE_PATH)
     else:
         _storage_instance = LocalStorage(base_path=LOCAL_STORAGE_PATH)
 
+    if STORAGE_CACHE_ENABLED:
+        shared = None
+        if SHARED_CACHE_URL:
+            from .cache_compartido import RedisSharedCache
+            shared = RedisSharedCache(SHARED_CACHE_URL, ttl=SHARED_CACHE_TTL)
+        _storage_instance = CachedStorage(
+            _storage_instance, ttl=STORAGE_CACHE_TTL, shared=shared, max_entradas=STORAGE_CACHE_MAX_ENTRADAS,
+        )
+
     return _storage_instance
 
 
 # ─── Data Access Layer (capa de acceso a datos específica) ───────────────────────
+# Funciones asíncronas: los endpoints las esperan con `await` y la I/O corre
+# sobre el backend asíncrono (ver storage_async.py).
 
 OFERTAS_KEY = "ofertas"
 PARAMETROS_KEY = "parametros"
 PROYECCION_KEY = "proyeccion"
 UPLOADS_PREFIX = "uploads/"
 
+# Objetos append-only o grandes que se leen pocas veces: CachedStorage los
+# pasa directo al backend. La cabeza de la bitácora sí se cachea (se lee en
+# cada edición).
+PREFIJOS_SIN_CACHE = (UPLOADS_PREFIX, "historial/", "bitacora/")
+CLAVES_CACHEADAS = ("bitacora/cabeza",)
+
+
+def get_async_storage():
+    """
+    Backend asíncrono sobre el storage actual (ver storage_async). Es el punto
+    de entrada para los módulos que guardan claves propias (historial, bitácora).
+    """
+    from . import storage_async
+    return storage_async.get_async_storage()
+
+
+async def save_ofertas(ofertas_data: list[dict]) -> None:
+    await get_async_storage().save(OFERTAS_KEY, ofertas_data)
+
+
+async def load_ofertas() -> Optional[list[dict]]:
+    return await get_async_storage().load(OFERTAS_KEY)
+
+
+async def save_parametros(parametros_data: dict) -> None:
+    await get_async_storage().save(PARAMETROS_KEY, parametros_data)
 
-def save_ofertas(ofertas_data: list[dict]) -> None:
-    get_storage().save(OFERTAS_KEY, ofertas_data)
 
+async def load_parametros() -> Optional[dict]:
+    return await get_async_storage().load(PARAMETROS_KEY)
 
-def load_ofertas() -> Optional[list[dict]]:
-    return get_storage().load(OFERTAS_KEY)
+
+async def save_proyeccion(
+    proyeccion_data: dict,
+    if_version: Optional[str] = None,
+    dias_modificados: Optional[list[int]] = None,
+) -> Optional[str]:
+    """
+    Guarda la proyección. Con `if_version` (la versión leída antes de editar)
+    la escritura falla con ConflictoVersion si otro la modificó entretanto.
+    Con `dias_modificados` (índices) el backend puede reescribir solo esos días.
+    """
+    if dias_modificados is not None:
+        return await get_async_storage().save_dias(
+            PROYECCION_KEY, proyeccion_data, dias_modificados, if_version=if_version
+        )
+    return await get_async_storage().save(PROYECCION_KEY, proyeccion_data, if_version=if_version)
 
 
-def save_parametros(parametros_data: dict) -> None:
-    get_storage().save(PARAMETROS_KEY, parametros_data)
+async def load_proyeccion() -> Optional[dict]:
+    return await get_async_storage().load(PROYECCION_KEY)
 
 
-def load_parametros() -> Optional[dict]:
-    return get_storage().load(PARAMETROS_KEY)
+async def load_proyeccion_versionada() -> tuple[Optional[dict], Optional[str]]:
+    """Proyección y la versión a usar como `if_version` al guardarla."""
+    data, version = await get_async_storage().load_versioned(PROYECCION_KEY)
+    return data, version or VERSION_INEXISTENTE
 
 
-def save_proyeccion(proyeccion_data: dict) -> None:
-    get_storage().save(PROYECCION_KEY, proyeccion_data)
+async def delete_proyeccion() -> None:
+    await get_async_storage().delete(PROYECCION_KEY)
 
 
-def load_proyeccion() -> Optional[dict]:
-    return get_storage().load(PROYECCION_KEY)
+async def delete_ofertas() -> None:
+    await get_async_storage().delete(OFERTAS_KEY)
 
 
-def delete_proyeccion() -> None:
-    get_storage().delete(PROYECCION_KEY)
+async def load_many(keys: list[str]) -> dict[str, Optional[Any]]:
+    """Carga varias claves en paralelo (un solo lote contra el backend)."""
+    return await get_async_storage().load_many(keys)
 
 
-def delete_ofertas() -> None:
-    get_storage().delete(OFERTAS_KEY)
+async def load_many_versioned(keys: list[str]) -> dict[str, tuple[Optional[Any], str]]:
+    """Como load_many, con la versión de cada clave (VERSION_INEXISTENTE si falta)."""
+    datos = await get_async_storage().load_many_versioned(keys)
+    return {key: (data, version or VERSION_INEXISTENTE) for key, (data, version) in datos.items()}
+
+
+async def get_version(key: str) -> Optional[str]:
+    """Versión actual de `key` en storage (None si no existe)."""
+    return await get_async_storage().version(key)
 
 
 # ─── Ofertas Martes (ajuste semanal) ─────────────────────────────────────────
@@ -284,25 +1000,148 @@ def delete_ofertas() -> None:
 OFERTAS_MARTES_KEY = "ofertas_martes"
 
 
-def save_ofertas_martes(ofertas_data: list[dict]) -> None:
-    get_storage().save(OFERTAS_MARTES_KEY, ofertas_data)
+async def save_ofertas_martes(ofertas_data: list[dict]) -> None:
+    await get_async_storage().save(OFERTAS_MARTES_KEY, ofertas_data)
+
+
+async def load_ofertas_martes() -> Optional[list[dict]]:
+    return await get_async_storage().load(OFERTAS_MARTES_KEY)
+
+
+async def delete_ofertas_martes() -> None:
+    await get_async_storage().delete(OFERTAS_MARTES_KEY)
+
+
+# ─── Archivo de uploads (direccionado por contenido) ──────────────────────────
+# uploads/blobs/<sha256>              archivo original, comprimido
+# uploads/meta/<sha256>               nombre(s), usuario y fecha de cada subida
+# uploads/ofertas/<sha256>/<parser>/<hoja>  parseo de ese archivo (columnar)
+# Subir dos veces el mismo archivo solo agrega una entrada a la metadata.
+
+UPLOADS_BLOBS = f"{UPLOADS_PREFIX}blobs/"
+UPLOADS_META = f"{UPLOADS_PREFIX}meta/"
+UPLOADS_OFERTAS = f"{UPLOADS_PREFIX}ofertas/"
+UPLOADS_MAX_SUBIDAS = 100  # entradas de auditoría que se conservan por archivo
+# Tipo del archivo original según su extensión (la compresión va en la metadata)
+UPLOADS_CONTENT_TYPES = {
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".xlsm": "application/vnd.ms-excel.sheet.macroEnabled.12",
+    ".xls": "application/vnd.ms-excel",
+    ".zip": "application/zip",
+}
+
+
+def content_type_upload(filename: str) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    return UPLOADS_CONTENT_TYPES.get(extension, "application/octet-stream")
+
 
+def hash_upload(content: bytes) -> str:
+    """SHA-256 hex del archivo: identifica el upload en el archivo."""
+    return hashlib.sha256(content).hexdigest()
 
-def load_ofertas_martes() -> Optional[list[dict]]:
-    return get_storage().load(OFERTAS_MARTES_KEY)
 
+async def save_upload(
+    filename: str, content: bytes, usuario: Optional[str] = None, digest: Optional[str] = None,
+) -> str:
+    """
+    Archiva un archivo subido por su hash de contenido. Retorna el hash.
+    Si el archivo ya estaba archivado no se vuelve a escribir: solo se
+    registra la nueva subida en la metadata.
+    """
+    async def escribir_blob(st, clave: str) -> dict:
+        guardado, compresion = comprimir_bytes(content)
+        await st.save_bytes(clave, guardado, content_type=content_type_upload(filename))
+        return {"tamano": len(content), "compresion": compresion, "tamano_guardado": len(guardado)}
+
+    return await _archivar_upload(filename, digest or hash_upload(content), usuario, escribir_blob)
+
+
+async def save_upload_archivo(
+    filename: str, archivo: BinaryIO, tamano: int, digest: str, usuario: Optional[str] = None,
+) -> str:
+    """
+    Como save_upload, para un upload que puede no caber en memoria
+    (uploads.ArchivoRecibido): se comprime por bloques a un temporal y se
+    sube al storage en streaming. `archivo` debe estar al inicio.
+    """
+    import tempfile
+    from .config import UPLOAD_SPOOL_MB
+    from .storage_async import ejecutar_io
+
+    async def escribir_blob(st, clave: str) -> dict:
+        with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MB * 1024 * 1024) as comprimido:
+            compresion = await ejecutar_io(comprimir_archivo, archivo, comprimido, tamano)
+            if compresion == COMPRESION_NINGUNA:
+                origen, tamano_guardado = archivo, tamano
+            else:
+                origen, tamano_guardado = comprimido, comprimido.tell()
+            origen.seek(0)
+            await st.save_bytes_desde(clave, origen, content_type=content_type_upload(filename))
+        return {"tamano": tamano, "compresion": compresion, "tamano_guardado": tamano_guardado}
 
-def delete_ofertas_martes() -> None:
-    get_storage().delete(OFERTAS_MARTES_KEY)
+    return await _archivar_upload(filename, digest, usuario, escribir_blob)
 
 
-def save_upload(filename: str, content: bytes) -> str:
-    """Guarda un archivo Excel subido. Retorna la key usada."""
+async def _archivar_upload(filename: str, digest: str, usuario: Optional[str], escribir_blob) -> str:
+    """
+    Registra la subida en uploads/meta/<digest> (CAS). `escribir_blob(st,
+    clave)` guarda el binario y retorna tamano/compresion/tamano_guardado;
+    solo se llama si el archivo todavía no estaba archivado.
+    """
     from datetime import datetime
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    key = f"{UPLOADS_PREFIX}{ts}_{filename}"
-    get_storage().save_bytes(
-        key, content,
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    return key
+
+    st = get_async_storage()
+    subida = {"nombre": filename, "usuario": usuario, "fecha": datetime.now().isoformat(timespec="seconds")}
+    clave_meta = f"{UPLOADS_META}{digest}"
+
+    for _ in range(5):
+        meta, version = await st.load_versioned(clave_meta)
+        if meta is None:
+            meta = {
+                "sha256": digest,
+                **await escribir_blob(st, f"{UPLOADS_BLOBS}{digest}"),
+                "subidas": [],
+            }
+        else:
+            logger.info(f"Upload {filename}: ya archivado como {digest[:12]}, solo se registra la subida")
+        meta = {**meta, "subidas": (meta["subidas"] + [subida])[-UPLOADS_MAX_SUBIDAS:]}
+        try:
+            await st.save(clave_meta, meta, if_version=version or VERSION_INEXISTENTE)
+            return digest
+        except ConflictoVersion:
+            continue
+    raise ConflictoVersion(clave_meta, None)
+
+
+async def load_upload_meta(digest: str) -> Optional[dict]:
+    return await get_async_storage().load(f"{UPLOADS_META}{digest}")
+
+
+async def load_upload(digest: str) -> Optional[bytes]:
+    """Archivo original (descomprimido) con hash `digest`."""
+    meta = await load_upload_meta(digest)
+    if meta is None:
+        return None
+    raw = await get_async_storage().load_bytes(f"{UPLOADS_BLOBS}{digest}")
+    return None if raw is None else descomprimir_bytes(raw, meta["compresion"])
+
+
+def _clave_ofertas_upload(digest: str, sheet_name: Optional[str], version_parser: str) -> str:
+    from urllib.parse import quote
+    hoja = quote(sheet_name, safe="") if sheet_name else "_"
+    return f"{UPLOADS_OFERTAS}{digest}/{version_parser}/{hoja}"
+
+
+async def load_ofertas_upload(digest: str, sheet_name: Optional[str], version_parser: str) -> Optional[dict]:
+    """
+    Parseo cacheado de ese archivo y hoja con esa versión del parser (forma
+    columnar, ver parser_excel.ofertas_a_columnas). None si no está.
+    """
+    return await get_async_storage().load(_clave_ofertas_upload(digest, sheet_name, version_parser))
+
+
+async def save_ofertas_upload(
+    digest: str, sheet_name: Optional[str], version_parser: str, columnas: dict,
+) -> None:
+    await get_async_storage().save(_clave_ofertas_upload(digest, sheet_name, version_parser), columnas)
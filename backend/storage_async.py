@@ -0,0 +1,467 @@
+"""
+Variante asíncrona de la capa de persistencia.
+
+Los endpoints son `async def` y leen/escriben a través de AsyncStorageBackend,
+así que una lectura lenta de GCS no ocupa un hilo del threadpool de Starlette.
+
+Implementaciones:
+- AsyncGCSStorage: API JSON de GCS sobre un httpx.AsyncClient con pool de
+  conexiones (keep-alive) compartido por todas las requests.
+- AsyncThreadedStorage: adapta cualquier StorageBackend síncrono (LocalStorage,
+  backends de tests) ejecutándolo en un executor propio y acotado. Linux no
+  tiene I/O asíncrona real para archivos regulares; esto es lo mismo que hace
+  aiofiles, pero sin competir con el threadpool de Starlette.
+- AsyncCachedStorage: usa las mismas entradas que el CachedStorage síncrono;
+  las lecturas calientes se resuelven en el event loop sin I/O.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, BinaryIO, Optional
+from urllib.parse import quote
+
+from .storage import (
+    BLOQUE_STREAM, CachedStorage, ConflictoVersion, GCSStorage, StorageBackend,
+    _content_type, _deserialize, _serialize, get_storage,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Interfaz abstracta ─────────────────────────────────────────────────────────
+
+class AsyncStorageBackend(ABC):
+    """Misma API que StorageBackend, con métodos corrutina."""
+
+    @abstractmethod
+    async def save(self, key: str, data: Any, if_version: Optional[str] = None,
+                   raw: Optional[bytes] = None) -> Optional[str]:
+        """Ver StorageBackend.save (incluye la semántica compare-and-swap y `raw`)."""
+        ...
+
+    async def save_dias(self, key: str, data: Any, dias: list[int], if_version: Optional[str] = None,
+                        raw: Optional[bytes] = None) -> Optional[str]:
+        """Ver StorageBackend.save_dias."""
+        return await self.save(key, data, if_version=if_version, raw=raw)
+
+    @abstractmethod
+    async def load_versioned(self, key: str) -> tuple[Optional[Any], Optional[str]]:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def version(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def list_keys(self, prefix: str = "") -> list[str]:
+        ...
+
+    @abstractmethod
+    async def save_bytes(self, key: str, data: bytes, content_type: str = "application/octet-stream") -> None:
+        ...
+
+    @abstractmethod
+    async def load_bytes(self, key: str) -> Optional[bytes]:
+        ...
+
+    async def save_bytes_desde(self, key: str, archivo: BinaryIO, content_type: str = "application/octet-stream") -> None:
+        """Guarda un binario leído de `archivo`; ver StorageBackend.save_bytes_desde."""
+        await self.save_bytes(key, archivo.read(), content_type=content_type)
+
+    async def load(self, key: str) -> Optional[Any]:
+        return (await self.load_versioned(key))[0]
+
+    async def exists(self, key: str) -> bool:
+        return await self.version(key) is not None
+
+    async def load_many_versioned(self, keys: list[str]) -> dict[str, tuple[Optional[Any], Optional[str]]]:
+        resultados = await asyncio.gather(*(self.load_versioned(key) for key in keys))
+        return dict(zip(keys, resultados))
+
+    async def load_many(self, keys: list[str]) -> dict[str, Optional[Any]]:
+        return {key: data for key, (data, _) in (await self.load_many_versioned(keys)).items()}
+
+
+# ─── Implementación: backend síncrono en executor propio ────────────────────────
+
+class AsyncThreadedStorage(AsyncStorageBackend):
+    """Ejecuta un StorageBackend síncrono en un executor dedicado y acotado."""
+
+    def __init__(self, backend: StorageBackend, executor: ThreadPoolExecutor):
+        self.backend = backend
+        self._executor = executor
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def save(self, key: str, data: Any, if_version: Optional[str] = None,
+                   raw: Optional[bytes] = None) -> Optional[str]:
+        return await self._run(self.backend.save, key, data, if_version=if_version, raw=raw)
+
+    async def save_dias(self, key: str, data: Any, dias: list[int], if_version: Optional[str] = None,
+                        raw: Optional[bytes] = None) -> Optional[str]:
+        return await self._run(self.backend.save_dias, key, data, dias, if_version=if_version, raw=raw)
+
+    async def load_versioned(self, key: str) -> tuple[Optional[Any], Optional[str]]:
+        return await self._run(self.backend.load_versioned, key)
+
+    async def load_many_versioned(self, keys: list[str]) -> dict[str, tuple[Optional[Any], Optional[str]]]:
+        return await self._run(self.backend.load_many_versioned, keys)
+
+    async def delete(self, key: str) -> None:
+        await self._run(self.backend.delete, key)
+
+    async def version(self, key: str) -> Optional[str]:
+        return await self._run(self.backend.version, key)
+
+    async def list_keys(self, prefix: str = "") -> list[str]:
+        return await self._run(self.backend.list_keys, prefix)
+
+    async def save_bytes(self, key: str, data: bytes, content_type: str = "application/octet-stream") -> None:
+        await self._run(self.backend.save_bytes, key, data, content_type=content_type)
+
+    async def save_bytes_desde(self, key: str, archivo: BinaryIO, content_type: str = "application/octet-stream") -> None:
+        await self._run(self.backend.save_bytes_desde, key, archivo, content_type=content_type)
+
+    async def load_bytes(self, key: str) -> Optional[bytes]:
+        return await self._run(self.backend.load_bytes, key)
+
+
+# ─── Implementación: Google Cloud Storage (httpx) ───────────────────────────────
+
+class AsyncGCSStorage(AsyncStorageBackend):
+    """
+    Cliente asíncrono de la API JSON de GCS. Usa los mismos nombres de objeto
+    que GCSStorage, así que ambos ven los mismos datos.
+    """
+
+    API_URL = "https://storage.googleapis.com/storage/v1"
+    UPLOAD_URL = "https://storage.googleapis.com/upload/storage/v1"
+    SCOPES = ["https://www.googleapis.com/auth/devstorage.read_write"]
+
+    def __init__(self, bucket_name: str, prefix: str = "data/", pool_size: int = 8,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        import google.auth
+        import httpx
+        self._credentials, _ = google.auth.default(scopes=self.SCOPES)
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(30.0),
+        )
+        self._executor = executor or _get_executor()
+        self._token_lock = asyncio.Lock()
+        self.bucket_name = bucket_name
+        self.prefix = prefix.rstrip("/") + "/" if prefix else ""
+        logger.info(f"AsyncGCSStorage inicializado: bucket={bucket_name}, prefix={self.prefix}")
+
+    _blob_name = GCSStorage._blob_name
+
+    async def _headers(self) -> dict[str, str]:
+        if not self._credentials.valid:
+            async with self._token_lock:
+                if not self._credentials.valid:
+                    # El refresh de google-auth es bloqueante; va al executor
+                    from google.auth.transport.requests import Request as AuthRequest
+                    loop = asyncio.get_running_loop()
+                    await loop.run_in_executor(self._executor, self._credentials.refresh, AuthRequest())
+        return {"Authorization": f"Bearer {self._credentials.token}"}
+
+    def _url_objeto(self, blob_name: str) -> str:
+        return f"{self.API_URL}/b/{self.bucket_name}/o/{quote(blob_name, safe='')}"
+
+    async def _download(self, blob_name: str) -> tuple[Optional[bytes], Optional[str]]:
+        r = await self._client.get(
+            self._url_objeto(blob_name), params={"alt": "media"}, headers=await self._headers(),
+        )
+        if r.status_code == 404:
+            return None, None
+        r.raise_for_status()
+        return r.content, r.headers.get("x-goog-generation")
+
+    async def _upload(self, blob_name: str, raw: bytes | AsyncIterator[bytes], content_type: str,
+                      if_generation_match: Optional[str] = None,
+                      content_length: Optional[int] = None) -> Optional[str]:
+        params = {"uploadType": "media", "name": blob_name}
+        if if_generation_match is not None:
+            params["ifGenerationMatch"] = if_generation_match
+        headers = {**await self._headers(), "Content-Type": content_type}
+        if content_length is not None:
+            headers["Content-Length"] = str(content_length)
+        r = await self._client.post(
+            f"{self.UPLOAD_URL}/b/{self.bucket_name}/o",
+            params=params,
+            content=raw,
+            headers=headers,
+        )
+        if r.status_code == 412:
+            raise ConflictoVersion(blob_name, if_generation_match)
+        r.raise_for_status()
+        return r.json().get("generation")
+
+    async def save(self, key: str, data: Any, if_version: Optional[str] = None,
+                   raw: Optional[bytes] = None) -> Optional[str]:
+        raw = _serialize(data) if raw is None else raw
+        try:
+            version = await self._upload(self._blob_name(key), raw, _content_type(), if_version)
+        except ConflictoVersion:
+            raise ConflictoVersion(key, if_version)
+        logger.debug(f"AsyncGCSStorage: guardado {key}")
+        return version
+
+    async def load_versioned(self, key: str) -> tuple[Optional[Any], Optional[str]]:
+        raw, version = await self._download(self._blob_name(key))
+        if raw is None:
+            return None, None
+        return _deserialize(raw), version
+
+    async def delete(self, key: str) -> None:
+        r = await self._client.delete(self._url_objeto(self._blob_name(key)), headers=await self._headers())
+        if r.status_code != 404:
+            r.raise_for_status()
+
+    async def version(self, key: str) -> Optional[str]:
+        r = await self._client.get(
+            self._url_objeto(self._blob_name(key)),
+            params={"fields": "generation"},
+            headers=await self._headers(),
+        )
+        if r.status_code == 404:
+            return None
+        r.raise_for_status()
+        return r.json().get("generation")
+
+    async def list_keys(self, prefix: str = "") -> list[str]:
+        keys = []
+        params = {"prefix": f"{self.prefix}{prefix}", "fields": "items(name),nextPageToken"}
+        while True:
+            r = await self._client.get(
+                f"{self.API_URL}/b/{self.bucket_name}/o", params=params, headers=await self._headers(),
+            )
+            r.raise_for_status()
+            body = r.json()
+            for item in body.get("items", []):
+                rel = item["name"]
+                if rel.startswith(self.prefix):
+                    rel = rel[len(self.prefix):]
+                if rel.endswith(".json"):
+                    rel = rel[:-5]
+                keys.append(rel)
+            if not body.get("nextPageToken"):
+                return keys
+            params["pageToken"] = body["nextPageToken"]
+
+    async def save_bytes(self, key: str, data: bytes, content_type: str = "application/octet-stream") -> None:
+        await self._upload(self._blob_name(key, ext=""), data, content_type)
+        logger.debug(f"AsyncGCSStorage: guardado binario {key}")
+
+    async def save_bytes_desde(self, key: str, archivo: BinaryIO, content_type: str = "application/octet-stream") -> None:
+        inicio = archivo.tell()
+        tamano = archivo.seek(0, os.SEEK_END) - inicio
+        archivo.seek(inicio)
+
+        loop = asyncio.get_running_loop()
+
+        async def bloques():
+            while bloque := await loop.run_in_executor(self._executor, archivo.read, BLOQUE_STREAM):
+                yield bloque
+
+        await self._upload(
+            self._blob_name(key, ext=""), bloques(), content_type,
+            content_length=tamano,
+        )
+        logger.debug(f"AsyncGCSStorage: guardado binario {key} (stream)")
+
+    async def load_bytes(self, key: str) -> Optional[bytes]:
+        return (await self._download(self._blob_name(key, ext="")))[0]
+
+
+# ─── Cache en proceso (versión asíncrona) ───────────────────────────────────────
+
+async def _vacio() -> dict:
+    return {}
+
+
+class AsyncCachedStorage(AsyncStorageBackend):
+    """
+    Comparte las entradas (y el cache compartido) de un CachedStorage síncrono,
+    pero hace la I/O a través de un backend asíncrono. Así las rutas sync y
+    async ven el mismo estado, y una lectura dentro del TTL no sale del event loop.
+    """
+
+    def __init__(self, backend: AsyncStorageBackend, cache: CachedStorage, executor: ThreadPoolExecutor):
+        self.backend = backend
+        self.cache = cache
+        self._executor = executor
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+    async def _version_remota(self, key: str) -> Optional[str]:
+        return await self.backend.version(key)
+
+    async def _entrada_vigente(self, key: str):
+        entrada, fresca = self.cache._consultar(key)
+        if entrada is None or fresca:
+            return entrada
+        return self.cache._confirmar(key, entrada, await self._version_remota(key))
+
+    async def _load_faltante(self, key: str) -> tuple[Optional[Any], Optional[str]]:
+        """Miss local: cache compartido y, si tampoco está, backend."""
+        if self.cache.shared is not None:
+            # La entrada compartida solo se usa si su versión es la del backend
+            compartido, version_backend = await asyncio.gather(
+                self._run(self.cache._load_compartido, key), self.backend.version(key),
+            )
+            if compartido is not None:
+                compartido = await self._run(self.cache._usar_compartido, key, compartido, version_backend)
+            if compartido is not None:
+                self.cache._guardar_entrada(key, *compartido)
+                return compartido
+        data, version = await self.backend.load_versioned(key)
+        if self.cache.shared is not None and await self._run(self.cache._poblar_compartido, key, data, version):
+            # Si un escritor guardó entre la lectura y la publicación, se retira la copia vieja
+            if await self.backend.version(key) != version:
+                await self._run(self.cache._retirar_compartido, key, version)
+        self.cache._guardar_entrada(key, data, version)
+        return data, version
+
+    async def load_versioned(self, key: str) -> tuple[Optional[Any], Optional[str]]:
+        if not self.cache.cacheable(key):
+            return await self.backend.load_versioned(key)
+        entrada = await self._entrada_vigente(key)
+        if entrada is not None:
+            return entrada.data, entrada.version
+        return await self._load_faltante(key)
+
+    async def load_many_versioned(self, keys: list[str]) -> dict[str, tuple[Optional[Any], Optional[str]]]:
+        # Las claves que no se cachean van en un solo lote al backend
+        directas = [key for key in keys if not self.cache.cacheable(key)]
+        cacheables = [key for key in keys if self.cache.cacheable(key)]
+        resultados = await asyncio.gather(
+            self.backend.load_many_versioned(directas) if directas else _vacio(),
+            *(self.load_versioned(key) for key in cacheables),
+        )
+        resultado = {**resultados[0], **dict(zip(cacheables, resultados[1:]))}
+        return {key: resultado[key] for key in keys}
+
+    async def save(self, key: str, data: Any, if_version: Optional[str] = None,
+                   raw: Optional[bytes] = None) -> Optional[str]:
+        return await self._escribir(
+            key, data, raw, lambda raw: self.backend.save(key, data, if_version=if_version, raw=raw),
+        )
+
+    async def save_dias(self, key: str, data: Any, dias: list[int], if_version: Optional[str] = None,
+                        raw: Optional[bytes] = None) -> Optional[str]:
+        return await self._escribir(
+            key, data, raw,
+            lambda raw: self.backend.save_dias(key, data, dias, if_version=if_version, raw=raw),
+        )
+
+    async def _escribir(self, key: str, data: Any, raw: Optional[bytes], escritura) -> Optional[str]:
+        """Ver CachedStorage._escribir: `data` se serializa una sola vez."""
+        if not self.cache.cacheable(key):
+            return await escritura(raw)
+        raw = _serialize(data) if raw is None else raw
+        if self.cache.shared is not None:
+            await self._run(self.cache._descartar_compartido, key)
+        try:
+            version = await escritura(raw)
+        except ConflictoVersion:
+            self.cache.invalidate(key)
+            raise
+        self.cache._guardar_entrada(key, _deserialize(raw), version)
+        if self.cache.shared is not None:
+            await self._run(self.cache._publicar, key, raw, version)
+        return version
+
+    async def delete(self, key: str) -> None:
+        if self.cache.cacheable(key) and self.cache.shared is not None:
+            await self._run(self.cache._descartar_compartido, key)
+        await self.backend.delete(key)
+        if not self.cache.cacheable(key):
+            return
+        self.cache._guardar_entrada(key, None, None)
+        if self.cache.shared is not None:
+            await self._run(self.cache._publicar, key, None, None)
+
+    async def version(self, key: str) -> Optional[str]:
+        if not self.cache.cacheable(key):
+            return await self.backend.version(key)
+        entrada = await self._entrada_vigente(key)
+        if entrada is not None:
+            return entrada.version
+        return (await self._load_faltante(key))[1]
+
+    async def list_keys(self, prefix: str = "") -> list[str]:
+        return await self.backend.list_keys(prefix)
+
+    async def save_bytes(self, key: str, data: bytes, content_type: str = "application/octet-stream") -> None:
+        await self.backend.save_bytes(key, data, content_type=content_type)
+
+    async def save_bytes_desde(self, key: str, archivo: BinaryIO, content_type: str = "application/octet-stream") -> None:
+        await self.backend.save_bytes_desde(key, archivo, content_type=content_type)
+
+    async def load_bytes(self, key: str) -> Optional[bytes]:
+        return await self.backend.load_bytes(key)
+
+
+# ─── Factory ────────────────────────────────────────────────────────────────────
+
+_executor: Optional[ThreadPoolExecutor] = None
+_async_instance: Optional[AsyncStorageBackend] = None
+_async_para: Optional[StorageBackend] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        from .config import STORAGE_IO_THREADS
+        _executor = ThreadPoolExecutor(max_workers=STORAGE_IO_THREADS, thread_name_prefix="storage-io")
+    return _executor
+
+
+async def ejecutar_io(fn, *args, **kwargs):
+    """Ejecuta una llamada bloqueante de storage en el executor dedicado (STORAGE_IO_THREADS)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def get_async_storage() -> AsyncStorageBackend:
+    """
+    Retorna el backend asíncrono correspondiente al storage síncrono actual
+    (get_storage()). Se reconstruye si ese singleton cambia (p. ej. en tests).
+    """
+    global _async_instance, _async_para
+    sync = get_storage()
+    if _async_instance is not None and _async_para is sync:
+        return _async_instance
+
+    executor = _get_executor()
+    cache = sync if isinstance(sync, CachedStorage) else None
+    base = cache.backend if cache is not None else sync
+
+    if isinstance(base, GCSStorage):
+        from .config import GCS_HTTP_POOL_SIZE
+        async_base: AsyncStorageBackend = AsyncGCSStorage(
+            bucket_name=base.bucket.name,
+            prefix=base.prefix,
+            pool_size=GCS_HTTP_POOL_SIZE,
+            executor=executor,
+        )
+    else:
+        async_base = AsyncThreadedStorage(base, executor)
+
+    _async_instance = AsyncCachedStorage(async_base, cache, executor) if cache is not None else async_base
+    _async_para = sync
+    return _async_instance
@@ -0,0 +1,421 @@
+"""
+Backend de almacenamiento sobre SQLite (STORAGE_BACKEND=sqlite).
+
+Implementa la misma interfaz StorageBackend, pero en vez de guardar cada
+objeto como un blob monolítico descompone los formatos conocidos en tablas
+indexadas:
+
+- la proyección de trabajo (PROYECCION_KEY) → semanas / dias / lotes
+- las listas de ofertas (OFERTAS_KEY, OFERTAS_MARTES_KEY) → ofertas
+- parámetros → parametros (una fila por parámetro)
+- cualquier otro objeto → objetos.data (blob con el codec configurado)
+
+El formato se decide por la clave y no solo por la forma del dato: las
+versiones del historial y los snapshots de la bitácora también son semanas,
+pero se guardan como blob para que consultar_lotes no las cuente.
+
+Cada fila guarda el dict completo (columna `data`) más columnas indexadas
+para consultas históricas. `save_dias` reescribe solo los días editados y
+los agregados de la semana, en vez de toda la proyección.
+
+Usa WAL: los lectores no bloquean al escritor y ven un snapshot consistente.
+No requiere ningún servicio externo.
+"""
+from __future__ import annotations
+
+import io
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Optional
+
+from .storage import (
+    BLOQUE_STREAM, ConflictoVersion, StorageBackend, VERSION_INEXISTENTE,
+    OFERTAS_KEY, OFERTAS_MARTES_KEY, PARAMETROS_KEY, PROYECCION_KEY,
+    _deserialize, _serialize,
+)
+
+logger = logging.getLogger(__name__)
+
+FORMATO_BLOB = "blob"
+FORMATO_SEMANA = "semana"
+FORMATO_OFERTAS = "ofertas"
+FORMATO_PARAMETROS = "parametros"
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS objetos (
+    key      TEXT PRIMARY KEY,
+    version  INTEGER NOT NULL,
+    existe   INTEGER NOT NULL DEFAULT 1,
+    formato  TEXT NOT NULL,
+    data     BLOB
+);
+CREATE TABLE IF NOT EXISTS semanas (
+    key                         TEXT PRIMARY KEY,
+    fecha_inicio                TEXT NOT NULL,
+    fecha_fin                   TEXT,
+    total_pollos_semana         INTEGER,
+    produccion_cajas_semanales  REAL,
+    data                        BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_semanas_fecha ON semanas(fecha_inicio);
+CREATE TABLE IF NOT EXISTS dias (
+    key           TEXT NOT NULL,
+    idx           INTEGER NOT NULL,
+    fecha         TEXT NOT NULL,
+    total_pollos  INTEGER,
+    data          BLOB NOT NULL,
+    PRIMARY KEY (key, idx)
+);
+CREATE TABLE IF NOT EXISTS lotes (
+    key       TEXT NOT NULL,
+    dia_idx   INTEGER NOT NULL,
+    pos       INTEGER NOT NULL,
+    fecha     TEXT NOT NULL,
+    granja    TEXT NOT NULL,
+    galpon    INTEGER,
+    nucleo    INTEGER,
+    sexo      TEXT,
+    cantidad  INTEGER,
+    data      BLOB NOT NULL,
+    PRIMARY KEY (key, dia_idx, pos)
+);
+CREATE INDEX IF NOT EXISTS idx_lotes_granja ON lotes(granja, galpon, nucleo);
+CREATE INDEX IF NOT EXISTS idx_lotes_fecha ON lotes(fecha);
+CREATE TABLE IF NOT EXISTS ofertas (
+    key            TEXT NOT NULL,
+    pos            INTEGER NOT NULL,
+    granja         TEXT NOT NULL,
+    galpon         INTEGER,
+    nucleo         INTEGER,
+    sexo           TEXT,
+    fecha_peso     TEXT,
+    fecha_ingreso  TEXT,
+    cantidad       INTEGER,
+    data           BLOB NOT NULL,
+    PRIMARY KEY (key, pos)
+);
+CREATE INDEX IF NOT EXISTS idx_ofertas_lote ON ofertas(granja, galpon, nucleo, sexo, fecha_ingreso);
+CREATE TABLE IF NOT EXISTS parametros (
+    key     TEXT NOT NULL,
+    nombre  TEXT NOT NULL,
+    valor   BLOB NOT NULL,
+    PRIMARY KEY (key, nombre)
+);
+CREATE TABLE IF NOT EXISTS binarios (
+    key           TEXT PRIMARY KEY,
+    content_type  TEXT,
+    data          BLOB NOT NULL
+);
+"""
+
+_TABLAS_ESTRUCTURADAS = ("semanas", "dias", "lotes", "ofertas", "parametros")
+
+
+def _texto(valor: Any) -> Optional[str]:
+    """Columna indexada de fecha: date → ISO, str se deja igual."""
+    if valor is None:
+        return None
+    return valor.isoformat() if hasattr(valor, "isoformat") else str(valor)
+
+
+def _formato_de(key: str, data: Any) -> str:
+    nombre = key.rsplit("/", 1)[-1]
+    if (nombre == PROYECCION_KEY and isinstance(data, dict)
+            and isinstance(data.get("dias"), list) and "fecha_inicio" in data):
+        return FORMATO_SEMANA
+    if (nombre in (OFERTAS_KEY, OFERTAS_MARTES_KEY) and isinstance(data, list) and data
+            and all(isinstance(o, dict) and "granja" in o and "fecha_peso" in o for o in data)):
+        return FORMATO_OFERTAS
+    if (nombre == PARAMETROS_KEY and isinstance(data, dict)
+            and all(not isinstance(v, (dict, list)) for v in data.values())):
+        return FORMATO_PARAMETROS
+    return FORMATO_BLOB
+
+
+class SQLiteStorage(StorageBackend):
+    """Storage en un archivo SQLite con tablas por entidad y modo WAL."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._conexion() as conn:
+            conn.executescript(_ESQUEMA)
+        logger.info(f"SQLiteStorage inicializado en: {self.path}")
+
+    # ── conexión y transacciones ──
+
+    def _conexion(self) -> sqlite3.Connection:
+        """Una conexión por hilo (sqlite3 no comparte conexiones entre hilos)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaccion(self, escritura: bool = False):
+        conn = self._conexion()
+        # IMMEDIATE toma el lock de escritura al empezar: el chequeo de versión
+        # y la escritura quedan en la misma transacción (compare-and-swap).
+        conn.execute("BEGIN IMMEDIATE" if escritura else "BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _fila_objeto(self, conn, key: str) -> Optional[tuple[int, int, str, Optional[bytes]]]:
+        return conn.execute(
+            "SELECT version, existe, formato, data FROM objetos WHERE key = ?", (key,)
+        ).fetchone()
+
+    def _verificar_version(self, conn, key: str, if_version: Optional[str]) -> int:
+        """Chequea el CAS y retorna el contador actual (0 si la clave nunca existió)."""
+        fila = self._fila_objeto(conn, key)
+        contador = fila[0] if fila else 0
+        if if_version is not None:
+            actual = str(contador) if fila and fila[1] else None
+            if (actual or VERSION_INEXISTENTE) != if_version:
+                raise ConflictoVersion(key, if_version, actual)
+        return contador
+
+    # ── escritura por formato ──
+
+    def _borrar_estructura(self, conn, key: str) -> None:
+        for tabla in _TABLAS_ESTRUCTURADAS:
+            conn.execute(f"DELETE FROM {tabla} WHERE key = ?", (key,))
+
+    def _escribir_semana_cabecera(self, conn, key: str, data: dict) -> None:
+        cabecera = {k: v for k, v in data.items() if k != "dias"}
+        conn.execute(
+            "INSERT OR REPLACE INTO semanas (key, fecha_inicio, fecha_fin, total_pollos_semana, "
+            "produccion_cajas_semanales, data) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, _texto(data["fecha_inicio"]), _texto(data.get("fecha_fin")),
+             data.get("total_pollos_semana"), data.get("produccion_cajas_semanales"),
+             _serialize(cabecera)),
+        )
+
+    def _escribir_dia(self, conn, key: str, idx: int, dia: dict) -> None:
+        conn.execute("DELETE FROM lotes WHERE key = ? AND dia_idx = ?", (key, idx))
+        fecha = _texto(dia["fecha"])
+        conn.executemany(
+            "INSERT INTO lotes (key, dia_idx, pos, fecha, granja, galpon, nucleo, sexo, cantidad, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (key, idx, pos, fecha, lote.get("granja", ""), lote.get("galpon"), lote.get("nucleo"),
+                 lote.get("sexo"), lote.get("cantidad"), _serialize(lote))
+                for pos, lote in enumerate(dia.get("lotes", []))
+            ],
+        )
+        cabecera = {k: v for k, v in dia.items() if k != "lotes"}
+        conn.execute(
+            "INSERT OR REPLACE INTO dias (key, idx, fecha, total_pollos, data) VALUES (?, ?, ?, ?, ?)",
+            (key, idx, fecha, dia.get("total_pollos"), _serialize(cabecera)),
+        )
+
+    def _escribir(self, conn, key: str, data: Any, formato: str,
+                  raw: Optional[bytes] = None) -> Optional[bytes]:
+        """
+        Escribe `data` en sus tablas. Retorna el blob a guardar en objetos.data
+        (`raw` si ya viene serializado).
+        """
+        self._borrar_estructura(conn, key)
+        if formato == FORMATO_SEMANA:
+            self._escribir_semana_cabecera(conn, key, data)
+            for idx, dia in enumerate(data["dias"]):
+                self._escribir_dia(conn, key, idx, dia)
+            return None
+        if formato == FORMATO_OFERTAS:
+            conn.executemany(
+                "INSERT INTO ofertas (key, pos, granja, galpon, nucleo, sexo, fecha_peso, fecha_ingreso, "
+                "cantidad, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (key, pos, o.get("granja", ""), o.get("galpon"), o.get("nucleo"), o.get("sexo"),
+                     _texto(o.get("fecha_peso")), _texto(o.get("fecha_ingreso")), o.get("cantidad"),
+                     _serialize(o))
+                    for pos, o in enumerate(data)
+                ],
+            )
+            return None
+        if formato == FORMATO_PARAMETROS:
+            conn.executemany(
+                "INSERT INTO parametros (key, nombre, valor) VALUES (?, ?, ?)",
+                [(key, nombre, _serialize(valor)) for nombre, valor in data.items()],
+            )
+            return None
+        return _serialize(data) if raw is None else raw
+
+    def _registrar(self, conn, key: str, contador: int, formato: str, blob: Optional[bytes]) -> str:
+        nueva = contador + 1
+        conn.execute(
+            "INSERT INTO objetos (key, version, existe, formato, data) VALUES (?, ?, 1, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET version = excluded.version, existe = 1, "
+            "formato = excluded.formato, data = excluded.data",
+            (key, nueva, formato, blob),
+        )
+        return str(nueva)
+
+    # ── lectura por formato ──
+
+    def _leer(self, conn, key: str, formato: str, blob: Optional[bytes]) -> Any:
+        if formato == FORMATO_SEMANA:
+            fila = conn.execute("SELECT data FROM semanas WHERE key = ?", (key,)).fetchone()
+            semana = _deserialize(fila[0])
+            dias = [_deserialize(d) for (d,) in conn.execute(
+                "SELECT data FROM dias WHERE key = ? ORDER BY idx", (key,))]
+            for dia in dias:
+                dia["lotes"] = []
+            for dia_idx, data in conn.execute(
+                    "SELECT dia_idx, data FROM lotes WHERE key = ? ORDER BY dia_idx, pos", (key,)):
+                dias[dia_idx]["lotes"].append(_deserialize(data))
+            semana["dias"] = dias
+            return semana
+        if formato == FORMATO_OFERTAS:
+            return [_deserialize(d) for (d,) in conn.execute(
+                "SELECT data FROM ofertas WHERE key = ? ORDER BY pos", (key,))]
+        if formato == FORMATO_PARAMETROS:
+            return {nombre: _deserialize(valor) for nombre, valor in conn.execute(
+                "SELECT nombre, valor FROM parametros WHERE key = ?", (key,))}
+        return _deserialize(blob)
+
+    # ── API StorageBackend ──
+
+    def save(self, key: str, data: Any, if_version: Optional[str] = None,
+             raw: Optional[bytes] = None) -> Optional[str]:
+        formato = _formato_de(key, data)
+        with self._transaccion(escritura=True) as conn:
+            contador = self._verificar_version(conn, key, if_version)
+            blob = self._escribir(conn, key, data, formato, raw)
+            version = self._registrar(conn, key, contador, formato, blob)
+        logger.debug(f"SQLiteStorage: guardado {key} ({formato}, v{version})")
+        return version
+
+    def save_dias(self, key: str, data: Any, dias: Iterable[int],
+                  if_version: Optional[str] = None, raw: Optional[bytes] = None) -> Optional[str]:
+        """
+        Actualiza una proyección ya guardada reescribiendo solo las filas de
+        los días indicados y los agregados de la semana. Si la estructura
+        guardada no coincide (otra cantidad de días, otro formato), cae a un
+        guardado completo dentro de la misma transacción.
+        """
+        if _formato_de(key, data) != FORMATO_SEMANA:
+            return self.save(key, data, if_version=if_version, raw=raw)
+        with self._transaccion(escritura=True) as conn:
+            contador = self._verificar_version(conn, key, if_version)
+            fila = self._fila_objeto(conn, key)
+            n_dias = conn.execute("SELECT COUNT(*) FROM dias WHERE key = ?", (key,)).fetchone()[0]
+            if not fila or not fila[1] or fila[2] != FORMATO_SEMANA or n_dias != len(data["dias"]):
+                self._escribir(conn, key, data, FORMATO_SEMANA)
+            else:
+                self._escribir_semana_cabecera(conn, key, data)
+                for idx in sorted(set(dias)):
+                    self._escribir_dia(conn, key, idx, data["dias"][idx])
+            version = self._registrar(conn, key, contador, FORMATO_SEMANA, None)
+        logger.debug(f"SQLiteStorage: guardados días {sorted(set(dias))} de {key} (v{version})")
+        return version
+
+    def load_versioned(self, key: str) -> tuple[Optional[Any], Optional[str]]:
+        with self._transaccion() as conn:
+            fila = self._fila_objeto(conn, key)
+            if not fila or not fila[1]:
+                return None, None
+            version, _, formato, blob = fila
+            return self._leer(conn, key, formato, blob), str(version)
+
+    def load(self, key: str) -> Optional[Any]:
+        return self.load_versioned(key)[0]
+
+    def delete(self, key: str) -> None:
+        with self._transaccion(escritura=True) as conn:
+            self._borrar_estructura(conn, key)
+            # La fila se conserva (existe=0) para que el contador no se reinicie
+            conn.execute("UPDATE objetos SET existe = 0, data = NULL WHERE key = ?", (key,))
+        logger.debug(f"SQLiteStorage: eliminado {key}")
+
+    def exists(self, key: str) -> bool:
+        return self.version(key) is not None
+
+    def version(self, key: str) -> Optional[str]:
+        fila = self._conexion().execute(
+            "SELECT version FROM objetos WHERE key = ? AND existe = 1", (key,)
+        ).fetchone()
+        return str(fila[0]) if fila else None
+
+    def list_keys(self, prefix: str = "") -> list[str]:
+        return [k for (k,) in self._conexion().execute(
+            "SELECT key FROM objetos WHERE existe = 1 AND substr(key, 1, ?) = ? ORDER BY key",
+            (len(prefix), prefix),
+        )]
+
+    def save_bytes(self, key: str, data: bytes, content_type: str = "application/octet-stream") -> None:
+        with self._transaccion(escritura=True) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO binarios (key, content_type, data) VALUES (?, ?, ?)",
+                (key, content_type, data),
+            )
+
+    def save_bytes_desde(self, key: str, archivo: BinaryIO, content_type: str = "application/octet-stream") -> None:
+        """
+        Reserva el blob con zeroblob(n) y lo llena por bloques con la API
+        incremental de sqlite3 (blobopen): el archivo nunca está entero en
+        memoria. Requiere conocer el tamaño, así que `archivo` debe ser seekable.
+        """
+        if not archivo.seekable():
+            return super().save_bytes_desde(key, archivo, content_type=content_type)
+        inicio = archivo.tell()
+        tamano = archivo.seek(0, io.SEEK_END) - inicio
+        archivo.seek(inicio)
+        with self._transaccion(escritura=True) as conn:
+            fila = conn.execute(
+                "INSERT OR REPLACE INTO binarios (key, content_type, data) VALUES (?, ?, zeroblob(?))",
+                (key, content_type, tamano),
+            ).lastrowid
+            with conn.blobopen("binarios", "data", fila) as blob:
+                while bloque := archivo.read(BLOQUE_STREAM):
+                    blob.write(bloque)
+        logger.debug(f"SQLiteStorage: guardado binario {key} (stream, {tamano} bytes)")
+
+    def load_bytes(self, key: str) -> Optional[bytes]:
+        fila = self._conexion().execute("SELECT data FROM binarios WHERE key = ?", (key,)).fetchone()
+        return bytes(fila[0]) if fila else None
+
+    # ── consultas históricas ──
+
+    def consultar_lotes(
+        self,
+        granja: Optional[str] = None,
+        galpon: Optional[int] = None,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+    ) -> list[dict]:
+        """
+        Lotes faenados en cualquier proyección guardada, filtrando por granja,
+        galpón y rango de fechas de faena (ISO). Usa los índices de `lotes`.
+        """
+        condiciones, args = ["o.existe = 1"], []
+        if granja is not None:
+            condiciones.append("l.granja = ?")
+            args.append(granja)
+        if galpon is not None:
+            condiciones.append("l.galpon = ?")
+            args.append(galpon)
+        if desde is not None:
+            condiciones.append("l.fecha >= ?")
+            args.append(desde)
+        if hasta is not None:
+            condiciones.append("l.fecha <= ?")
+            args.append(hasta)
+        filas = self._conexion().execute(
+            "SELECT l.key, l.fecha, l.data FROM lotes l JOIN objetos o ON o.key = l.key "
+            f"WHERE {' AND '.join(condiciones)} ORDER BY l.fecha, l.key, l.dia_idx, l.pos",
+            args,
+        )
+        return [{"key": key, "fecha": fecha, **_deserialize(data)} for key, fecha, data in filas]
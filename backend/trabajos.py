@@ -0,0 +1,96 @@
+"""
+Pool acotado para el trabajo CPU-bound de los endpoints (parseo de Excel,
+ajuste martes, generación de la proyección).
+
+Los endpoints son `async def`: si parsean en el event loop, un archivo grande
+congela todas las demás requests del worker. Acá el trabajo corre en un pool
+aparte (hilos o procesos, CPU_POOL_MODO) con un límite de trabajos en cola +
+en curso (CPU_COLA_MAX). Superado el límite se rechaza de inmediato con
+ColaLlena (→ 503 con Retry-After) en vez de acumular requests sin techo.
+
+En modo "process" las funciones y sus argumentos deben ser picklables
+(funciones a nivel de módulo, modelos pydantic, bytes).
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+MODO_HILOS = "thread"
+MODO_PROCESOS = "process"
+
+
+class ColaLlena(Exception):
+    """El pool ya tiene CPU_COLA_MAX trabajos pendientes; reintentar más tarde."""
+
+
+class PoolCPU:
+    """Executor con límite de profundidad de cola."""
+
+    def __init__(self, workers: int, max_cola: int, modo: str = MODO_HILOS):
+        if modo == MODO_PROCESOS:
+            self._executor: Executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cpu")
+        self.workers = workers
+        self.max_cola = max_cola
+        self.modo = modo
+        self._en_curso = 0
+        self._lock = threading.Lock()
+        logger.info(f"PoolCPU: {workers} workers ({modo}), cola máxima {max_cola}")
+
+    @property
+    def en_curso(self) -> int:
+        return self._en_curso
+
+    def _reservar(self) -> None:
+        with self._lock:
+            if self._en_curso >= self.max_cola:
+                raise ColaLlena(f"Hay {self._en_curso} trabajos en curso")
+            self._en_curso += 1
+
+    def _liberar(self) -> None:
+        with self._lock:
+            self._en_curso -= 1
+
+    async def ejecutar(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Ejecuta fn(*args, **kwargs) en el pool. Lanza ColaLlena si está saturado.
+
+        El lugar se libera cuando termina el trabajo en el executor, no cuando
+        termina el await: si la request se cancela con el trabajo ya corriendo,
+        sigue contando hasta que el worker quede libre.
+        """
+        self._reservar()
+        try:
+            futuro = self._executor.submit(functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            self._liberar()
+            raise
+        futuro.add_done_callback(lambda _: self._liberar())
+        return await asyncio.wrap_future(futuro)
+
+    def cerrar(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool: Optional[PoolCPU] = None
+
+
+def get_pool() -> PoolCPU:
+    global _pool
+    if _pool is None:
+        from .config import CPU_WORKERS, CPU_COLA_MAX, CPU_POOL_MODO
+        _pool = PoolCPU(CPU_WORKERS, CPU_COLA_MAX, CPU_POOL_MODO)
+    return _pool
+
+
+async def ejecutar(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Atajo: ejecuta en el pool global."""
+    return await get_pool().ejecutar(fn, *args, **kwargs)
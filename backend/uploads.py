@@ -0,0 +1,313 @@
+"""
+Recepción de archivos subidos sin cargarlos enteros en memoria.
+
+El cuerpo de la request lo recibe Starlette y vuelca cada archivo a su
+propio spool (SpooledTemporaryFile: en memoria hasta 1 MB, en disco por
+encima). El tamaño se controla mientras llega: LimiteCuerpo corta las rutas
+de upload apenas el cuerpo supera UPLOAD_MAX_MB por archivo (por
+Content-Length antes de leer nada, o contando los bloques si no viene), con
+413. recibir() no copia el archivo: toma el spool de Starlette y calcula el
+SHA-256 y el tamaño leyéndolo por bloques en el executor de I/O.
+
+El parser recibe los bytes (spool en memoria), el archivo abierto (spool en
+disco) o, con el pool de procesos, la ruta de una copia temporal; el archivo
+se comprime hacia el storage por bloques (storage.save_upload_archivo). Los
+.zip de una carga múltiple se descomprimen miembro a miembro con los mismos
+límites (extraer_zip), cada miembro a un spool propio.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from typing import BinaryIO, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+BLOQUE_LECTURA = 1024 * 1024
+# Encabezados de cada parte y campos de formulario que acompañan a los archivos
+MARGEN_MULTIPART = 64 * 1024
+
+
+class ArchivoDemasiadoGrande(Exception):
+    """El upload supera UPLOAD_MAX_MB."""
+
+    def __init__(self, nombre: str, limite: int):
+        super().__init__(f"El archivo {nombre} supera el máximo de {limite // (1024 * 1024)} MB")
+        self.limite = limite
+
+
+class CuerpoDemasiadoGrande(Exception):
+    """El cuerpo de una request de upload supera su máximo (ver LimiteCuerpo)."""
+
+    def __init__(self, limite: int):
+        super().__init__(f"La carga supera el máximo de {limite // (1024 * 1024)} MB")
+        self.limite = limite
+
+
+class ArchivosDeMas(Exception):
+    """Un upload por lotes trae más de UPLOAD_MAX_ARCHIVOS archivos."""
+
+    def __init__(self, cantidad: int, limite: int):
+        super().__init__(f"Se recibieron {cantidad} archivos; el máximo por carga es {limite}")
+
+
+class ArchivoRecibido:
+    """
+    Upload ya recibido: hash, tamaño y contenido en memoria o en disco.
+
+    El contenido es el spool de Starlette (`upload`, que cierra Starlette al
+    terminar la request) o, para los miembros de un zip, un spool propio.
+    """
+
+    def __init__(self, nombre: str, limite_memoria: int, max_bytes: int,
+                 upload: Optional[BinaryIO] = None):
+        self.nombre = nombre
+        self.tamano = 0
+        self.digest = ""
+        self._limite_memoria = limite_memoria
+        self._max_bytes = max_bytes
+        self._sha = hashlib.sha256()
+        self._upload = upload
+        self._buffer: Optional[BytesIO] = BytesIO() if upload is None else None
+        self._archivo: Optional[BinaryIO] = None
+        self._ruta: Optional[str] = None
+
+    @property
+    def en_disco(self) -> bool:
+        if self._upload is not None:
+            # SpooledTemporaryFile pasa a disco al superar su max_size, que
+            # para el spool de Starlette es _limite_memoria (ver recibir)
+            return self.tamano > self._limite_memoria
+        return self._ruta is not None
+
+    def _contar(self, bloque: bytes) -> None:
+        """Suma un bloque al tamaño (controlando el máximo) y al hash."""
+        self.tamano += len(bloque)
+        if self.tamano > self._max_bytes:
+            raise ArchivoDemasiadoGrande(self.nombre, self._max_bytes)
+        self._sha.update(bloque)
+
+    def _agregar(self, bloque: bytes) -> None:
+        """Suma un bloque y lo vuelca al spool propio."""
+        self._contar(bloque)
+        self._escribir(bloque)
+
+    def _medir(self) -> "ArchivoRecibido":
+        """
+        Hash y tamaño del upload, leyéndolo por bloques (bloqueante). El hash
+        se necesita antes de parsear (es la clave del parseo cacheado y del
+        archivo de uploads), así que no puede calcularse al comprimir.
+        """
+        self._upload.seek(0)
+        while bloque := self._upload.read(BLOQUE_LECTURA):
+            self._contar(bloque)
+        return self._terminar()
+
+    def _terminar(self) -> "ArchivoRecibido":
+        self.digest = self._sha.hexdigest()
+        return self
+
+    def _temporal(self) -> BinaryIO:
+        # Con nombre, para poder entregarle la ruta al parser
+        fd, self._ruta = tempfile.mkstemp(prefix="upload-", suffix=os.path.splitext(self.nombre)[1])
+        self._archivo = os.fdopen(fd, "w+b")
+        return self._archivo
+
+    def _escribir(self, bloque: bytes) -> None:
+        if self._buffer is not None and self._buffer.tell() + len(bloque) > self._limite_memoria:
+            self._temporal().write(self._buffer.getbuffer())
+            self._buffer = None
+            logger.debug(f"Upload {self.nombre}: supera el spool en memoria, se vuelca a {self._ruta}")
+        (self._buffer if self._buffer is not None else self._archivo).write(bloque)
+
+    def fuente(self, para_procesos: bool = False) -> Union[bytes, str, BinaryIO]:
+        """
+        Lo que recibe el parser: bytes si está en memoria; si está en disco,
+        el archivo abierto, o su ruta con `para_procesos` (el pool de procesos
+        solo acepta argumentos picklables). Un upload en disco se copia a un
+        temporal con nombre solo en ese caso. Bloqueante: llamar en el
+        executor de I/O.
+        """
+        if self._upload is None:
+            if self._ruta is not None:
+                self._archivo.flush()
+                return self._ruta
+            return self._buffer.getvalue()
+        self._upload.seek(0)
+        if not self.en_disco:
+            return self._upload.read()
+        if not para_procesos:
+            return self._upload
+        if self._ruta is None:
+            shutil.copyfileobj(self._upload, self._temporal(), BLOQUE_LECTURA)
+            self._archivo.flush()
+        return self._ruta
+
+    def abrir(self) -> BinaryIO:
+        """El contenido como archivo, posicionado al inicio."""
+        if self._upload is not None:
+            archivo = self._upload
+        else:
+            archivo = self._archivo if self._ruta is not None else self._buffer
+        archivo.seek(0)
+        return archivo
+
+    def cerrar(self) -> None:
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+        if self._ruta is not None:
+            try:
+                os.unlink(self._ruta)
+            except FileNotFoundError:
+                pass
+        self._buffer = None
+
+
+def _spool_starlette() -> int:
+    """Tamaño a partir del cual Starlette vuelca cada archivo del formulario a disco."""
+    from starlette.formparsers import MultiPartParser
+
+    return MultiPartParser.spool_max_size
+
+
+def _limites(max_bytes: Optional[int], spool_bytes: Optional[int]) -> tuple[int, int]:
+    from .config import UPLOAD_MAX_MB, UPLOAD_SPOOL_MB
+
+    return (
+        UPLOAD_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes,
+        UPLOAD_SPOOL_MB * 1024 * 1024 if spool_bytes is None else spool_bytes,
+    )
+
+
+async def recibir(file, max_bytes: Optional[int] = None) -> ArchivoRecibido:
+    """
+    Toma el UploadFile `file` sin copiarlo y calcula su SHA-256 y tamaño en
+    el executor de I/O. Más de `max_bytes` → ArchivoDemasiadoGrande. Quien
+    llama debe cerrar el resultado (ArchivoRecibido.cerrar).
+    """
+    from .storage_async import ejecutar_io
+
+    max_bytes, _ = _limites(max_bytes, None)
+    if file.size is not None and file.size > max_bytes:
+        raise ArchivoDemasiadoGrande(file.filename, max_bytes)
+    recibido = ArchivoRecibido(file.filename, _spool_starlette(), max_bytes, upload=file.file)
+    return await ejecutar_io(recibido._medir)
+
+
+class LimiteCuerpo:
+    """
+    Middleware ASGI que limita el cuerpo de las rutas de upload mientras se
+    recibe, antes de que Starlette lo termine de volcar a sus spools.
+
+    `rutas` mapea cada ruta a cuántos archivos admite (None →
+    UPLOAD_MAX_ARCHIVOS); el máximo es UPLOAD_MAX_MB por archivo más
+    MARGEN_MULTIPART. Un Content-Length mayor se rechaza sin leer el cuerpo;
+    sin Content-Length, se cuentan los bloques y se corta al superarlo.
+    """
+
+    def __init__(self, app, rutas: dict[str, Optional[int]]):
+        self.app = app
+        self.rutas = rutas
+
+    def _limite(self, ruta: str) -> Optional[int]:
+        if ruta not in self.rutas:
+            return None
+        from .config import UPLOAD_MAX_ARCHIVOS, UPLOAD_MAX_MB
+
+        archivos = self.rutas[ruta] or UPLOAD_MAX_ARCHIVOS
+        return archivos * UPLOAD_MAX_MB * 1024 * 1024 + MARGEN_MULTIPART
+
+    async def __call__(self, scope, receive, send):
+        limite = self._limite(scope["path"]) if scope["type"] == "http" else None
+        if limite is None:
+            await self.app(scope, receive, send)
+            return
+
+        largo = dict(scope["headers"]).get(b"content-length")
+        if largo is not None and largo.isdigit() and int(largo) > limite:
+            await _rechazar(scope, receive, send, limite)
+            return
+
+        recibidos, excedido = 0, False
+
+        async def receive_limitado():
+            nonlocal recibidos, excedido
+            mensaje = await receive()
+            if mensaje["type"] == "http.request":
+                recibidos += len(mensaje.get("body", b""))
+                if recibidos > limite:
+                    excedido = True
+                    raise CuerpoDemasiadoGrande(limite)
+            return mensaje
+
+        async def send_controlado(mensaje):
+            # Si el cuerpo se cortó, la respuesta de error de la app se
+            # reemplaza por el 413
+            if not excedido:
+                await send(mensaje)
+
+        try:
+            await self.app(scope, receive_limitado, send_controlado)
+        except CuerpoDemasiadoGrande:
+            pass
+        if excedido:
+            await _rechazar(scope, receive, send, limite)
+
+
+async def _rechazar(scope, receive, send, limite: int) -> None:
+    from starlette.responses import JSONResponse
+
+    logger.warning(f"Upload rechazado en {scope['path']}: supera {limite} bytes")
+    respuesta = JSONResponse(status_code=413, content={"detail": str(CuerpoDemasiadoGrande(limite))})
+    await respuesta(scope, receive, send)
+
+
+def es_zip(nombre: str) -> bool:
+    return os.path.splitext(nombre or "")[1].lower() == ".zip"
+
+
+def extraer_zip(
+    recibido: ArchivoRecibido, aceptar, max_archivos: Optional[int] = None,
+    max_bytes: Optional[int] = None, spool_bytes: Optional[int] = None,
+) -> list[ArchivoRecibido]:
+    """
+    Archivos de un .zip recibido cuyo nombre cumple `aceptar(nombre)`, cada
+    uno descomprimido por bloques a su propio spool con los mismos límites
+    que un upload (un zip bomb corta en UPLOAD_MAX_MB por archivo). Más de
+    `max_archivos` archivos → ArchivosDeMas. Quien llama cierra el resultado.
+    """
+    import zipfile
+    from .config import UPLOAD_MAX_ARCHIVOS
+
+    max_bytes, spool_bytes = _limites(max_bytes, spool_bytes)
+    max_archivos = UPLOAD_MAX_ARCHIVOS if max_archivos is None else max_archivos
+    extraidos: list[ArchivoRecibido] = []
+    try:
+        with zipfile.ZipFile(recibido.abrir()) as zf:
+            miembros = [
+                m for m in zf.infolist()
+                if not m.is_dir() and not m.filename.startswith("__MACOSX/") and aceptar(m.filename)
+            ]
+            if len(miembros) > max_archivos:
+                raise ArchivosDeMas(len(miembros), max_archivos)
+            for miembro in miembros:
+                actual = ArchivoRecibido(os.path.basename(miembro.filename), spool_bytes, max_bytes)
+                extraidos.append(actual)
+                with zf.open(miembro) as origen:
+                    while bloque := origen.read(BLOQUE_LECTURA):
+                        actual._agregar(bloque)
+                actual._terminar()
+    except zipfile.BadZipFile as e:
+        for r in extraidos:
+            r.cerrar()
+        raise ValueError(f"{recibido.nombre}: zip inválido ({e})")
+    except BaseException:
+        for r in extraidos:
+            r.cerrar()
+        raise
+    return extraidos
@@ -2,7 +2,7 @@ import React, { useState } from 'react'
 import { motion, AnimatePresence } from 'framer-motion'
 import { BarChart, KanbanSquare, Table, ArrowLeftRight, X, Calendar, Settings2, PackageOpen, Download, RefreshCw, UploadCloud, CheckCircle2, AlertTriangle, PlusCircle, FileSpreadsheet, ChevronDown, ChevronRight, Ban } from 'lucide-react'
 import toast from 'react-hot-toast'
-import { eliminarLote, moverLote, uploadAjusteMartes } from '../services/api'
+import { eliminarLote, moverLote, uploadAjusteMartes, esArchivoOferta, EXTENSIONES_OFERTA, descargarProyeccionExcel } from '../services/api'
 import { exportProyeccionPDF } from '../utils/pdfExport'
 
 const DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado']
@@ -120,10 +120,10 @@ export default function ProyeccionView({ proyeccion, setProyeccion }) {
   }
 
   const handleAjusteFile = (f) => {
-    if (f && (f.name.endsWith('.xlsx') || f.name.endsWith('.xls'))) {
+    if (f && esArchivoOferta(f.name)) {
       setAjusteFile(f)
     } else {
-      toast.error('Solo se aceptan archivos .xlsx o .xls')
+      toast.error('Solo se aceptan archivos .xlsx, .xls, .csv, .parquet o .arrow')
     }
   }
 
@@ -217,7 +217,7 @@ export default function ProyeccionView({ proyeccion, setProyeccion }) {
                     <input
                       ref={ajusteInputRef}
                       type="file"
-                      accept=".xlsx,.xls"
+                      accept={EXTENSIONES_OFERTA.join(',')}
                       style={{ display: 'none' }}
                       onChange={(e) => handleAjusteFile(e.target.files[0])}
                     />
@@ -548,9 +548,18 @@ export default function ProyeccionView({ proyeccion, setProyeccion }) {
             <Table size={16} style={{ verticalAlign: 'middle', marginRight: 4 }} /> Vista Tabla
           </button>
         </div>
-        <button className="btn btn-sm btn-outline" onClick={() => exportProyeccionPDF(proyeccion)} style={{ marginBottom: '0.5rem' }}>
-          <Download size={14} /> Descargar PDF
-        </button>
+        <div style={{ display: 'flex', gap: '0.5rem' }}>
+          <button className="btn btn-sm btn-outline" onClick={() => exportProyeccionPDF(proyeccion)} style={{ marginBottom: '0.5rem' }}>
+            <Download size={14} /> Descargar PDF
+          </button>
+          <button
+            className="btn btn-sm btn-outline"
+            onClick={() => descargarProyeccionExcel().catch(() => toast.error('No se pudo descargar el Excel'))}
+            style={{ marginBottom: '0.5rem' }}
+          >
+            <FileSpreadsheet size={14} /> Descargar Excel
+          </button>
+        </div>
       </motion.div>
 
       {/* Modal de mover */}
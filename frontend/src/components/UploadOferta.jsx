@@ -1,7 +1,7 @@
 import { useState, useRef } from 'react'
 import { motion, AnimatePresence } from 'framer-motion'
 import { UploadCloud, CheckCircle2, FileSpreadsheet, AlertCircle, Trash2, FolderUp, TriangleAlert } from 'lucide-react'
-import { uploadOferta } from '../services/api'
+import { uploadOferta, inspeccionarOferta, esArchivoOferta, EXTENSIONES_OFERTA } from '../services/api'
 
 export default function UploadOferta({ onUpload, hayDatosExistentes }) {
   const [file, setFile] = useState(null)
@@ -9,14 +9,24 @@ export default function UploadOferta({ onUpload, hayDatosExistentes }) {
   const [error, setError] = useState(null)
   const [dragging, setDragging] = useState(false)
   const [confirmado, setConfirmado] = useState(false)
+  const [hojas, setHojas] = useState([])
+  const [hoja, setHoja] = useState(null)
   const inputRef = useRef(null)
 
   const handleFile = (f) => {
-    if (f && (f.name.endsWith('.xlsx') || f.name.endsWith('.xls'))) {
+    if (f && esArchivoOferta(f.name)) {
       setFile(f)
       setError(null)
+      setHojas([])
+      setHoja(null)
+      // Excel: listar hojas sin esperar el parseo completo
+      if (/\.xlsx?$/i.test(f.name)) {
+        inspeccionarOferta(f)
+          .then(data => { setHojas(data.hojas); setHoja(data.hoja) })
+          .catch(() => {})
+      }
     } else {
-      setError('Solo se aceptan archivos .xlsx o .xls')
+      setError('Solo se aceptan archivos .xlsx, .xls, .csv, .parquet o .arrow')
     }
   }
 
@@ -26,7 +36,7 @@ export default function UploadOferta({ onUpload, hayDatosExistentes }) {
     setLoading(true)
     setError(null)
     try {
-      const data = await uploadOferta(file)
+      const data = await uploadOferta(file, hoja)
       onUpload(data)
     } catch (err) {
       setError(err.response?.data?.detail || 'Error al procesar el archivo')
@@ -116,12 +126,25 @@ export default function UploadOferta({ onUpload, hayDatosExistentes }) {
             <input
               ref={inputRef}
               type="file"
-              accept=".xlsx,.xls"
+              accept={EXTENSIONES_OFERTA.join(',')}
               style={{ display: 'none' }}
               onChange={(e) => handleFile(e.target.files[0])}
             />
           </div>
 
+          {hojas.length > 1 && (
+            <div style={{ marginTop: '1rem', display: 'flex', alignItems: 'center', gap: 8, fontSize: '0.9rem' }}>
+              <label htmlFor="hoja-oferta">Hoja:</label>
+              <select id="hoja-oferta" value={hoja || ''} onChange={(e) => setHoja(e.target.value)}>
+                {hojas.map(h => (
+                  <option key={h.nombre} value={h.nombre}>
+                    {h.nombre}{h.filas != null ? ` (${h.filas} filas)` : ''}
+                  </option>
+                ))}
+              </select>
+            </div>
+          )}
+
           <AnimatePresence>
             {error && (
               <motion.div
@@ -33,6 +33,25 @@ api.interceptors.response.use(
   }
 );
 
+// ─── GET condicional (ETag) ──────────────────────────────────────────────────────
+// Guarda la última respuesta de cada recurso junto con su ETag. En las
+// siguientes lecturas se envía If-None-Match y, si el backend responde 304,
+// se reutilizan los datos en memoria sin volver a descargarlos.
+const etagCache = new Map();
+
+const getConEtag = async (url) => {
+  const previo = etagCache.get(url);
+  const r = await api.get(url, {
+    headers: previo ? { 'If-None-Match': previo.etag } : {},
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+  });
+  if (r.status === 304 && previo) return previo.data;
+  const etag = r.headers.etag;
+  if (etag) etagCache.set(url, { etag, data: r.data });
+  else etagCache.delete(url);
+  return r.data;
+};
+
 // ─── Autenticación ─────────────────────────────────────────────────────────────
 
 export const login = (username, password) => {
@@ -47,21 +66,45 @@ export const login = (username, password) => {
 
 // ─── Parámetros ────────────────────────────────────────────────────────────────
 
-export const getParametros = () => api.get('/parametros').then(r => r.data);
+export const getParametros = () => getConEtag('/parametros');
 export const updateParametros = (params) => api.put('/parametros', params).then(r => r.data);
 
 // ─── Oferta ────────────────────────────────────────────────────────────────────
 
+// Formatos de oferta que acepta el backend (Excel o exportación del sistema de granjas)
+export const EXTENSIONES_OFERTA = ['.xlsx', '.xls', '.csv', '.parquet', '.arrow', '.feather'];
+export const esArchivoOferta = (nombre) =>
+  EXTENSIONES_OFERTA.some(ext => nombre.toLowerCase().endsWith(ext));
+
 export const uploadOferta = (file, sheetName) => {
   const form = new FormData();
   form.append('file', file);
-  if (sheetName) form.append('sheet_name', sheetName);
   return api.post('/oferta/upload', form, {
     headers: { 'Content-Type': 'multipart/form-data' },
+    params: sheetName ? { sheet_name: sheetName } : undefined,
+  }).then(r => r.data);
+};
+
+// Varias ofertas (archivos sueltos y/o .zip) combinadas en una sola
+export const uploadOfertaLote = (files, sheetName) => {
+  const form = new FormData();
+  for (const f of files) form.append('files', f);
+  return api.post('/oferta/upload-lote', form, {
+    headers: { 'Content-Type': 'multipart/form-data' },
+    params: sheetName ? { sheet_name: sheetName } : undefined,
+  }).then(r => r.data);
+};
+
+export const inspeccionarOferta = (file, sheetName) => {
+  const form = new FormData();
+  form.append('file', file);
+  return api.post('/oferta/inspeccionar', form, {
+    headers: { 'Content-Type': 'multipart/form-data' },
+    params: sheetName ? { sheet_name: sheetName } : undefined,
   }).then(r => r.data);
 };
 
-export const getOferta = () => api.get('/oferta').then(r => r.data);
+export const getOferta = () => getConEtag('/oferta');
 export const clearOferta = () => api.delete('/oferta').then(r => r.data);
 
 export const uploadAjusteMartes = (file, sheetName) => {
@@ -78,7 +121,7 @@ export const uploadAjusteMartes = (file, sheetName) => {
 export const generarProyeccion = (params) =>
   api.post('/proyeccion/generar', params).then(r => r.data);
 
-export const getProyeccion = () => api.get('/proyeccion').then(r => r.data);
+export const getProyeccion = () => getConEtag('/proyeccion');
 
 export const moverLote = (data) =>
   api.post('/proyeccion/mover-lote', data).then(r => r.data);
@@ -89,4 +132,36 @@ export const agregarLote = (data) =>
 export const eliminarLote = (diaIndex, loteIndex) =>
   api.delete(`/proyeccion/lote/${diaIndex}/${loteIndex}`).then(r => r.data);
 
+// Excel con el layout de PROYEC1, generado en el backend
+export const descargarProyeccionExcel = async () => {
+  const r = await api.get('/proyeccion/export.xlsx', { responseType: 'blob' });
+  const nombre = /filename="?([^"]+)"?/.exec(r.headers['content-disposition'] || '')?.[1] || 'proyeccion.xlsx';
+  const url = URL.createObjectURL(r.data);
+  const a = document.createElement('a');
+  a.href = url;
+  a.download = nombre;
+  a.click();
+  URL.revokeObjectURL(url);
+};
+
+export const deshacerEdicion = () =>
+  api.post('/proyeccion/deshacer').then(r => r.data);
+
+export const rehacerEdicion = () =>
+  api.post('/proyeccion/rehacer').then(r => r.data);
+
+export const getEdiciones = () =>
+  api.get('/proyeccion/ediciones').then(r => r.data);
+
+// ─── Historial de proyecciones ──────────────────────────────────────────────────
+
+export const getSemanasHistorial = () =>
+  api.get('/proyeccion/historial').then(r => r.data);
+
+export const getVersionesHistorial = (fechaInicio) =>
+  api.get(`/proyeccion/historial/${fechaInicio}`).then(r => r.data);
+
+export const getVersionHistorial = (fechaInicio, version) =>
+  api.get(`/proyeccion/historial/${fechaInicio}/${version}`).then(r => r.data);
+
 export default api;
@@ -7,35 +7,10 @@ import openpyxl
 from io import BytesIO
 from datetime import date, datetime
 
-from fastapi.testclient import TestClient
-from backend.main import app
-from backend import storage
-
 
 # ─── Fixtures ────────────────────────────────────────────────────────────────────
 
-@pytest.fixture(autouse=True)
-def clean_storage(tmp_path, monkeypatch):
-    """Usa un directorio temporal para storage en cada test."""
-    monkeypatch.setenv("STORAGE_BACKEND", "local")
-    monkeypatch.setenv("LOCAL_STORAGE_PATH", str(tmp_path))
-    # Reinicializar el singleton de storage con la nueva ruta temporal
-    storage._storage_instance = storage.LocalStorage(str(tmp_path))
-    yield
-    storage._storage_instance = None
-
-
-@pytest.fixture()
-def client():
-    return TestClient(app)
-
-
-@pytest.fixture()
-def auth_headers(client):
-    r = client.post("/token", data={"username": "admin", "password": "admin123"})
-    assert r.status_code == 200, f"Login failed: {r.text}"
-    token = r.json()["access_token"]
-    return {"Authorization": f"Bearer {token}"}
+pytestmark = pytest.mark.usefixtures("clean_storage")
 
 
 # ─── Helpers ─────────────────────────────────────────────────────────────────────
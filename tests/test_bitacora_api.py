@@ -0,0 +1,146 @@
+"""
+Tests de la bitácora de ediciones (deshacer/rehacer por re-aplicación de operaciones).
+"""
+import pytest
+
+from backend import config, storage
+from tests.test_ajuste_martes_api import _generar_proyeccion, LOTE_BASE
+
+
+pytestmark = pytest.mark.usefixtures("clean_storage")
+
+
+def _dia_con_lotes(proy):
+    return next(i for i, d in enumerate(proy["dias"]) if d["lotes"])
+
+
+def _eliminar_primero(client, auth_headers, proy):
+    r = client.delete(f"/proyeccion/lote/{_dia_con_lotes(proy)}/0", headers=auth_headers)
+    assert r.status_code == 200
+    return r.json()
+
+
+@pytest.fixture()
+def estados(client, auth_headers):
+    """Proyección generada y tres ediciones sucesivas: [v0, v1, v2, v3]."""
+    lotes = [{**LOTE_BASE, "galpon": g} for g in range(1, 5)]
+    v0 = _generar_proyeccion(client, auth_headers, lotes)
+
+    v1 = _eliminar_primero(client, auth_headers, v0)
+    dia = _dia_con_lotes(v1)
+    v2 = client.post("/proyeccion/mover-lote", headers=auth_headers, json={
+        "lote_index": 0, "dia_origen": dia, "dia_destino": (dia + 1) % len(v1["dias"]),
+    }).json()
+    v3 = _eliminar_primero(client, auth_headers, v2)
+    return [v0, v1, v2, v3]
+
+
+def _actual(client, auth_headers):
+    return client.get("/proyeccion", headers=auth_headers).json()
+
+
+def test_deshacer_y_rehacer(client, auth_headers, estados):
+    for esperado in reversed(estados[:-1]):
+        r = client.post("/proyeccion/deshacer", headers=auth_headers)
+        assert r.status_code == 200
+        assert r.json() == esperado
+        assert _actual(client, auth_headers) == esperado
+    assert client.post("/proyeccion/deshacer", headers=auth_headers).status_code == 400
+
+    for esperado in estados[1:]:
+        assert client.post("/proyeccion/rehacer", headers=auth_headers).json() == esperado
+    assert client.post("/proyeccion/rehacer", headers=auth_headers).status_code == 400
+
+
+def test_edicion_nueva_descarta_rehacer(client, auth_headers, estados):
+    client.post("/proyeccion/deshacer", headers=auth_headers)
+    client.post("/proyeccion/deshacer", headers=auth_headers)
+    _eliminar_primero(client, auth_headers, estados[1])
+
+    ediciones = client.get("/proyeccion/ediciones", headers=auth_headers).json()
+    assert ediciones["cursor"] == 2
+    assert [op["tipo"] for op in ediciones["operaciones"]] == ["eliminar-lote", "eliminar-lote"]
+    assert ediciones["puede_deshacer"] and not ediciones["puede_rehacer"]
+
+    assert client.post("/proyeccion/deshacer", headers=auth_headers).json() == estados[1]
+
+
+def test_reconstruye_desde_snapshot_intermedio(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(config, "BITACORA_SNAPSHOT_CADA", 2)
+    lotes = [{**LOTE_BASE, "galpon": g} for g in range(1, 6)]
+    estados = [_generar_proyeccion(client, auth_headers, lotes)]
+    for _ in range(4):
+        estados.append(_eliminar_primero(client, auth_headers, estados[-1]))
+
+    cabeza = storage.get_storage().load("bitacora/cabeza")
+    assert sorted(cabeza["snapshots"], key=int) == ["0", "2", "4"]
+    for esperado in reversed(estados[:-1]):
+        assert client.post("/proyeccion/deshacer", headers=auth_headers).json() == esperado
+
+
+def test_proyeccion_sin_sesion_abre_una_al_editar(client, auth_headers, estados):
+    # Escritura externa a la bitácora: la sesión anterior deja de aplicar
+    sync = storage.get_storage()
+    sync.save(storage.PROYECCION_KEY, estados[1])
+    assert client.post("/proyeccion/deshacer", headers=auth_headers).status_code == 400
+
+    _eliminar_primero(client, auth_headers, estados[1])
+    assert client.post("/proyeccion/deshacer", headers=auth_headers).json() == estados[1]
+    assert client.post("/proyeccion/deshacer", headers=auth_headers).status_code == 400
+
+
+def _claves_de_sesiones():
+    claves = storage.get_storage().list_keys("bitacora/")
+    return {c.split("/")[1] for c in claves if c != "bitacora/cabeza"}
+
+
+def test_sesion_nueva_borra_la_anterior(client, auth_headers, estados):
+    sesion = storage.get_storage().load("bitacora/cabeza")["sesion"]
+    assert _claves_de_sesiones() == {sesion}
+
+    _generar_proyeccion(client, auth_headers, [LOTE_BASE])
+    nueva = storage.get_storage().load("bitacora/cabeza")["sesion"]
+    assert nueva != sesion
+    assert _claves_de_sesiones() == {nueva}
+
+    # También al abrirse por una escritura externa a la bitácora
+    storage.get_storage().save(storage.PROYECCION_KEY, estados[1])
+    _eliminar_primero(client, auth_headers, estados[1])
+    assert _claves_de_sesiones() == {storage.get_storage().load("bitacora/cabeza")["sesion"]} != {nueva}
+
+
+def test_operacion_faltante(client, auth_headers, estados):
+    cabeza = storage.get_storage().load("bitacora/cabeza")
+    seq = cabeza["linea"][1]
+    storage.get_storage().delete(f"bitacora/{cabeza['sesion']}/op/{seq:06d}")
+
+    ediciones = client.get("/proyeccion/ediciones", headers=auth_headers).json()
+    assert len(ediciones["operaciones"]) == 3
+    assert ediciones["operaciones"][1] == {"seq": seq, "faltante": True}
+
+    # Deshacer re-aplica desde el snapshot 0, que necesita la operación faltante
+    assert client.post("/proyeccion/deshacer", headers=auth_headers).status_code == 409
+    assert _actual(client, auth_headers) == estados[3]
+
+
+def test_sin_proyeccion_no_es_error_interno(client, auth_headers, estados):
+    client.post("/proyeccion/deshacer", headers=auth_headers)
+    storage.get_storage().delete(storage.PROYECCION_KEY)
+    for accion in ("deshacer", "rehacer"):
+        assert client.post(f"/proyeccion/{accion}", headers=auth_headers).status_code == 404
+
+
+def test_rehacer_reaplica_en_el_pool_de_cpu(client, auth_headers, estados, monkeypatch):
+    from backend import trabajos
+
+    client.post("/proyeccion/deshacer", headers=auth_headers)
+    funciones = []
+    original = trabajos.ejecutar
+
+    async def espiar(fn, *args, **kwargs):
+        funciones.append(fn.__name__)
+        return await original(fn, *args, **kwargs)
+
+    monkeypatch.setattr(trabajos, "ejecutar", espiar)
+    assert client.post("/proyeccion/rehacer", headers=auth_headers).json() == estados[3]
+    assert funciones == ["aplicar_operacion"]
@@ -0,0 +1,177 @@
+"""
+Tests del cache compartido entre instancias (usa el fake en memoria).
+"""
+import pytest
+
+from backend.cache_compartido import InMemorySharedCache
+from backend.storage import CachedStorage, ConflictoVersion, LocalStorage
+
+
+class _ContadorStorage(LocalStorage):
+    def __init__(self, base_path):
+        super().__init__(base_path)
+        self.loads = 0
+
+    def load(self, key):
+        self.loads += 1
+        return super().load(key)
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return _ContadorStorage(str(tmp_path))
+
+
+@pytest.fixture
+def replicas(backend):
+    """Dos 'instancias' sobre el mismo backend y el mismo cache compartido."""
+    shared = InMemorySharedCache()
+    a = CachedStorage(backend, ttl=60, shared=shared)
+    b = CachedStorage(backend, ttl=60, shared=shared)
+    return a, b, shared
+
+
+def test_escritura_invalida_otras_instancias(replicas, backend):
+    a, b, _ = replicas
+    a.save("proyeccion", {"v": 1})
+    assert b.load("proyeccion") == {"v": 1}
+
+    a.save("proyeccion", {"v": 2})
+    assert b.load("proyeccion") == {"v": 2}
+
+
+def test_miss_local_se_resuelve_desde_compartido(replicas, backend):
+    a, b, _ = replicas
+    a.save("ofertas", [{"granja": "A"}])
+    backend.loads = 0
+
+    assert b.load("ofertas") == [{"granja": "A"}]
+    assert backend.loads == 0
+
+
+def test_lectura_fria_puebla_compartido(replicas, backend):
+    a, b, shared = replicas
+    backend.save("parametros", {"kg_por_caja": 20.0})
+
+    assert a.load("parametros") == {"kg_por_caja": 20.0}
+    assert shared.get("parametros") is not None
+    backend.loads = 0
+    assert b.load("parametros") == {"kg_por_caja": 20.0}
+    assert backend.loads == 0
+
+
+def test_delete_se_propaga(replicas):
+    a, b, shared = replicas
+    a.save("proyeccion", {"v": 1})
+    assert b.load("proyeccion") == {"v": 1}
+
+    a.delete("proyeccion")
+    assert shared.get("proyeccion") is None
+    assert b.load("proyeccion") is None
+
+
+def test_no_se_invalida_a_si_misma(replicas, backend):
+    a, _, _ = replicas
+    a.save("p", {"v": 1})
+    backend.loads = 0
+    a.save("p", {"v": 2})
+    assert a.load("p") == {"v": 2}
+    assert backend.loads == 0
+
+
+class _EscritorIntercalado(LocalStorage):
+    """Backend que ejecuta `entre` justo después de una lectura (una escritura concurrente)."""
+
+    entre = None
+
+    def load_versioned(self, key):
+        resultado = super().load_versioned(key)
+        if self.entre is not None:
+            entre, self.entre = self.entre, None
+            entre()
+        return resultado
+
+
+@pytest.mark.parametrize("escritor_publica", [True, False])
+def test_lectura_vieja_no_pisa_escritura_concurrente(tmp_path, escritor_publica):
+    """
+    Un lector lee v1 del backend; antes de que la publique, un escritor
+    guarda v2 (publicándola en el cache compartido o no, si Redis falló).
+    La v1 del lector no debe quedar en el cache compartido.
+    """
+    backend = _EscritorIntercalado(str(tmp_path))
+    shared = InMemorySharedCache()
+    backend.save("proyeccion", {"v": 1})
+    lector = CachedStorage(backend, ttl=60, shared=shared)
+    escritor = CachedStorage(backend, ttl=60, shared=shared if escritor_publica else None)
+    backend.entre = lambda: escritor.save("proyeccion", {"v": 2})
+
+    assert lector.load("proyeccion") == {"v": 1}  # la lectura ya estaba hecha
+
+    nueva = CachedStorage(backend, ttl=60, shared=shared)
+    data, version = nueva.load_versioned("proyeccion")
+    assert data == {"v": 2}
+    nueva.save("proyeccion", {"v": 3}, if_version=version)  # sin ConflictoVersion
+
+
+def test_copia_compartida_vieja_no_se_usa(tmp_path):
+    backend = LocalStorage(str(tmp_path))
+    shared = InMemorySharedCache()
+    backend.save("p", {"v": 1})
+    v2 = backend.save("p", {"v": 2})
+    # Copia vieja, como la deja una escritura cuya publicación falló
+    shared.set("p", b'{"v": 1}', "1")
+    a = CachedStorage(backend, ttl=60, shared=shared)
+
+    data, version = a.load_versioned("p")
+    assert (data, version) == ({"v": 2}, v2)
+    assert shared.get("p")[1] == v2  # se retiró la vieja y se pobló la vigente
+    a.save("p", {"v": 3}, if_version=version)
+
+
+def test_set_solo_reemplaza_versiones_anteriores():
+    shared = InMemorySharedCache()
+    assert shared.set("p", b"v2", "2")
+    # Publicación demorada de una escritura anterior
+    assert not shared.set("p", b"v1", "1")
+    assert shared.get("p") == (b"v2", "2")
+    assert shared.set("p", b"v10", "10")
+    # Versiones que no se pueden comparar: la entrada se descarta
+    assert not shared.set("p", b"x", "m1a-2")
+    assert shared.get("p") is None
+
+
+class _CacheQueFallaAlPublicar(InMemorySharedCache):
+    def set(self, key, raw, version):
+        raise ConnectionError("redis caído")
+
+
+def test_publicacion_fallida_no_deja_copia_vieja(tmp_path):
+    backend = LocalStorage(str(tmp_path))
+    shared = _CacheQueFallaAlPublicar()
+    a = CachedStorage(backend, ttl=60, shared=shared)
+    b = CachedStorage(backend, ttl=60, shared=shared)
+    backend.save("ofertas", [{"granja": "A"}])
+    assert b.load("ofertas") == [{"granja": "A"}]  # puebla el compartido (set_si_ausente)
+
+    a.save("ofertas", [{"granja": "B"}])
+    assert shared.get("ofertas") is None
+    assert CachedStorage(backend, ttl=60, shared=shared).load("ofertas") == [{"granja": "B"}]
+
+
+def test_escritura_serializa_una_sola_vez(replicas, monkeypatch):
+    from backend import storage
+
+    a, b, shared = replicas
+    llamadas = []
+    original = storage._serialize
+
+    def contar(data):
+        llamadas.append(data)
+        return original(data)
+
+    monkeypatch.setattr(storage, "_serialize", contar)
+    version = a.save("proyeccion", {"v": 1})
+    assert len(llamadas) == 1
+    assert shared.get("proyeccion") is not None
+    assert b.load_versioned("proyeccion") == ({"v": 1}, version)
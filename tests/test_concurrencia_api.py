@@ -0,0 +1,44 @@
+"""
+Tests de concurrencia optimista en los endpoints de edición de la proyección.
+"""
+import pytest
+
+from backend import ediciones, storage
+from tests.test_ajuste_martes_api import _generar_proyeccion, LOTE_BASE
+
+
+pytestmark = pytest.mark.usefixtures("clean_storage")
+
+
+def _escritura_concurrente(monkeypatch):
+    """Simula a otro planificador guardando la proyección en medio de la edición."""
+    original = ediciones.calcular_semana_faena
+
+    def calcular_y_pisar(*args, **kwargs):
+        resultado = original(*args, **kwargs)
+        sync = storage.get_storage()
+        sync.save(storage.PROYECCION_KEY, sync.load(storage.PROYECCION_KEY))
+        return resultado
+
+    monkeypatch.setattr(ediciones, "calcular_semana_faena", calcular_y_pisar)
+
+
+def test_eliminar_lote_con_escritura_concurrente_da_409(client, auth_headers, monkeypatch):
+    proy = _generar_proyeccion(client, auth_headers)
+    dia = next(i for i, d in enumerate(proy["dias"]) if d["lotes"])
+
+    _escritura_concurrente(monkeypatch)
+    r = client.delete(f"/proyeccion/lote/{dia}/0", headers=auth_headers)
+    assert r.status_code == 409
+
+    # La edición perdida no se aplicó
+    monkeypatch.undo()
+    actual = client.get("/proyeccion", headers=auth_headers).json()
+    assert len(actual["dias"][dia]["lotes"]) == len(proy["dias"][dia]["lotes"])
+
+
+def test_edicion_sin_conflicto(client, auth_headers):
+    proy = _generar_proyeccion(client, auth_headers, [LOTE_BASE, {**LOTE_BASE, "galpon": 2}])
+    dia = next(i for i, d in enumerate(proy["dias"]) if d["lotes"])
+    r = client.delete(f"/proyeccion/lote/{dia}/0", headers=auth_headers)
+    assert r.status_code == 200
@@ -0,0 +1,58 @@
+"""
+Tests de la detección de lotes repetidos (exactos y en conflicto).
+"""
+from datetime import date
+
+import pytest
+
+from backend import duplicados
+from backend.calculo import LoteOferta
+from backend.parser_excel import ofertas_a_columnas, ofertas_desde_columnas
+from tests.test_ajuste_martes_api import _crear_excel_oferta, LOTE_BASE
+
+
+def _columnas(*lotes):
+    return ofertas_a_columnas([LoteOferta(**{**LOTE_BASE, "fecha_ingreso": date(2026, 1, 10), **l}) for l in lotes])
+
+
+def test_clasifica_exactos_y_conflictos():
+    a = _columnas({"galpon": 1}, {"galpon": 2}, {"galpon": 1})
+    b = _columnas({"galpon": 2, "cantidad": 9000})
+    combinada, reporte = duplicados.combinar([("a", a), ("b", b)])
+
+    assert combinada["n"] == 4
+    [exacto] = reporte["exactos"]
+    assert exacto["conservado"] == {"archivo": "a", "indice": 0}
+    assert exacto["repetido"] == {"archivo": "a", "indice": 2}
+    [conflicto] = reporte["conflictos"]
+    assert conflicto["clave"]["galpon"] == 2
+    assert conflicto["repetido"] == {"archivo": "b", "indice": 0}
+    assert conflicto["diferencias"] == {"cantidad": [15000, 9000]}
+
+
+def test_fusionar_conserva_la_primera_fila():
+    a = _columnas({"galpon": 1}, {"galpon": 1, "cantidad": 100}, {"galpon": 1, "sexo": "H"})
+    combinada, reporte = duplicados.combinar([("a", a)], fusionar=True)
+
+    ofertas = ofertas_desde_columnas(combinada)
+    assert [(o.galpon, o.sexo, o.cantidad) for o in ofertas] == [(1, "M", 15000), (1, "H", 15000)]
+    assert len(reporte["conflictos"]) == 1 and reporte["fusionados"] is True
+
+
+# ─── API ────────────────────────────────────────────────────────────────────────
+
+pytestmark = pytest.mark.usefixtures("clean_storage")
+
+
+def test_upload_informa_y_fusiona(client, auth_headers):
+    excel = _crear_excel_oferta([LOTE_BASE, {**LOTE_BASE, "cantidad": 12000}, {**LOTE_BASE, "galpon": 2}]).getvalue()
+    archivo = [("file", ("oferta.xlsx", excel, "application/octet-stream"))]
+
+    body = client.post("/oferta/upload", headers=auth_headers, files=archivo).json()
+    assert body["total_lotes"] == 3
+    [conflicto] = body["duplicados"]["conflictos"]
+    assert conflicto["diferencias"] == {"cantidad": [15000, 12000]}
+
+    body = client.post("/oferta/upload?fusionar=true", headers=auth_headers, files=archivo).json()
+    assert body["total_lotes"] == 2
+    assert len(client.get("/oferta", headers=auth_headers).json()["ofertas"]) == 2
@@ -0,0 +1,48 @@
+"""
+Tests de GET condicional (ETag / If-None-Match) sobre /parametros, /oferta y /proyeccion.
+"""
+import pytest
+
+
+pytestmark = pytest.mark.usefixtures("clean_storage")
+
+
+@pytest.mark.parametrize("url", ["/parametros", "/oferta"])
+def test_get_devuelve_etag_y_304(client, auth_headers, url):
+    r = client.get(url, headers=auth_headers)
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+
+    r2 = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+    assert r2.status_code == 304
+    assert r2.headers["etag"] == etag
+    assert r2.content == b""
+
+
+def test_etag_cambia_al_modificar(client, auth_headers):
+    etag = client.get("/parametros", headers=auth_headers).headers["etag"]
+
+    r = client.put("/parametros", headers=auth_headers, json={"kg_por_caja": 22.0})
+    assert r.status_code == 200
+
+    r2 = client.get("/parametros", headers={**auth_headers, "If-None-Match": etag})
+    assert r2.status_code == 200
+    assert r2.headers["etag"] != etag
+    assert r2.json()["kg_por_caja"] == 22.0
+
+
+def test_etag_distinto_por_recurso(client, auth_headers):
+    e1 = client.get("/parametros", headers=auth_headers).headers["etag"]
+    e2 = client.get("/oferta", headers=auth_headers).headers["etag"]
+    assert e1 != e2
+
+
+def test_proyeccion_inexistente_sigue_404(client, auth_headers):
+    r = client.get("/proyeccion", headers=auth_headers)
+    assert r.status_code == 404
+
+
+def test_if_none_match_desactualizado(client, auth_headers):
+    r = client.get("/oferta", headers={**auth_headers, "If-None-Match": '"otro", W/"viejo"'})
+    assert r.status_code == 200
+    assert r.json()["total_lotes"] == 0
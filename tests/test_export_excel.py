@@ -0,0 +1,49 @@
+"""
+Tests de la exportación de la proyección a Excel (layout PROYEC1).
+"""
+from datetime import date
+
+import pytest
+
+from backend.parser_excel import leer_proyeccion_completa, leer_proyeccion_excel
+from tests.test_ajuste_martes_api import _generar_proyeccion, LOTE_BASE
+
+
+pytestmark = pytest.mark.usefixtures("clean_storage")
+
+
+def test_export_sin_proyeccion(client, auth_headers):
+    assert client.get("/proyeccion/export.xlsx", headers=auth_headers).status_code == 404
+
+
+def test_export_ida_y_vuelta(client, auth_headers, tmp_path):
+    lotes = [
+        LOTE_BASE,
+        {**LOTE_BASE, "galpon": 2, "sexo": "H", "cantidad": 12000},
+        {**LOTE_BASE, "granja": "SUR", "cantidad": 9000},
+    ]
+    proy = _generar_proyeccion(client, auth_headers, lotes)
+
+    r = client.get("/proyeccion/export.xlsx", headers=auth_headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/vnd.openxmlformats")
+    assert 'filename="proyeccion_2026-02-23.xlsx"' in r.headers["content-disposition"]
+
+    # Lo exportado se vuelve a leer con los parsers de PROYEC1
+    assert leer_proyeccion_excel(r.content) == {
+        "fecha_base": date(2026, 2, 23), "ganancia_macho": 0.09, "ganancia_hembra": 0.079,
+    }
+    ruta = tmp_path / "export.xlsx"
+    ruta.write_bytes(r.content)
+    semana = leer_proyeccion_completa(str(ruta))
+    assert semana.fecha_inicio.isoformat() == proy["fecha_inicio"]
+    assert semana.total_pollos_semana == proy["total_pollos_semana"]
+
+    def lotes_de(dias):
+        return [
+            (d["fecha"], l["granja"], l["galpon"], l["sexo"], l["cantidad"], l["edad_fin_retiro"], l["cajas"])
+            for d in dias for l in d["lotes"]
+        ]
+    assert lotes_de(semana.model_dump(mode="json")["dias"]) == lotes_de(
+        [d for d in proy["dias"] if d["lotes"]]
+    )
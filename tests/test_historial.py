@@ -0,0 +1,129 @@
+"""
+Tests del historial de proyecciones por semana (deltas + snapshots).
+"""
+import asyncio
+import copy
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import config, historial, storage
+from backend.main import app
+from tests.test_ajuste_martes_api import _generar_proyeccion, LOTE_BASE
+
+
+pytestmark = pytest.mark.usefixtures("clean_storage")
+
+
+def _semana(fecha="2026-03-02", cantidades=(1000, 2000)):
+    return {
+        "fecha_inicio": fecha,
+        "total_pollos_semana": sum(cantidades),
+        "dias": [
+            {"fecha": fecha, "lotes": [{"granja": "A", "galpon": i, "cantidad": c} for i, c in enumerate(cantidades)]},
+            {"fecha": "2026-03-03", "lotes": []},
+        ],
+    }
+
+
+class TestDeltas:
+    @pytest.mark.parametrize("antes,despues", [
+        ({"a": 1, "b": [1, 2, 3]}, {"a": 2, "b": [1, 2]}),
+        ({"a": {"x": 1}}, {"c": None}),
+        ([{"g": 1}, {"g": 2}], [{"g": 2}]),
+        ([1], [1, {"nuevo": True}, 3]),
+        ({"a": 1}, [1]),
+    ])
+    def test_roundtrip(self, antes, despues):
+        original = copy.deepcopy(antes)
+        delta = historial.calcular_delta(antes, despues)
+        assert historial.aplicar_delta(antes, delta) == despues
+        assert antes == original
+
+    def test_iguales_sin_delta(self):
+        assert historial.calcular_delta(_semana(), _semana()) is None
+
+
+def _registrar(data, origen="test"):
+    return asyncio.run(historial.registrar(data, origen=origen))
+
+
+def test_versiones_y_snapshots_periodicos(monkeypatch):
+    monkeypatch.setattr(config, "HISTORIAL_SNAPSHOT_CADA", 3)
+    versiones = [_semana(cantidades=(1000 + i,) + (2000,) * 10) for i in range(7)]
+    numeros = [_registrar(v) for v in versiones]
+    assert numeros == list(range(1, 8))
+
+    indice = asyncio.run(historial.listar_versiones("2026-03-02"))
+    assert [e["tipo"] for e in indice] == ["snapshot", "delta", "delta"] * 2 + ["snapshot"]
+    for numero, esperada in zip(numeros, versiones):
+        assert asyncio.run(historial.cargar_version("2026-03-02", numero)) == esperada
+    assert asyncio.run(historial.cargar_version("2026-03-02")) == versiones[-1]
+
+
+def test_sin_cambios_no_agrega_version():
+    assert _registrar(_semana()) == 1
+    assert _registrar(_semana()) == 1
+
+
+def test_semanas_independientes():
+    _registrar(_semana("2026-03-02"))
+    _registrar(_semana("2026-03-09"))
+    assert asyncio.run(historial.listar_semanas()) == ["2026-03-09", "2026-03-02"]
+    with pytest.raises(historial.VersionNoEncontrada):
+        asyncio.run(historial.cargar_version("2026-03-16"))
+
+
+def test_numero_huerfano_se_saltea():
+    _registrar(_semana())
+    # Contenido escrito por un escritor que perdió la carrera por el índice
+    storage.get_storage().save(historial._clave_version("2026-03-02", 2), {"huerfano": True})
+    assert _registrar(_semana(cantidades=(5, 6))) == 3
+    assert asyncio.run(historial.cargar_version("2026-03-02", 3)) == _semana(cantidades=(5, 6))
+
+
+def test_registrar_no_reconstruye_la_anterior(monkeypatch):
+    versiones = [_semana(cantidades=(1000 + i,) + (2000,) * 10) for i in range(4)]
+    _registrar(versiones[0])
+
+    async def no_reconstruir(*args):
+        raise AssertionError("no debería reconstruir")
+
+    with monkeypatch.context() as m:
+        m.setattr(historial, "_reconstruir", no_reconstruir)
+        assert [_registrar(v) for v in versiones[1:]] == [2, 3, 4]
+        assert asyncio.run(historial.cargar_version("2026-03-02")) == versiones[-1]
+    assert [e["tipo"] for e in asyncio.run(historial.listar_versiones("2026-03-02"))][1:] == ["delta"] * 3
+
+
+def test_ultima_desactualizada_se_reconstruye():
+    _registrar(_semana())
+    _registrar(_semana(cantidades=(5, 6)))
+    # Escritor caído entre el índice y `ultima`: quedó apuntando a la v1
+    clave = historial._clave_ultima("2026-03-02")
+    storage.get_storage().save(clave, {"version": 1, "data": _semana()})
+
+    assert asyncio.run(historial.cargar_version("2026-03-02")) == _semana(cantidades=(5, 6))
+    assert _registrar(_semana(cantidades=(5, 6))) == 2
+    assert _registrar(_semana(cantidades=(7, 8))) == 3
+    assert storage.get_storage().load(clave) == {"version": 3, "data": _semana(cantidades=(7, 8))}
+
+
+def test_endpoints_historial():
+    client = TestClient(app)
+    r = client.post("/token", data={"username": "admin", "password": "admin123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    proy = _generar_proyeccion(client, headers, [LOTE_BASE, {**LOTE_BASE, "galpon": 2}])
+    dia = next(i for i, d in enumerate(proy["dias"]) if d["lotes"])
+    editada = client.delete(f"/proyeccion/lote/{dia}/0", headers=headers).json()
+
+    semana = proy["fecha_inicio"]
+    assert client.get("/proyeccion/historial", headers=headers).json() == {"semanas": [semana]}
+    versiones = client.get(f"/proyeccion/historial/{semana}", headers=headers).json()["versiones"]
+    assert [(v["version"], v["origen"], v["usuario"]) for v in versiones] == [
+        (1, "generar", "admin"), (2, "eliminar-lote", "admin"),
+    ]
+    assert client.get(f"/proyeccion/historial/{semana}/1", headers=headers).json() == proy
+    assert client.get(f"/proyeccion/historial/{semana}/2", headers=headers).json() == editada
+    assert client.get(f"/proyeccion/historial/{semana}/9", headers=headers).status_code == 404
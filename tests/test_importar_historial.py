@@ -0,0 +1,123 @@
+"""
+Tests de la lectura completa de PROYEC1 y su importación al historial.
+"""
+import asyncio
+from datetime import date, datetime
+
+import openpyxl
+import pytest
+
+from backend import historial, storage
+from backend.calculo import Parametros
+from backend.importar_historial import importar_directorio
+from backend.parser_excel import leer_proyeccion_completa
+
+
+@pytest.fixture(autouse=True)
+def clean_storage(tmp_path):
+    storage._storage_instance = storage.LocalStorage(str(tmp_path / "storage"))
+    yield
+    storage._storage_instance = None
+
+
+ENCABEZADOS = ["Fecha Faena", "GRANJA", "Galpon", "Nucleo", "Cantidad", "Sexo", "Edad Fin", "Peso Vivo", "Cajas"]
+
+
+def _proyec1(lotes, fecha_base=datetime(2026, 3, 2), fila_encabezado=8) -> openpyxl.Workbook:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "OFERTA JUEV"
+    ws = wb.create_sheet("PROYEC1")
+    ws["D4"] = fecha_base
+    ws["N5"] = 0.09
+    for col, h in enumerate(ENCABEZADOS, 1):
+        ws.cell(row=fila_encabezado, column=col, value=h)
+    for fila, lote in enumerate(lotes, fila_encabezado + 1):
+        for col, v in enumerate(lote, 1):
+            ws.cell(row=fila, column=col, value=v)
+    return wb
+
+
+LOTES = [
+    (datetime(2026, 3, 2), "NORTE", 1, 1, 15000, "M", 40, 3.0, None),
+    (None, "SUR", 2, 1, 12000, "H", 44, 2.9, 1500),   # misma fecha (celda combinada)
+    (None, "TOTAL DÍA", None, None, 27000),
+    (datetime(2026, 3, 4), "NORTE", 3, 2, 9000, "macho", 41, 3.1, None),
+]
+
+
+def test_leer_proyeccion_completa(tmp_path):
+    ruta = tmp_path / "semana.xlsx"
+    _proyec1(LOTES).save(ruta)
+    semana = leer_proyeccion_completa(str(ruta))
+
+    assert semana.fecha_inicio == date(2026, 3, 2)
+    assert [d.fecha for d in semana.dias] == [date(2026, 3, 2), date(2026, 3, 4)]
+    assert [l.granja for l in semana.dias[0].lotes] == ["NORTE", "SUR"]
+    assert semana.total_pollos_semana == 36000
+    norte = semana.dias[0].lotes[0]
+    assert norte.fecha_fin_retiro == date(2026, 3, 2) and norte.edad_fin_retiro == 40
+    # Cajas: la de la planilla si está, si no se recalcula desde el peso vivo
+    assert semana.dias[0].lotes[1].cajas == 1500
+    assert norte.peso_faenado == pytest.approx(2.61) and norte.cajas > 0
+    assert semana.dias[1].lotes[0].sexo == "M"
+
+
+def test_ganancias_de_la_planilla(tmp_path):
+    wb = _proyec1(LOTES)
+    wb["PROYEC1"]["N5"] = 0.1
+    wb["PROYEC1"]["P5"] = 0.08
+    ruta = tmp_path / "semana.xlsx"
+    wb.save(ruta)
+
+    lotes = [l for d in leer_proyeccion_completa(str(ruta)).dias for l in d.lotes]
+    assert [l.ganancia_diaria_original for l in lotes] == [0.1, 0.08, 0.1]
+    # Con parámetros explícitos, la planilla no se usa
+    params = Parametros(ganancia_diaria_macho=0.07, ganancia_diaria_hembra=0.06)
+    lotes = [l for d in leer_proyeccion_completa(str(ruta), params=params).dias for l in d.lotes]
+    assert [l.ganancia_diaria_original for l in lotes] == [0.07, 0.06, 0.07]
+
+
+def test_leer_proyeccion_sin_tabla(tmp_path):
+    ruta = tmp_path / "vacia.xlsx"
+    wb = openpyxl.Workbook()
+    wb.active.title = "PROYEC1"
+    wb.save(ruta)
+    with pytest.raises(ValueError, match="tabla de lotes"):
+        leer_proyeccion_completa(str(ruta))
+
+
+def test_importar_directorio(tmp_path):
+    origen = tmp_path / "proyec1"
+    (origen / "2026").mkdir(parents=True)
+    _proyec1(LOTES).save(origen / "2026" / "a_jueves.xlsx")
+    _proyec1(LOTES[:1], fila_encabezado=6).save(origen / "2026" / "b_martes.xlsx")
+    _proyec1([(datetime(2026, 3, 9), "OESTE", 1, 1, 5000, "M", 40, 3.0)], fecha_base=datetime(2026, 3, 9)).save(
+        origen / "siguiente.xlsx"
+    )
+    (origen / "rota.xlsx").write_bytes(b"no es excel")
+
+    resultado = asyncio.run(importar_directorio(origen, workers=2, usuario="admin"))
+
+    assert [e["archivo"].endswith("rota.xlsx") for e in resultado["errores"]] == [True]
+    assert [(i["semana"], i["version"]) for i in resultado["importadas"]] == [
+        ("2026-03-02", 1), ("2026-03-02", 2), ("2026-03-09", 1),
+    ]
+    assert asyncio.run(historial.listar_semanas()) == ["2026-03-09", "2026-03-02"]
+    versiones = asyncio.run(historial.listar_versiones("2026-03-02"))
+    assert [v["origen"] for v in versiones] == ["importacion:a_jueves.xlsx", "importacion:b_martes.xlsx"]
+    assert asyncio.run(historial.cargar_version("2026-03-02", 1))["total_pollos_semana"] == 36000
+    assert asyncio.run(historial.cargar_version("2026-03-02"))["total_pollos_semana"] == 15000
+
+
+def test_registrar_lote_continua_el_historial():
+    base = {"fecha_inicio": "2026-03-02", "total_pollos_semana": 1, "dias": []}
+    assert asyncio.run(historial.registrar(base, origen="generar")) == 1
+    numeros = asyncio.run(historial.registrar_lote([
+        ("importacion:a", {**base, "total_pollos_semana": 2}),
+        ("importacion:b", {**base, "total_pollos_semana": 2}),   # sin cambios: no agrega versión
+        ("importacion:c", {**base, "total_pollos_semana": 3}),
+    ]))
+    assert numeros == {"2026-03-02": [2, 2, 3]}
+    assert asyncio.run(historial.cargar_version("2026-03-02", 2))["total_pollos_semana"] == 2
+    assert asyncio.run(historial.cargar_version("2026-03-02"))["total_pollos_semana"] == 3
@@ -0,0 +1,339 @@
+"""
+Tests del parser de ofertas Excel.
+"""
+from datetime import date, datetime
+
+import pytest
+
+from backend import parser_excel
+from backend.parser_excel import (
+    COLUMNAS_LEIDAS, COLUMNAS_OFERTA, FIRMA_OLE2, MAX_FILAS_VACIAS, decodificar_filas,
+    inspeccionar_excel, leer_oferta_excel, leer_proyeccion_excel, ofertas_a_columnas,
+    ofertas_desde_columnas,
+)
+from backend.serializacion import deserializar, serializar
+from tests.test_ajuste_martes_api import _crear_excel_oferta, LOTE_BASE
+
+
+def _lotes():
+    return [LOTE_BASE, {**LOTE_BASE, "galpon": 2, "sexo": "H", "fecha_ingreso": date(2026, 1, 12)}]
+
+
+def test_leer_oferta_excel():
+    ofertas = leer_oferta_excel(_crear_excel_oferta(_lotes()).getvalue())
+    assert [(o.galpon, o.sexo, o.fecha_ingreso) for o in ofertas] == [
+        (1, "M", date(2026, 1, 10)), (2, "H", date(2026, 1, 12)),
+    ]
+
+
+def test_columnas_roundtrip():
+    ofertas = leer_oferta_excel(_crear_excel_oferta(_lotes()).getvalue())
+    columnas = ofertas_a_columnas(ofertas)
+    assert columnas["n"] == 2
+    assert columnas["columnas"]["galpon"] == [1, 2]
+
+    for codec in ("json", "msgpack"):
+        decodificadas = ofertas_desde_columnas(deserializar(serializar(columnas, codec)))
+        assert [o.model_dump() for o in decodificadas] == [o.model_dump() for o in ofertas]
+
+
+def test_columnas_vacias():
+    assert ofertas_desde_columnas(ofertas_a_columnas([])) == []
+
+
+def _excel_con_filas(filas: dict) -> bytes:
+    """Excel de oferta con lotes en las filas indicadas ({fila: galpon})."""
+    import openpyxl
+    from datetime import datetime
+    from io import BytesIO
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "OFERTA JUEV"
+    for fila, galpon in filas.items():
+        ws.cell(row=fila, column=1, value=datetime(2026, 2, 23))
+        ws.cell(row=fila, column=2, value="TEST")
+        ws.cell(row=fila, column=3, value=galpon)
+        ws.cell(row=fila, column=5, value=1000)
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def test_streaming_tolera_huecos_cortos():
+    ofertas = leer_oferta_excel(_excel_con_filas({4: 1, 10: 2, 4 + MAX_FILAS_VACIAS: 3}))
+    assert [o.galpon for o in ofertas] == [1, 2, 3]
+
+
+def test_streaming_corta_tras_filas_vacias():
+    ofertas = leer_oferta_excel(_excel_con_filas({4: 1, 5 + MAX_FILAS_VACIAS: 2}))
+    assert [o.galpon for o in ofertas] == [1]
+
+
+def _fila(**valores) -> tuple:
+    fila = [None] * COLUMNAS_LEIDAS
+    for campo, valor in valores.items():
+        fila[COLUMNAS_OFERTA[campo]] = valor
+    return tuple(fila)
+
+
+def test_decodificar_infiere_formato_por_columna():
+    # 12/31 solo se lee como mes/día: el resto de la columna usa ese formato
+    filas = [
+        _fila(fecha_peso="12/31/2026", granja="A", cantidad="1.500", sexo="macho"),
+        _fila(fecha_peso="01/02/2027", granja="B", cantidad=2000.0, sexo="H"),
+        _fila(fecha_peso=datetime(2027, 1, 5, 8), granja=" C ", galpon="3", sexo="MIXTO"),
+    ]
+    columnas = decodificar_filas(filas)["columnas"]
+    assert columnas["fecha_peso"] == [date(2026, 12, 31), date(2027, 1, 2), date(2027, 1, 5)]
+    assert columnas["fecha_ingreso"] == columnas["fecha_peso"]
+    assert columnas["granja"] == ["A", "B", "C"]
+    assert columnas["cantidad"] == [1, 2000, 0]
+    assert columnas["galpon"] == [0, 0, 3]
+    assert columnas["sexo"] == ["M", "H", "MIX"]
+
+
+def test_decodificar_descarta_filas_invalidas():
+    filas = [
+        _fila(fecha_peso=date(2026, 2, 23), granja="A"),
+        _fila(fecha_peso=date(2026, 2, 23), granja="  "),
+        _fila(fecha_peso="sin fecha", granja="B"),
+    ]
+    resultado = decodificar_filas(filas)
+    assert resultado["n"] == 1
+    assert decodificar_filas([])["n"] == 0
+
+
+def test_validar_columnas_de_otro_origen():
+    columnas = ofertas_a_columnas(leer_oferta_excel(_crear_excel_oferta(_lotes()).getvalue()))
+    ofertas = ofertas_desde_columnas(columnas, validar=True)
+    assert ofertas[0].fecha_peso == LOTE_BASE["fecha_peso"]
+
+    columnas["columnas"]["cantidad"] = ["muchos", 1]
+    with pytest.raises(ValueError):
+        ofertas_desde_columnas(columnas, validar=True)
+
+
+def _excel_corrido(titulo="OFERTA JUEV", extra="Observaciones") -> bytes:
+    """Plantilla con otro orden de columnas, una columna extra y encabezado en la fila 1."""
+    import openpyxl
+    from io import BytesIO
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = titulo
+    ws.append([
+        extra, "GRANJA", "Galpón", "Sexo", "Fecha de Peso", "Pollos", "Fecha de Ingreso", "Núcleo",
+        "Edad Proy", "Peso Proy", "Ganancia", "Dias Proy", "Edad Real", "Peso Real",
+    ])
+    ws.append(["ok", "NORTE", 3, "H", datetime(2026, 2, 24), 12000, datetime(2026, 1, 15), 1, 40, 2.5, 0.09, 2, 38, 2.3])
+    ws.append(["ok", "SUR", 4, "M", "24/02/2026", 9000, None, 2, 41, 2.6, 0.09, 1, 40, 2.5])
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def test_detecta_encabezado_y_mapea_por_nombre():
+    ofertas = leer_oferta_excel(_excel_corrido())
+    assert [(o.granja, o.galpon, o.sexo, o.cantidad, o.fecha_ingreso) for o in ofertas] == [
+        ("NORTE", 3, "H", 12000, date(2026, 1, 15)),
+        ("SUR", 4, "M", 9000, date(2026, 2, 24)),
+    ]
+
+
+def _excel_guia(encabezados) -> bytes:
+    import openpyxl
+    from io import BytesIO
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "OFERTA JUEV"
+    ws.append(encabezados)
+    ws.append([
+        datetime(2026, 2, 12), "LOS REMANSOS", 5, 1, 4370, "H", 42, 2.78, 0.09, 0, 42, 2.78,
+        datetime(2025, 12, 31),
+    ][:len(encabezados)])
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+# Encabezados tal como los documenta docs/GUIA_DE_USUARIO.md §5.1
+ENCABEZADOS_GUIA = [
+    "Fecha de Peso", "Granja", "Galpón", "Núcleo", "Cantidad", "Sexo (M/H)", "Edad Proyectada",
+    "Peso Muestreo Proyectado", "Ganancia Diaria", "Días Proyectados", "Edad Real",
+    "Peso Muestreo Real", "Fecha de Ingreso",
+]
+
+
+def test_encabezados_de_la_guia():
+    [oferta] = leer_oferta_excel(_excel_guia(ENCABEZADOS_GUIA))
+    assert (oferta.granja, oferta.galpon, oferta.nucleo, oferta.cantidad, oferta.sexo) == (
+        "LOS REMANSOS", 5, 1, 4370, "H",
+    )
+    assert (oferta.edad_real, oferta.peso_muestreo_real, oferta.fecha_ingreso) == (42, 2.78, date(2025, 12, 31))
+
+
+def test_encabezado_desconocido_usa_la_posicion_del_layout_fijo():
+    encabezados = [*ENCABEZADOS_GUIA]
+    encabezados[5] = "Sx"
+    [oferta] = leer_oferta_excel(_excel_guia(encabezados))
+    assert oferta.sexo == "H"
+
+
+def test_encabezado_sin_un_campo_falla():
+    with pytest.raises(ValueError, match="ganancia_diaria, dias_proyectados"):
+        leer_oferta_excel(_excel_guia(ENCABEZADOS_GUIA[:8]))
+
+
+def test_layout_cacheado_por_plantilla(monkeypatch):
+    leer_oferta_excel(_excel_corrido(titulo="PLANTILLA X"))
+
+    def no_detectar(*args, **kwargs):
+        raise AssertionError("la plantilla ya conocida no debería re-detectarse")
+
+    monkeypatch.setattr(parser_excel, "_detectar_layout", no_detectar)
+    assert len(leer_oferta_excel(_excel_corrido(titulo="PLANTILLA X"))) == 2
+
+    # Misma hoja con otro encabezado: la huella no coincide y se detecta de nuevo
+    with pytest.raises(AssertionError):
+        leer_oferta_excel(_excel_corrido(titulo="PLANTILLA X", extra="Notas"))
+
+
+def _libro_con_hojas() -> bytes:
+    import openpyxl
+    from io import BytesIO
+
+    wb = openpyxl.load_workbook(_crear_excel_oferta([{**LOTE_BASE, "galpon": g} for g in range(1, 31)]))
+    wb.create_sheet("RESUMEN").append(["total", 30])
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def test_inspeccionar_lista_hojas_y_vista_previa():
+    info = inspeccionar_excel(_libro_con_hojas(), filas=5)
+    assert [h["nombre"] for h in info["hojas"]] == ["OFERTA MART", "RESUMEN"]
+    assert info["hojas"][0]["filas"] == 33
+    assert info["hoja"] == "OFERTA MART"
+    assert info["fila_encabezado"] == 3
+    assert [o["galpon"] for o in info["vista_previa"]] == [1, 2, 3, 4, 5]
+    assert info["vista_previa"][0]["fecha_peso"] == "2026-02-23"
+
+    otra = inspeccionar_excel(_libro_con_hojas(), sheet_name="RESUMEN")
+    assert otra["hoja"] == "RESUMEN" and otra["vista_previa"] == []
+
+
+class _LibroXls:
+    """Libro xlrd con on_demand: registra qué hojas se cargan y se liberan."""
+
+    class _Hoja:
+        def __init__(self, name, nrows):
+            self.name, self.nrows, self.ncols = name, nrows, 0
+
+    def __init__(self, hojas):
+        self._hojas = hojas
+        self.cargadas, self.cargas = set(), []
+
+    def sheet_names(self):
+        return list(self._hojas)
+
+    def sheet_loaded(self, nombre):
+        return nombre in self.cargadas
+
+    def sheet_by_name(self, nombre):
+        if nombre not in self.cargadas:
+            self.cargadas.add(nombre)
+            self.cargas.append(nombre)
+        return self._Hoja(nombre, self._hojas[nombre])
+
+    def sheet_by_index(self, i):
+        return self.sheet_by_name(self.sheet_names()[i])
+
+    def unload_sheet(self, nombre):
+        self.cargadas.discard(nombre)
+
+    def release_resources(self):
+        pass
+
+
+def test_inspeccionar_xls_solo_carga_la_hoja_elegida(monkeypatch):
+    libro = _LibroXls({"OFERTA JUEV": 0, "RESUMEN": 40, "DATOS": 5000})
+    monkeypatch.setattr(parser_excel.xlrd, "open_workbook", lambda **kwargs: libro)
+
+    info = inspeccionar_excel(FIRMA_OLE2 + b"\0" * 512)
+    assert info["hoja"] == "OFERTA JUEV"
+    assert info["hojas"] == [
+        {"nombre": "OFERTA JUEV", "filas": 0},
+        {"nombre": "RESUMEN", "filas": None},
+        {"nombre": "DATOS", "filas": None},
+    ]
+    assert libro.cargas == ["OFERTA JUEV"]
+    assert libro.cargadas == set()
+
+
+def test_endpoint_inspeccionar(tmp_path):
+    from fastapi.testclient import TestClient
+    from backend import storage
+    from backend.main import app
+
+    storage._storage_instance = storage.LocalStorage(str(tmp_path))
+    try:
+        client = TestClient(app)
+        r = client.post("/token", data={"username": "admin", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        r = client.post(
+            "/oferta/inspeccionar", headers=headers, params={"filas": 2},
+            files={"file": ("oferta.xlsx", _libro_con_hojas(), "application/octet-stream")},
+        )
+        assert r.status_code == 200
+        assert len(r.json()["vista_previa"]) == 2
+        # Inspeccionar no guarda nada
+        assert storage.get_storage().list_keys("") == []
+
+        r = client.post(
+            "/oferta/inspeccionar", headers=headers,
+            files={"file": ("oferta.csv", b"fecha;granja\n", "text/csv")},
+        )
+        assert r.status_code == 400
+    finally:
+        storage._storage_instance = None
+
+
+def test_lector_por_firma(monkeypatch):
+    llamadas = []
+
+    def xlrd_espia(*args, **kwargs):
+        llamadas.append(kwargs)
+        raise RuntimeError("xls inválido")
+
+    monkeypatch.setattr(parser_excel.xlrd, "open_workbook", xlrd_espia)
+
+    # Un .xlsx no pasa por xlrd
+    assert len(leer_oferta_excel(_crear_excel_oferta(_lotes()).getvalue())) == 2
+    assert llamadas == []
+
+    # Un OLE2 va directo a xlrd, con carga perezosa de hojas
+    with pytest.raises(ValueError, match="xls inválido"):
+        leer_oferta_excel(FIRMA_OLE2 + b"\0" * 512)
+    assert llamadas[0]["on_demand"] is True
+
+    with pytest.raises(ValueError, match="no es .xlsx ni .xls"):
+        leer_oferta_excel(b"GRANJA;GALPON\n")
+
+
+def test_leer_proyeccion_excel():
+    import openpyxl
+    from io import BytesIO
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "PROYEC1"
+    ws["D4"] = datetime(2026, 2, 23)
+    ws["N5"] = 0.09
+    ws["P5"] = "0,08"
+    buf = BytesIO()
+    wb.save(buf)
+    assert leer_proyeccion_excel(buf.getvalue()) == {
+        "fecha_base": date(2026, 2, 23), "ganancia_macho": 0.09, "ganancia_hembra": 0.08,
+    }
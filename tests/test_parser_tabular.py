@@ -0,0 +1,114 @@
+"""
+Tests de los parsers de oferta CSV / Parquet / Arrow.
+"""
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import storage
+from backend.main import app
+from backend.parser_excel import leer_oferta_excel, ofertas_desde_columnas
+from backend.parser_tabular import formato_de, leer_oferta_archivo, leer_oferta_csv
+from tests.test_ajuste_martes_api import _crear_excel_oferta, LOTE_BASE
+
+ENCABEZADOS = [
+    "Fecha de Peso", "GRANJA", "Galpón", "Nucleo", "cantidad", "sexo", "Edad Proyectada",
+    "Peso Muestreo Proy", "Ganancia Diaria", "Dias proyectados", "EDAD REAL",
+    "Peso Muestreo REAL", "FECHA DE INGRESO",
+]
+
+
+def _csv(separador=";", codificacion="utf-8") -> bytes:
+    filas = [
+        ENCABEZADOS,
+        ["23/02/2026", "TEST", "1", "1", "15000", "M", "40", "2,95", "0,09", "0", "40", "2,95", "10/01/2026"],
+        ["", "", "", "", "", "", "", "", "", "", "", "", ""],
+        ["23/02/2026", "TEST", "2", "1", "15000", "H", "40", "2,95", "0,09", "0", "40", "2,95", ""],
+    ]
+    return "\n".join(separador.join(f) for f in filas).encode(codificacion)
+
+
+def test_csv_mapea_por_encabezado():
+    ofertas = ofertas_desde_columnas(leer_oferta_csv(_csv()))
+    assert [(o.galpon, o.sexo, o.fecha_ingreso) for o in ofertas] == [
+        (1, "M", date(2026, 1, 10)), (2, "H", date(2026, 2, 23)),
+    ]
+    esperado = leer_oferta_excel(_crear_excel_oferta([LOTE_BASE]).getvalue())[0]
+    assert ofertas[0].model_dump() == esperado.model_dump()
+
+
+def test_csv_latin1_y_coma(tmp_path):
+    ruta = tmp_path / "oferta.csv"
+    ruta.write_bytes(_csv(separador=",", codificacion="latin-1").replace(b"2,95", b"2.95").replace(b"0,09", b"0.09"))
+    ofertas = ofertas_desde_columnas(leer_oferta_archivo(str(ruta), "oferta.csv"))
+    assert [o.peso_muestreo_proy for o in ofertas] == [2.95, 2.95]
+
+
+def test_csv_sin_columnas_obligatorias():
+    with pytest.raises(ValueError, match="granja"):
+        leer_oferta_csv(b"fecha;galpon\n23/02/2026;1\n")
+
+
+def test_formato_por_extension():
+    assert formato_de("OFERTA.XLSX") == "excel"
+    assert formato_de("oferta.parquet") == "parquet"
+    assert formato_de("oferta.pdf") is None
+
+
+def _tabla():
+    pa = pytest.importorskip("pyarrow")
+    return pa.table({
+        "fecha_peso": [date(2026, 2, 23)] * 2,
+        "granja": ["TEST", "TEST"],
+        "galpon": [1, 2],
+        "cantidad": [15000, 12000],
+        "sexo": ["M", "H"],
+        "columna_extra": ["x", "y"],
+    })
+
+
+def test_parquet(tmp_path):
+    tabla = _tabla()
+    import pyarrow.parquet as pq
+
+    ruta = tmp_path / "oferta.parquet"
+    pq.write_table(tabla, ruta)
+    ofertas = ofertas_desde_columnas(leer_oferta_archivo(str(ruta), "oferta.parquet"))
+    assert [(o.galpon, o.cantidad, o.fecha_ingreso) for o in ofertas] == [
+        (1, 15000, date(2026, 2, 23)), (2, 12000, date(2026, 2, 23)),
+    ]
+
+
+def test_arrow_ipc():
+    tabla = _tabla()
+    import pyarrow as pa
+
+    for escritor in (pa.ipc.new_file, pa.ipc.new_stream):
+        sink = pa.BufferOutputStream()
+        with escritor(sink, tabla.schema) as w:
+            w.write_table(tabla)
+        ofertas = ofertas_desde_columnas(leer_oferta_archivo(sink.getvalue().to_pybytes(), "oferta.arrow"))
+        assert [o.sexo for o in ofertas] == ["M", "H"]
+
+
+def test_upload_csv(tmp_path):
+    storage._storage_instance = storage.LocalStorage(str(tmp_path))
+    try:
+        client = TestClient(app)
+        r = client.post("/token", data={"username": "admin", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        r = client.post(
+            "/oferta/upload", headers=headers,
+            files={"file": ("oferta.csv", _csv(), "text/csv")},
+        )
+        assert r.status_code == 200
+        assert r.json()["total_lotes"] == 2
+
+        r = client.post(
+            "/oferta/upload", headers=headers,
+            files={"file": ("oferta.pdf", b"%PDF", "application/pdf")},
+        )
+        assert r.status_code == 400
+    finally:
+        storage._storage_instance = None
@@ -0,0 +1,77 @@
+"""
+Tests de los codecs de serialización del storage.
+"""
+import json
+import pytest
+from datetime import date
+
+from backend import serializacion
+from backend.serializacion import serializar, deserializar, codec_de, MAGIA
+from backend.storage import LocalStorage
+
+
+SEMANA = {
+    "fecha_inicio": date(2026, 2, 23),
+    "dias": [
+        {"fecha": date(2026, 2, 23), "lotes": [{"granja": "Santa Rosa", "cantidad": 15000, "peso": 2.95}]},
+    ],
+    "lotes_fuera_rango": [{"detalle_por_dia": [{"fecha": "2026-02-24", "motivo": "edad"}]}],
+}
+
+
+@pytest.mark.parametrize("codec", ["json", "orjson", "msgpack", "zstd"])
+def test_roundtrip(codec):
+    if codec != "json":
+        pytest.importorskip({"zstd": "zstandard"}.get(codec, codec))
+    datos = deserializar(serializar(SEMANA, codec=codec))
+    assert datos["dias"][0]["lotes"][0] == SEMANA["dias"][0]["lotes"][0]
+    assert str(datos["fecha_inicio"]) == "2026-02-23"
+
+
+def test_msgpack_fechas_como_ordinales():
+    pytest.importorskip("msgpack")
+    raw = serializar({"f": date(2026, 2, 23)}, codec="msgpack")
+    assert raw.startswith(MAGIA)
+    assert b"2026" not in raw
+    assert deserializar(raw) == {"f": "2026-02-23"}
+
+
+def test_misma_forma_con_todos_los_codecs():
+    from datetime import datetime
+
+    datos = {**SEMANA, "creado_en": datetime(2026, 2, 23, 8, 30)}
+    esperado = deserializar(serializar(datos, codec="json"))
+    assert esperado["fecha_inicio"] == "2026-02-23"
+    for codec, modulo in (("orjson", "orjson"), ("msgpack", "msgpack"), ("zstd", "zstandard")):
+        pytest.importorskip(modulo)
+        assert deserializar(serializar(datos, codec=codec)) == esperado, codec
+
+
+def test_json_legado_sin_cabecera():
+    legado = json.dumps({"a": 1}, indent=2).encode("utf-8")
+    assert codec_de(legado) == "json"
+    assert deserializar(legado) == {"a": 1}
+    assert deserializar(legado.decode("utf-8")) == {"a": 1}
+
+
+def test_cabecera_identifica_codec():
+    pytest.importorskip("orjson")
+    assert codec_de(serializar({}, codec="orjson")) == "orjson"
+
+
+def test_codec_desconocido():
+    with pytest.raises(ValueError):
+        serializar({}, codec="xml")
+
+
+def test_migracion_perezosa(tmp_path, monkeypatch):
+    """Un archivo JSON viejo se lee con cualquier codec y se reescribe al guardar."""
+    pytest.importorskip("orjson")
+    (tmp_path / "ofertas.json").write_text(json.dumps([{"granja": "A"}], indent=2), encoding="utf-8")
+    monkeypatch.setattr(serializacion, "codec_configurado", lambda: "orjson")
+
+    st = LocalStorage(str(tmp_path))
+    assert st.load("ofertas") == [{"granja": "A"}]
+    st.save("ofertas", [{"granja": "B"}])
+    assert codec_de((tmp_path / "ofertas.json").read_bytes()) == "orjson"
+    assert st.load("ofertas") == [{"granja": "B"}]
@@ -7,7 +7,10 @@ import tempfile
 import pytest
 from datetime import date
 
-from backend.storage import LocalStorage, DateEncoder, _serialize, _deserialize
+from backend.storage import (
+    LocalStorage, CachedStorage, ConflictoVersion, VERSION_INEXISTENTE,
+    DateEncoder, _serialize, _deserialize,
+)
 
 
 @pytest.fixture
@@ -114,3 +117,275 @@ class TestLocalStorage:
         temp_storage.save("uploads/2026/file1", {"name": "f1"})
         loaded = temp_storage.load("uploads/2026/file1")
         assert loaded["name"] == "f1"
+
+
+class _ContadorStorage(LocalStorage):
+    """LocalStorage que cuenta los accesos al disco."""
+
+    def __init__(self, base_path):
+        super().__init__(base_path)
+        self.loads = 0
+        self.versions = 0
+
+    def load(self, key):
+        self.loads += 1
+        return super().load(key)
+
+    def version(self, key):
+        self.versions += 1
+        return super().version(key)
+
+
+@pytest.fixture
+def backend_contador():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield _ContadorStorage(tmpdir)
+
+
+class TestCachedStorage:
+    def test_lectura_caliente_sin_round_trips(self, backend_contador):
+        cache = CachedStorage(backend_contador, ttl=60)
+        cache.save("ofertas", [{"granja": "A"}])
+        backend_contador.loads = backend_contador.versions = 0
+
+        for _ in range(5):
+            assert cache.load("ofertas") == [{"granja": "A"}]
+            cache.version("ofertas")
+        assert backend_contador.loads == 0
+        assert backend_contador.versions == 0
+
+    def test_write_through_guarda_forma_decodificada(self, backend_contador):
+        cache = CachedStorage(backend_contador, ttl=60)
+        cache.save("p", {"fecha": date(2026, 2, 23)})
+        assert cache.load("p") == {"fecha": "2026-02-23"}
+
+    def test_ttl_vencido_revalida_por_version(self, backend_contador):
+        cache = CachedStorage(backend_contador, ttl=0)
+        cache.save("p", {"v": 1})
+        backend_contador.loads = 0
+
+        assert cache.load("p") == {"v": 1}
+        assert backend_contador.loads == 0  # misma versión → no re-descarga
+        assert backend_contador.versions >= 1
+
+    def test_detecta_escritura_externa(self, backend_contador):
+        cache = CachedStorage(backend_contador, ttl=0)
+        cache.save("p", {"v": 1})
+        backend_contador.save("p", {"v": 22})  # otro proceso escribe directo
+        assert cache.load("p") == {"v": 22}
+
+    def test_cachea_ausencia(self, backend_contador):
+        cache = CachedStorage(backend_contador, ttl=60)
+        assert cache.load("nada") is None
+        assert not cache.exists("nada")
+        assert backend_contador.versions == 1
+
+    def test_delete_invalida(self, backend_contador):
+        cache = CachedStorage(backend_contador, ttl=60)
+        cache.save("p", {"v": 1})
+        cache.delete("p")
+        assert cache.load("p") is None
+        assert not backend_contador.exists("p")
+
+    def test_lru_acotado(self, backend_contador):
+        cache = CachedStorage(backend_contador, ttl=60, max_entradas=3)
+        for i in range(500):
+            cache.save(f"k{i}", {"i": i})
+        assert len(cache._entradas) == 3
+        cache.load("k497")  # la más vieja pasa a ser la más reciente
+        cache.save("nueva", {})
+        assert list(cache._entradas) == ["k499", "k497", "nueva"]
+
+    def test_prefijos_append_only_no_se_cachean(self, backend_contador):
+        cache = CachedStorage(backend_contador, ttl=60)
+        for key in ("historial/2026-03-02/v000001", "bitacora/s1/op/000001", "uploads/meta/abc"):
+            cache.save(key, {"x": 1})
+            assert cache.load(key) == {"x": 1}
+        cache.save("bitacora/cabeza", {"sesion": "s1"})
+        assert list(cache._entradas) == ["bitacora/cabeza"]
+
+
+class TestLoadMany:
+    def test_local_load_many(self, temp_storage):
+        temp_storage.save("ofertas", [1, 2])
+        temp_storage.save("parametros", {"a": 1})
+        datos = temp_storage.load_many(["ofertas", "parametros", "proyeccion"])
+        assert datos == {"ofertas": [1, 2], "parametros": {"a": 1}, "proyeccion": None}
+
+    def test_cache_load_many_solo_pide_faltantes(self, backend_contador):
+        cache = CachedStorage(backend_contador, ttl=60)
+        cache.save("parametros", {"a": 1})
+        backend_contador.save("proyeccion", {"b": 2})
+        backend_contador.loads = 0
+
+        datos = cache.load_many(["proyeccion", "parametros"])
+        assert list(datos) == ["proyeccion", "parametros"]
+        assert datos["proyeccion"] == {"b": 2}
+        assert backend_contador.loads == 1
+
+        cache.load_many(["proyeccion", "parametros"])
+        assert backend_contador.loads == 1
+
+
+class _FakeNotFound(Exception):
+    pass
+
+
+class _FakeBlob:
+    def __init__(self, bucket, name):
+        self._bucket = bucket
+        self.name = name
+        self.generation = None
+
+    def download_as_bytes(self):
+        self._bucket.requests += 1
+        if self.name not in self._bucket.objetos:
+            raise _FakeNotFound(self.name)
+        raw, self.generation = self._bucket.objetos[self.name]
+        return raw
+
+    def delete(self):
+        self._bucket.requests += 1
+        if self.name not in self._bucket.objetos:
+            raise _FakeNotFound(self.name)
+        del self._bucket.objetos[self.name]
+
+
+class _FakeBucket:
+    def __init__(self):
+        self.objetos = {}
+        self.requests = 0
+
+    def blob(self, name):
+        return _FakeBlob(self, name)
+
+
+@pytest.fixture
+def gcs_fake():
+    from concurrent.futures import ThreadPoolExecutor
+    from backend.storage import GCSStorage
+
+    gcs = GCSStorage.__new__(GCSStorage)
+    gcs.bucket = _FakeBucket()
+    gcs.prefix = "data/"
+    gcs._not_found = _FakeNotFound
+    gcs._executor = ThreadPoolExecutor(max_workers=4)
+    return gcs
+
+
+class TestGCSStorageLecturas:
+    def test_load_un_solo_round_trip(self, gcs_fake):
+        gcs_fake.bucket.objetos["data/proyeccion.json"] = (b'{"v": 1}', 7)
+        assert gcs_fake.load_versioned("proyeccion") == ({"v": 1}, "7")
+        assert gcs_fake.bucket.requests == 1
+
+    def test_load_inexistente(self, gcs_fake):
+        assert gcs_fake.load("nada") is None
+        assert gcs_fake.load_bytes("uploads/nada.xlsx") is None
+        assert gcs_fake.bucket.requests == 2
+
+    def test_delete_inexistente(self, gcs_fake):
+        gcs_fake.delete("nada")
+        assert gcs_fake.bucket.requests == 1
+
+    def test_load_many(self, gcs_fake):
+        gcs_fake.bucket.objetos["data/ofertas.json"] = (b"[1]", 1)
+        gcs_fake.bucket.objetos["data/parametros.json"] = (b"{}", 2)
+        datos = gcs_fake.load_many(["ofertas", "parametros", "proyeccion"])
+        assert datos == {"ofertas": [1], "parametros": {}, "proyeccion": None}
+
+
+class TestCompareAndSwap:
+    def test_versiones_incrementales(self, temp_storage):
+        v1 = temp_storage.save("p", {"v": 1})
+        v2 = temp_storage.save("p", {"v": 2})
+        assert v1 != v2
+        assert temp_storage.version("p") == v2
+
+    def test_if_version_correcta(self, temp_storage):
+        v1 = temp_storage.save("p", {"v": 1})
+        temp_storage.save("p", {"v": 2}, if_version=v1)
+        assert temp_storage.load("p") == {"v": 2}
+
+    def test_if_version_vieja_lanza_conflicto(self, temp_storage):
+        v1 = temp_storage.save("p", {"v": 1})
+        temp_storage.save("p", {"v": 2})
+        with pytest.raises(ConflictoVersion):
+            temp_storage.save("p", {"v": 3}, if_version=v1)
+        assert temp_storage.load("p") == {"v": 2}
+
+    def test_version_inexistente(self, temp_storage):
+        temp_storage.save("p", {"v": 1}, if_version=VERSION_INEXISTENTE)
+        with pytest.raises(ConflictoVersion):
+            temp_storage.save("p", {"v": 2}, if_version=VERSION_INEXISTENTE)
+
+    def test_version_no_se_repite_tras_delete(self, temp_storage):
+        v1 = temp_storage.save("p", {"v": 1})
+        temp_storage.delete("p")
+        assert temp_storage.version("p") is None
+        assert temp_storage.save("p", {"v": 1}) != v1
+
+    def test_archivo_legado_sin_version(self, temp_storage):
+        (temp_storage.base_path / "p.json").write_text('{"v": 1}', encoding="utf-8")
+        v = temp_storage.version("p")
+        assert v is not None
+        temp_storage.save("p", {"v": 2}, if_version=v)
+        assert temp_storage.load("p") == {"v": 2}
+
+    def test_cache_invalida_en_conflicto(self, backend_contador):
+        cache = CachedStorage(backend_contador, ttl=60)
+        v1 = cache.save("p", {"v": 1})
+        backend_contador.save("p", {"v": 2})  # escritura de otra instancia
+        with pytest.raises(ConflictoVersion):
+            cache.save("p", {"v": 3}, if_version=v1)
+        assert cache.load("p") == {"v": 2}
+
+    def test_list_keys_ignora_archivos_auxiliares(self, temp_storage):
+        temp_storage.save("p", {"v": 1})
+        assert temp_storage.list_keys() == ["p"]
+
+
+class TestLocalStorageDurable:
+    def test_no_quedan_temporales(self, temp_storage):
+        temp_storage.save("uploads/2026/f", {"a": 1})
+        temp_storage.save_bytes("uploads/x.xlsx", b"xx")
+        restos = [p.name for p in temp_storage.base_path.rglob("*.tmp")]
+        assert restos == []
+
+    def test_escritura_fallida_preserva_anterior(self, temp_storage, monkeypatch):
+        temp_storage.save("proyeccion", {"v": 1})
+
+        def falla(*args, **kwargs):
+            raise OSError("disco lleno")
+
+        monkeypatch.setattr("backend.storage.os.replace", falla)
+        with pytest.raises(OSError):
+            temp_storage.save("proyeccion", {"v": 2})
+        monkeypatch.undo()
+        assert temp_storage.load("proyeccion") == {"v": 1}
+
+    def test_lecturas_no_crean_directorios(self, temp_storage):
+        assert temp_storage.load("a/b/c") is None
+        assert not temp_storage.exists("a/b/c")
+        temp_storage.delete("a/b/c")
+        assert not (temp_storage.base_path / "a").exists()
+
+    def test_manifest_refleja_altas_y_bajas(self, temp_storage):
+        temp_storage.save("ofertas", [])
+        temp_storage.save("uploads/2026/f", {})
+        temp_storage.delete("ofertas")
+        assert temp_storage.list_keys() == ["uploads/2026/f"]
+
+    def test_manifest_compartido_entre_instancias(self, temp_storage):
+        otra = LocalStorage(str(temp_storage.base_path))
+        assert otra.list_keys() == []
+        temp_storage.save("proyeccion", {})
+        assert otra.list_keys() == ["proyeccion"]
+
+    def test_manifest_se_reconstruye_en_directorio_legado(self, tmp_path):
+        (tmp_path / "viejo.json").write_text("{}", encoding="utf-8")
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "otro.json").write_text("[]", encoding="utf-8")
+        st = LocalStorage(str(tmp_path))
+        assert st.list_keys() == ["sub/otro", "viejo"]
+        assert (tmp_path / LocalStorage.MANIFEST).exists()
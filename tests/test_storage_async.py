@@ -0,0 +1,168 @@
+"""
+Tests de la capa de persistencia asíncrona.
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from backend import storage
+from backend.storage import LocalStorage, CachedStorage
+from backend.storage_async import (
+    AsyncCachedStorage, AsyncGCSStorage, AsyncThreadedStorage, get_async_storage,
+)
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        yield ex
+
+
+class _ContadorStorage(LocalStorage):
+    def __init__(self, base_path):
+        super().__init__(base_path)
+        self.loads = 0
+
+    def load(self, key):
+        self.loads += 1
+        return super().load(key)
+
+
+def test_threaded_roundtrip(tmp_path, executor):
+    st = AsyncThreadedStorage(LocalStorage(str(tmp_path)), executor)
+
+    async def flujo():
+        await st.save("ofertas", [{"granja": "A"}])
+        assert await st.load("ofertas") == [{"granja": "A"}]
+        assert await st.exists("ofertas")
+        datos = await st.load_many(["ofertas", "nada"])
+        assert datos == {"ofertas": [{"granja": "A"}], "nada": None}
+        await st.delete("ofertas")
+        assert await st.load("ofertas") is None
+
+    asyncio.run(flujo())
+
+
+def test_cache_async_comparte_entradas_con_sync(tmp_path, executor):
+    backend = _ContadorStorage(str(tmp_path))
+    cache = CachedStorage(backend, ttl=60)
+    st = AsyncCachedStorage(AsyncThreadedStorage(backend, executor), cache, executor)
+
+    cache.save("proyeccion", {"v": 1})
+    backend.loads = 0
+
+    async def leer():
+        return await st.load("proyeccion"), await st.version("proyeccion")
+
+    data, version = asyncio.run(leer())
+    assert data == {"v": 1}
+    assert version == backend.version("proyeccion")
+    assert backend.loads == 0
+
+    asyncio.run(st.save("proyeccion", {"v": 2}))
+    assert cache.load("proyeccion") == {"v": 2}
+    assert backend.loads == 0
+
+
+def test_cache_async_no_publica_lectura_vieja(tmp_path, executor):
+    from backend.cache_compartido import InMemorySharedCache
+
+    class Intercalado(LocalStorage):
+        entre = None
+
+        def load_versioned(self, key):
+            resultado = super().load_versioned(key)
+            if self.entre is not None:
+                entre, self.entre = self.entre, None
+                entre()
+            return resultado
+
+    backend = Intercalado(str(tmp_path))
+    shared = InMemorySharedCache()
+    backend.save("proyeccion", {"v": 1})
+    st = AsyncCachedStorage(AsyncThreadedStorage(backend, executor), CachedStorage(backend, ttl=60, shared=shared), executor)
+    # Un escritor sin cache compartido (p. ej. Redis caído) guarda entre la lectura y la publicación
+    backend.entre = lambda: backend.save("proyeccion", {"v": 2})
+
+    assert asyncio.run(st.load("proyeccion")) == {"v": 1}
+    assert shared.get("proyeccion") is None
+    assert CachedStorage(backend, ttl=60, shared=shared).load("proyeccion") == {"v": 2}
+
+
+def test_io_bloqueante_usa_el_executor_dedicado(tmp_path):
+    import threading
+    from backend.storage_async import ejecutar_io
+
+    nombre = asyncio.run(ejecutar_io(lambda: threading.current_thread().name))
+    assert nombre.startswith("storage-io")
+
+
+def test_factory_sigue_al_storage_sync(tmp_path):
+    storage._storage_instance = LocalStorage(str(tmp_path))
+    try:
+        a = get_async_storage()
+        assert isinstance(a, AsyncThreadedStorage)
+        assert a.backend is storage._storage_instance
+        assert get_async_storage() is a
+
+        storage._storage_instance = CachedStorage(LocalStorage(str(tmp_path)))
+        b = get_async_storage()
+        assert isinstance(b, AsyncCachedStorage)
+        assert b.cache is storage._storage_instance
+    finally:
+        storage._storage_instance = None
+
+
+class _Credenciales:
+    valid = True
+    token = "tkn"
+
+
+def _gcs_fake(handler) -> AsyncGCSStorage:
+    gcs = AsyncGCSStorage.__new__(AsyncGCSStorage)
+    gcs._credentials = _Credenciales()
+    gcs._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    gcs._executor = None
+    gcs._token_lock = asyncio.Lock()
+    gcs.bucket_name = "bkt"
+    gcs.prefix = "data/"
+    return gcs
+
+
+def test_gcs_async_descarga_y_404():
+    objetos = {"data/proyeccion.json": (b'{"v": 1}', "17")}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.headers["authorization"] == "Bearer tkn"
+        nombre = request.url.path.split("/o/", 1)[1].replace("%2F", "/")
+        if nombre not in objetos:
+            return httpx.Response(404)
+        raw, gen = objetos[nombre]
+        return httpx.Response(200, content=raw, headers={"x-goog-generation": gen})
+
+    async def flujo():
+        gcs = _gcs_fake(handler)
+        assert await gcs.load_versioned("proyeccion") == ({"v": 1}, "17")
+        assert await gcs.load("ofertas") is None
+        assert await gcs.load_bytes("uploads/x.xlsx") is None
+
+    asyncio.run(flujo())
+
+
+def test_gcs_async_upload_devuelve_generacion():
+    subidos = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.params["uploadType"] == "media"
+        subidos[request.url.params["name"]] = request.content
+        return httpx.Response(200, json={"generation": "42"})
+
+    async def flujo():
+        gcs = _gcs_fake(handler)
+        return await gcs.save("parametros", {"a": 1})
+
+    assert asyncio.run(flujo()) == "42"
+    assert json.loads(subidos["data/parametros.json"]) == {"a": 1}
@@ -0,0 +1,164 @@
+"""
+Tests del backend SQLite (tablas por entidad, ediciones por fila, CAS).
+"""
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import storage
+from backend.main import app
+from backend.storage import ConflictoVersion, VERSION_INEXISTENTE
+from backend.storage_sqlite import SQLiteStorage
+from tests.test_ajuste_martes_api import _generar_proyeccion, LOTE_BASE
+
+
+def _lote(granja, galpon, cantidad=1000):
+    return {"granja": granja, "galpon": galpon, "nucleo": 1, "sexo": "M", "cantidad": cantidad}
+
+
+def _semana():
+    return {
+        "fecha_inicio": "2026-03-02",
+        "fecha_fin": "2026-03-07",
+        "total_pollos_semana": 3000,
+        "lotes_no_asignados": [],
+        "dias": [
+            {"fecha": "2026-03-02", "total_pollos": 2000, "lotes": [_lote("A", 1), _lote("B", 2)]},
+            {"fecha": "2026-03-03", "total_pollos": 1000, "lotes": [_lote("A", 3)]},
+            {"fecha": "2026-03-04", "total_pollos": 0, "lotes": []},
+        ],
+    }
+
+
+@pytest.fixture
+def db(tmp_path):
+    return SQLiteStorage(str(tmp_path / "faena.sqlite3"))
+
+
+class TestRoundtrip:
+    def test_semana(self, db):
+        db.save("proyeccion", _semana())
+        assert db.load("proyeccion") == _semana()
+
+    def test_ofertas_parametros_y_blob(self, db):
+        ofertas = [{"granja": "A", "galpon": 1, "fecha_peso": "2026-03-01", "cantidad": 10}]
+        db.save("ofertas", ofertas)
+        db.save("parametros", {"kg_por_caja": 20.0, "dias_faena": 6})
+        db.save("otro", {"anidado": {"x": [1, 2]}})
+        assert db.load("ofertas") == ofertas
+        assert db.load("parametros") == {"kg_por_caja": 20.0, "dias_faena": 6}
+        assert db.load("otro") == {"anidado": {"x": [1, 2]}}
+        assert db.list_keys() == ["ofertas", "otro", "parametros"]
+
+    def test_cambio_de_formato_limpia_filas(self, db):
+        db.save("proyeccion", _semana())
+        db.save("proyeccion", {"simple": True})
+        assert db.load("proyeccion") == {"simple": True}
+        assert db.consultar_lotes() == []
+
+    def test_bytes(self, db):
+        db.save_bytes("uploads/a.xlsx", b"PK\x03\x04")
+        assert db.load_bytes("uploads/a.xlsx") == b"PK\x03\x04"
+        assert db.load_bytes("uploads/b.xlsx") is None
+
+    def test_bytes_por_stream(self, db, monkeypatch):
+        from backend import storage_sqlite
+
+        monkeypatch.setattr(storage_sqlite, "BLOQUE_STREAM", 3)
+        archivo = io.BytesIO(b"xxPK\x03\x04-contenido")
+        archivo.seek(2)
+        db.save_bytes_desde("uploads/a.gz", archivo, content_type="application/gzip")
+        assert db.load_bytes("uploads/a.gz") == b"PK\x03\x04-contenido"
+        db.save_bytes_desde("uploads/a.gz", io.BytesIO(b""))
+        assert db.load_bytes("uploads/a.gz") == b""
+
+
+class TestVersiones:
+    def test_cas(self, db):
+        v1 = db.save("proyeccion", _semana(), if_version=VERSION_INEXISTENTE)
+        with pytest.raises(ConflictoVersion):
+            db.save("proyeccion", {"x": 1}, if_version=VERSION_INEXISTENTE)
+        v2 = db.save("proyeccion", _semana(), if_version=v1)
+        assert v2 != v1
+        with pytest.raises(ConflictoVersion):
+            db.save_dias("proyeccion", _semana(), [0], if_version=v1)
+        assert db.version("proyeccion") == v2
+
+    def test_delete_no_reinicia_version(self, db):
+        v1 = db.save("ofertas", [{"granja": "A", "fecha_peso": "2026-03-01"}])
+        db.delete("ofertas")
+        assert db.load_versioned("ofertas") == (None, None)
+        assert not db.exists("ofertas")
+        v2 = db.save("ofertas", [{"granja": "A", "fecha_peso": "2026-03-01"}])
+        assert v2 != v1
+
+
+class TestSaveDias:
+    def test_solo_reescribe_los_dias_indicados(self, db):
+        db.save("proyeccion", _semana())
+        editada = _semana()
+        editada["dias"][0]["lotes"].pop(0)
+        editada["dias"][0]["total_pollos"] = 1000
+        editada["total_pollos_semana"] = 2000
+        # Un cambio en un día no declarado no debe persistirse
+        editada["dias"][1]["lotes"][0]["cantidad"] = 999
+
+        db.save_dias("proyeccion", editada, [0])
+        guardada = db.load("proyeccion")
+        assert guardada["dias"][0]["lotes"] == [_lote("B", 2)]
+        assert guardada["dias"][0]["total_pollos"] == 1000
+        assert guardada["total_pollos_semana"] == 2000
+        assert guardada["dias"][1]["lotes"][0]["cantidad"] == 1000
+
+    def test_estructura_distinta_cae_a_guardado_completo(self, db):
+        db.save("proyeccion", _semana())
+        otra = _semana()
+        otra["dias"].append({"fecha": "2026-03-05", "total_pollos": 0, "lotes": []})
+        db.save_dias("proyeccion", otra, [0])
+        assert db.load("proyeccion") == otra
+
+    def test_cache_pasa_save_dias_al_backend(self, db):
+        cache = storage.CachedStorage(db, ttl=60)
+        cache.save("proyeccion", _semana())
+        editada = _semana()
+        editada["dias"][2]["lotes"].append(_lote("C", 1))
+        version = cache.save_dias("proyeccion", editada, [2])
+        assert version == db.version("proyeccion")
+        assert cache.load("proyeccion") == db.load("proyeccion") == editada
+
+
+def test_consultar_lotes(db):
+    db.save("proyeccion", _semana())
+    lotes = db.consultar_lotes(granja="A")
+    assert [(l["fecha"], l["galpon"]) for l in lotes] == [("2026-03-02", 1), ("2026-03-03", 3)]
+    assert len(db.consultar_lotes(desde="2026-03-03")) == 1
+    assert db.consultar_lotes(granja="A", galpon=1, hasta="2026-03-02")[0]["key"] == "proyeccion"
+
+
+def test_snapshots_de_historial_y_bitacora_no_duplican_lotes(db):
+    db.save("proyeccion", _semana())
+    db.save("historial/2026-03-02/v000001", _semana())
+    db.save("bitacora/s1/snap/000001", _semana())
+    db.save("ofertas_previas", [{"granja": "A", "fecha_peso": "2026-03-01"}])
+
+    assert [l["key"] for l in db.consultar_lotes()] == ["proyeccion"] * 3
+    assert db.load("historial/2026-03-02/v000001") == _semana()
+    assert db.load("bitacora/s1/snap/000001") == _semana()
+    assert db.load("ofertas_previas") == [{"granja": "A", "fecha_peso": "2026-03-01"}]
+
+
+def test_edicion_api_sobre_sqlite(tmp_path):
+    storage._storage_instance = SQLiteStorage(str(tmp_path / "faena.sqlite3"))
+    try:
+        client = TestClient(app)
+        r = client.post("/token", data={"username": "admin", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        proy = _generar_proyeccion(client, headers, [LOTE_BASE, {**LOTE_BASE, "galpon": 2}])
+        dia = next(i for i, d in enumerate(proy["dias"]) if d["lotes"])
+        r = client.delete(f"/proyeccion/lote/{dia}/0", headers=headers)
+        assert r.status_code == 200
+        assert client.get("/proyeccion", headers=headers).json() == r.json()
+    finally:
+        storage._storage_instance = None
@@ -0,0 +1,106 @@
+"""
+Tests del pool acotado para trabajo CPU-bound.
+"""
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import storage, trabajos
+from backend.main import app
+from backend.parser_excel import leer_oferta_excel
+from tests.test_ajuste_martes_api import _crear_excel_oferta, LOTE_BASE
+
+
+@pytest.fixture
+def pool():
+    p = trabajos.PoolCPU(workers=1, max_cola=2)
+    yield p
+    p.cerrar()
+
+
+def test_loop_sigue_respondiendo(pool):
+    liberar = threading.Event()
+
+    async def flujo():
+        lento = asyncio.create_task(pool.ejecutar(liberar.wait, 5))
+        await asyncio.sleep(0)
+        # El event loop no está bloqueado mientras el trabajo corre
+        assert not lento.done()
+        assert pool.en_curso == 1
+        liberar.set()
+        return await lento
+
+    assert asyncio.run(flujo()) is True
+    assert pool.en_curso == 0
+
+
+def test_cola_llena(pool):
+    liberar = threading.Event()
+
+    async def flujo():
+        tareas = [asyncio.create_task(pool.ejecutar(liberar.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(trabajos.ColaLlena):
+            await pool.ejecutar(sum, [1, 2])
+        liberar.set()
+        await asyncio.gather(*tareas)
+        # Al liberarse hay lugar de nuevo
+        return await pool.ejecutar(sum, [1, 2])
+
+    assert asyncio.run(flujo()) == 3
+
+
+def test_cancelar_no_libera_hasta_que_termina_el_trabajo(pool):
+    empezo, liberar = threading.Event(), threading.Event()
+
+    def trabajo():
+        empezo.set()
+        return liberar.wait(5)
+
+    async def flujo():
+        tarea = asyncio.create_task(pool.ejecutar(trabajo))
+        await asyncio.to_thread(empezo.wait, 5)
+        tarea.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tarea
+        # El worker sigue ocupado: el lugar no se devuelve todavía
+        assert pool.en_curso == 1
+        en_espera = asyncio.create_task(pool.ejecutar(sum, [1, 2]))
+        await asyncio.sleep(0)
+        with pytest.raises(trabajos.ColaLlena):
+            await pool.ejecutar(sum, [1, 2])
+        liberar.set()
+        return await en_espera
+
+    assert asyncio.run(flujo()) == 3
+    assert pool.en_curso == 0
+
+
+def test_modo_procesos():
+    pool = trabajos.PoolCPU(workers=1, max_cola=1, modo=trabajos.MODO_PROCESOS)
+    try:
+        excel = _crear_excel_oferta([LOTE_BASE]).getvalue()
+        ofertas = asyncio.run(pool.ejecutar(leer_oferta_excel, excel, None))
+        assert [o.granja for o in ofertas] == ["TEST"]
+    finally:
+        pool.cerrar()
+
+
+def test_api_responde_503_con_pool_saturado(tmp_path, monkeypatch):
+    storage._storage_instance = storage.LocalStorage(str(tmp_path))
+    monkeypatch.setattr(trabajos, "_pool", trabajos.PoolCPU(workers=1, max_cola=0))
+    try:
+        client = TestClient(app)
+        r = client.post("/token", data={"username": "admin", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        r = client.post(
+            "/oferta/upload", headers=headers,
+            files={"file": ("oferta.xlsx", _crear_excel_oferta([LOTE_BASE]).getvalue(), "application/octet-stream")},
+        )
+        assert r.status_code == 503
+        assert r.headers["retry-after"] == "5"
+    finally:
+        trabajos._pool.cerrar()
+        storage._storage_instance = None
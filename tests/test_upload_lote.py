@@ -0,0 +1,85 @@
+"""
+Tests de la carga múltiple de ofertas (varios archivos y/o .zip).
+"""
+import io
+import zipfile
+
+import pytest
+
+from backend import config, storage
+from tests.test_ajuste_martes_api import _crear_excel_oferta, LOTE_BASE
+
+
+pytestmark = pytest.mark.usefixtures("clean_storage")
+
+
+def _excel(granja, galpones):
+    return _crear_excel_oferta([{**LOTE_BASE, "granja": granja, "galpon": g} for g in galpones]).getvalue()
+
+
+def _zip(archivos: dict) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for nombre, contenido in archivos.items():
+            zf.writestr(nombre, contenido)
+        zf.writestr("__MACOSX/._norte.xlsx", b"basura")
+        zf.writestr("LEEME.txt.bak", b"no es oferta")
+    return buf.getvalue()
+
+
+def _subir(client, auth_headers, archivos):
+    return client.post(
+        "/oferta/upload-lote", headers=auth_headers,
+        files=[("files", (nombre, contenido, "application/octet-stream")) for nombre, contenido in archivos],
+    )
+
+
+def test_combina_archivos_y_zip(client, auth_headers):
+    csv = "fecha de peso;granja;galpon;nucleo;cantidad;sexo;fecha de ingreso\n23/02/2026;OESTE;1;1;8000;M;10/01/2026\n"
+    r = _subir(client, auth_headers, [
+        ("norte.xlsx", _excel("NORTE", [1, 2])),
+        ("integrador.zip", _zip({"sur.xlsx": _excel("SUR", [1]), "oeste.csv": csv.encode()})),
+    ])
+    assert r.status_code == 200
+    body = r.json()
+    assert body["total_lotes"] == 4
+    assert sorted(body["granjas"]) == ["NORTE", "OESTE", "SUR"]
+    assert [a["nombre"] for a in body["archivos"]] == ["norte.xlsx", "sur.xlsx", "oeste.csv"]
+    assert body["duplicados"] == {"exactos": [], "conflictos": [], "fusionados": True}
+
+    # La oferta combinada quedó guardada y se archivaron los dos archivos subidos
+    assert len(client.get("/oferta", headers=auth_headers).json()["ofertas"]) == 4
+    assert len(storage.get_storage().list_keys(storage.UPLOADS_META)) == 2
+
+
+def test_lote_repetido_entre_archivos(client, auth_headers):
+    r = _subir(client, auth_headers, [
+        ("a.xlsx", _excel("NORTE", [1, 2])),
+        ("b.xlsx", _excel("NORTE", [2, 3])),
+    ])
+    body = r.json()
+    assert body["total_lotes"] == 3
+    assert body["duplicados"]["conflictos"] == []
+    [dup] = body["duplicados"]["exactos"]
+    assert dup["clave"]["galpon"] == 2 and dup["clave"]["fecha_ingreso"] == "2026-01-10"
+    assert dup["repetido"] == {"archivo": "b.xlsx", "indice": 0}
+    assert dup["conservado"] == {"archivo": "a.xlsx", "indice": 1}
+
+    # Sin fusionar quedan todas las filas
+    r = client.post(
+        "/oferta/upload-lote?fusionar=false", headers=auth_headers,
+        files=[("files", (n, c, "application/octet-stream"))
+               for n, c in [("a.xlsx", _excel("NORTE", [1, 2])), ("b.xlsx", _excel("NORTE", [2, 3]))]],
+    )
+    assert r.json()["total_lotes"] == 4
+    assert r.json()["duplicados"]["fusionados"] is False
+
+
+def test_rechaza_formatos_y_exceso(client, auth_headers, monkeypatch):
+    assert _subir(client, auth_headers, [("oferta.pdf", b"%PDF")]).status_code == 400
+    assert _subir(client, auth_headers, [("roto.zip", b"no es zip")]).status_code == 400
+
+    monkeypatch.setattr(config, "UPLOAD_MAX_ARCHIVOS", 1)
+    r = _subir(client, auth_headers, [("lote.zip", _zip({"a.xlsx": _excel("A", [1]), "b.xlsx": _excel("B", [1])}))])
+    assert r.status_code == 400
+    assert "máximo" in r.json()["detail"]
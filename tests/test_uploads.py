@@ -0,0 +1,269 @@
+"""
+Tests del archivo de uploads direccionado por contenido.
+"""
+import asyncio
+import io
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import config, main, storage, uploads
+from backend.main import app
+from backend.parser_excel import leer_oferta_excel
+from backend.serializacion import comprimir_bytes, descomprimir_bytes, COMPRESION_NINGUNA
+from tests.test_ajuste_martes_api import _crear_excel_oferta, _generar_proyeccion, LOTE_BASE
+
+
+pytestmark = pytest.mark.usefixtures("clean_storage")
+
+
+def test_compresion_roundtrip():
+    raw = b"OFERTA;" * 1000
+    comprimido, algoritmo = comprimir_bytes(raw)
+    assert len(comprimido) < len(raw)
+    assert descomprimir_bytes(comprimido, algoritmo) == raw
+
+
+def test_no_comprime_si_no_conviene():
+    raw = bytes(range(256))
+    assert comprimir_bytes(raw) == (raw, COMPRESION_NINGUNA)
+
+
+def test_resubida_solo_escribe_metadata():
+    contenido = b"contenido excel" * 200
+
+    async def flujo():
+        d1 = await storage.save_upload("a.xlsx", contenido, usuario="ana")
+        d2 = await storage.save_upload("a (1).xlsx", contenido, usuario="beto")
+        return d1, d2
+
+    d1, d2 = asyncio.run(flujo())
+    assert d1 == d2 == storage.hash_upload(contenido)
+
+    meta = asyncio.run(storage.load_upload_meta(d1))
+    assert [(s["nombre"], s["usuario"]) for s in meta["subidas"]] == [("a.xlsx", "ana"), ("a (1).xlsx", "beto")]
+    assert meta["tamano_guardado"] < meta["tamano"]
+    assert asyncio.run(storage.load_upload(d1)) == contenido
+    assert asyncio.run(storage.load_upload("0" * 64)) is None
+
+
+def test_upload_repetido_no_reparsea(monkeypatch):
+    client = TestClient(app)
+    r = client.post("/token", data={"username": "admin", "password": "admin123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    excel = _crear_excel_oferta([LOTE_BASE], sheet_title="OFERTA JUEV").getvalue()
+
+    def subir():
+        return client.post(
+            "/oferta/upload", headers=headers,
+            files={"file": ("oferta.xlsx", excel, "application/octet-stream")},
+        )
+
+    primera = subir()
+    assert primera.status_code == 200
+
+    def no_parsear(*args, **kwargs):
+        raise AssertionError("no debería parsear un archivo ya conocido")
+
+    monkeypatch.setattr(main, "leer_oferta_archivo", no_parsear)
+    segunda = subir()
+    assert segunda.status_code == 200
+    assert segunda.json() == primera.json()
+
+
+def test_ajuste_martes_reutiliza_parseo(monkeypatch):
+    client = TestClient(app)
+    r = client.post("/token", data={"username": "admin", "password": "admin123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    _generar_proyeccion(client, headers)
+    excel = _crear_excel_oferta([LOTE_BASE]).getvalue()
+
+    def ajustar():
+        return client.post(
+            "/oferta/ajuste-martes", headers=headers,
+            files={"file": ("martes.xlsx", excel, "application/octet-stream")},
+        )
+
+    parseos = []
+    original = main.leer_oferta_archivo
+    monkeypatch.setattr(main, "leer_oferta_archivo", lambda *a, **k: parseos.append(1) or original(*a, **k))
+
+    assert ajustar().status_code == 200
+    assert ajustar().status_code == 200
+    assert len(parseos) == 1
+
+    # Otra versión del parser no usa el cache
+    monkeypatch.setattr(main, "PARSER_VERSION", "otra")
+    assert ajustar().status_code == 200
+    assert len(parseos) == 2
+
+
+def _login(client):
+    r = client.post("/token", data={"username": "admin", "password": "admin123"})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def test_upload_supera_maximo(monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_MAX_MB", 0)
+    client = TestClient(app)
+    r = client.post(
+        "/oferta/upload", headers=_login(client),
+        files={"file": ("oferta.xlsx", _crear_excel_oferta([LOTE_BASE]).getvalue(), "application/octet-stream")},
+    )
+    assert r.status_code == 413
+    assert storage.get_storage().list_keys(storage.UPLOADS_PREFIX) == []
+
+
+def test_upload_supera_maximo_antes_de_recibir_el_cuerpo(monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_MAX_MB", 0)
+
+    async def no_recibir(*args, **kwargs):
+        raise AssertionError("no debería llegar al endpoint")
+
+    monkeypatch.setattr(uploads, "recibir", no_recibir)
+    client = TestClient(app)
+    grande = b"x" * (uploads.MARGEN_MULTIPART + 1)
+    r = client.post(
+        "/oferta/upload", headers=_login(client),
+        files={"file": ("oferta.xlsx", grande, "application/octet-stream")},
+    )
+    assert r.status_code == 413
+
+
+def test_limite_cuerpo_sin_content_length(monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_MAX_MB", 0)
+    leidos = []
+
+    async def app_eco(scope, receive, send):
+        while True:
+            mensaje = await receive()
+            leidos.append(len(mensaje["body"]))
+            if not mensaje.get("more_body"):
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def flujo():
+        bloques = [b"x" * 16 * 1024] * 10
+        entrada = iter(
+            {"type": "http.request", "body": b, "more_body": i < len(bloques) - 1}
+            for i, b in enumerate(bloques)
+        )
+        enviados = []
+
+        async def receive():
+            return next(entrada)
+
+        async def send(mensaje):
+            enviados.append(mensaje)
+
+        limite = uploads.LimiteCuerpo(app_eco, rutas={"/oferta/upload": 1})
+        scope = {"type": "http", "path": "/oferta/upload", "headers": [], "method": "POST"}
+        await limite(scope, receive, send)
+        return enviados
+
+    enviados = asyncio.run(flujo())
+    assert enviados[0]["status"] == 413
+    # Se cortó al pasar el máximo, sin leer el resto del cuerpo
+    assert sum(leidos) <= uploads.MARGEN_MULTIPART
+    assert len(leidos) < 10
+
+
+@pytest.fixture
+def spool_chico(monkeypatch):
+    """Spool de Starlette de 1 KB, para probar uploads en disco con archivos chicos."""
+    from starlette.formparsers import MultiPartParser
+
+    monkeypatch.setattr(MultiPartParser, "spool_max_size", 1024)
+
+
+def _upload(contenido: bytes, nombre: str):
+    """UploadFile como lo arma Starlette: spool de MultiPartParser.spool_max_size."""
+    from tempfile import SpooledTemporaryFile
+    from starlette.datastructures import UploadFile
+    from starlette.formparsers import MultiPartParser
+
+    archivo = SpooledTemporaryFile(max_size=MultiPartParser.spool_max_size)
+    archivo.write(contenido)
+    archivo.seek(0)
+    return UploadFile(archivo, size=len(contenido), filename=nombre)
+
+
+def test_upload_en_memoria():
+    upload = _upload(b"contenido", "oferta.xlsx")
+
+    async def flujo():
+        recibido = await uploads.recibir(upload)
+        try:
+            assert not recibido.en_disco
+            assert recibido.fuente() == b"contenido"
+        finally:
+            recibido.cerrar()
+
+    asyncio.run(flujo())
+
+
+def test_upload_en_disco_no_se_copia(spool_chico):
+    excel = _crear_excel_oferta([LOTE_BASE, {**LOTE_BASE, "galpon": 2}]).getvalue()
+    upload = _upload(excel, "oferta.xlsx")
+
+    async def flujo():
+        recibido = await uploads.recibir(upload)
+        try:
+            assert recibido.en_disco and recibido.tamano == len(excel)
+            assert recibido.digest == storage.hash_upload(excel)
+            # El parser lee el spool del upload, no una copia
+            fuente = recibido.fuente()
+            assert fuente is upload.file
+            assert len(leer_oferta_excel(fuente)) == 2
+            # El pool de procesos necesita una ruta: recién ahí se copia
+            ruta = recibido.fuente(para_procesos=True)
+            assert isinstance(ruta, str) and len(leer_oferta_excel(ruta)) == 2
+        finally:
+            recibido.cerrar()
+        assert not os.path.exists(ruta)
+        assert not upload.file.closed
+
+    asyncio.run(flujo())
+
+
+def test_content_type_segun_extension():
+    assert storage.content_type_upload("Oferta.XLS") == "application/vnd.ms-excel"
+    assert storage.content_type_upload("oferta.xlsx") == storage.UPLOADS_CONTENT_TYPES[".xlsx"]
+    assert storage.content_type_upload("lote.zip") == "application/zip"
+    assert storage.content_type_upload("sin_extension") == "application/octet-stream"
+
+
+def test_upload_supera_maximo_por_archivo():
+    upload = _upload(b"x" * 2048, "oferta.xlsx")
+    with pytest.raises(uploads.ArchivoDemasiadoGrande):
+        asyncio.run(uploads.recibir(upload, max_bytes=1024))
+
+
+def test_archivo_comprimido_por_bloques(spool_chico):
+    contenido = b"GRANJA;GALPON;" * 200_000
+
+    async def flujo():
+        recibido = await uploads.recibir(_upload(contenido, "oferta.xls"))
+        try:
+            assert recibido.en_disco
+            assert recibido.digest == storage.hash_upload(contenido)
+            await storage.save_upload_archivo(
+                recibido.nombre, recibido.abrir(), recibido.tamano, recibido.digest,
+            )
+        finally:
+            recibido.cerrar()
+        return recibido.digest
+
+    digest = asyncio.run(flujo())
+    meta = asyncio.run(storage.load_upload_meta(digest))
+    assert meta["compresion"] != COMPRESION_NINGUNA
+    assert meta["tamano_guardado"] < meta["tamano"] == len(contenido)
+    assert asyncio.run(storage.load_upload(digest)) == contenido
+
+
+def test_parser_acepta_ruta(tmp_path):
+    ruta = tmp_path / "oferta.xlsx"
+    ruta.write_bytes(_crear_excel_oferta([LOTE_BASE]).getvalue())
+    assert [o.granja for o in leer_oferta_excel(str(ruta))] == ["TEST"]